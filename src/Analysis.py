@@ -1,242 +1,380 @@
-import pandas as pd
-import numpy as np
-import seaborn as sns
+import json
 import os
-from scipy import stats
-import sys
-
-class Tee:
-    def __init__(self, *files):
-        self.files = files
-    
-    def write(self, obj):
-        for f in self.files:
-            f.write(obj)
-            f.flush()
-    
-    def flush(self):
-        for f in self.files:
-            f.flush()
-
-def save_analysis_to_file(gpu_analysis_func, ssd_analysis_func):
-    output_dir = '../data/processed'
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    
-    output_file = os.path.join(output_dir, 'analysis_results.txt')
- 
-    original_stdout = sys.stdout
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        tee = Tee(original_stdout, f)
-        sys.stdout = tee
-        
-        try:
-            gpu_results = gpu_analysis_func()
-            ssd_results = ssd_analysis_func()
-            
-            print("\n" + "=" * 60)
-            print("ANALYSIS COMPLETE")
-            print("=" * 60)
-            print(f"Analysis results saved to: {output_file}")
-            
-        finally:
-            sys.stdout = original_stdout
-    
-    print(f"\nResults also saved to: {output_file}")
-    return gpu_results, ssd_results
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import Storage
+import GroupStats
+import Results
+import Resample
+import Diff
+
+# Every analyzed product family with its input table, grouping keys, price
+# tiers, tests and contrasts; adding a family is adding an entry to this file
+FAMILIES_FILE = '../data/analysis_families.json'
+PROCESSED_DIR = '../data/processed'
+
+# resampling tests; the fixed seed keeps the report reproducible
+RESAMPLES = 10_000
+RESAMPLE_SEED = 0
+# groups with fewer products are left out of the tests
+MIN_GROUP_SIZE = 2
+
+@lru_cache(maxsize=None)
+def load_families(families_file: str = FAMILIES_FILE) -> Dict[str, Dict[str, Any]]:
+    with open(families_file, encoding='utf-8') as f:
+        return json.load(f)
 
-def analyze_gpu_data():
-    print("=" * 60)
-    print("GPU MARKET ANALYSIS")
-    print("=" * 60)
-    
-    # Load classified GPU data
-    input_file = '../data/processed/classified_5090.csv'
-    if not os.path.exists(input_file):
-        print(f"Error: {input_file} not found.")
+def key_label(key: str, options: Dict[str, Any]) -> str:
+    return options.get('label', key.replace('_', ' ').title())
+
+def key_plural(key: str, options: Dict[str, Any]) -> str:
+    return options.get('plural', key_label(key, options) + 's')
+
+def analyze_family(family: str, spec: Dict[str, Any], sink=None, processed_dir: str = PROCESSED_DIR):
+    # the report and records of one product family, as declared in its spec;
+    # returns the analyzed table ('df'), its GroupStats ('group_stats') and the
+    # per-key results ('tables': group -> stats dicts for keys with an order,
+    # ranked DataFrames for the others), or None without an input table
+    sink = sink if sink is not None else Results.ResultsSink()
+    out = sink.print
+    out("=" * 60)
+    out(spec['title'])
+    out("=" * 60)
+
+    input_file = os.path.join(processed_dir, spec['input'])
+    if not Storage.table_exists(input_file):
+        out(f"Error: {input_file} not found.")
+        sink.record(family, 'error', {'message': f"{input_file} not found"})
         return None
-    
-    df = pd.read_csv(input_file)
-    
+
+    # prices stay float64 because the report prints them to the cent
+    df = Storage.load_products(input_file, columns=spec.get('columns'), float_dtype='float64', report=False)
+    keys = {key: options for key, options in spec.get('keys', {}).items() if key in df.columns}
+    tiers = spec.get('tiers')
+    if tiers:
+        df = df.assign(price_tier=GroupStats.price_tiers(df['price'], tiers['edges'], tiers['labels']))
+
+    # every per-group statistic below comes from one pass of the grouping
+    # engine instead of a filtered copy per group
+    count_columns = [column for options in keys.values() for column in options.get('counts', []) if column in df.columns]
+    group_stats = GroupStats.GroupStats(df, list(keys) + (['price_tier'] if tiers else []), value='price',
+                                        counts=count_columns)
+    sections = iter(range(1, 100))
+
+    def heading(title):
+        out(f"\n   {next(sections)}. {title}:")
+        out("-" * 40)
+
     # Basic descriptive statistics
-    print("\n   1. BASIC DESCRIPTIVE STATISTICS:")
-    print("-" * 40)
-    print(f"Total Products Analyzed: {len(df)}")
-    print(f"Unique Brands: {df['brand'].nunique()}")
-    print(f"Brands: {', '.join(sorted(df['brand'].unique()))}")
-    
-    price_stats = df['price'].describe()
-    print(f"\nPrice Statistics:")
-    print(f"  Mean Price: ${price_stats['mean']:.2f}")
-    print(f"  Median Price: ${price_stats['50%']:.2f}")
-    print(f"  Minimum Price: ${price_stats['min']:.2f}")
-    print(f"  Maximum Price: ${price_stats['max']:.2f}")
-    print(f"  Price Range: ${price_stats['max'] - price_stats['min']:.2f}")
-    print(f"  Standard Deviation: ${price_stats['std']:.2f}")
-    
-    # Category-based analysis
-    print("\n   2. CATEGORY-WISE ANALYSIS:")
-    print("-" * 40)
-    
-    categories = ['Water Cooled Flagship', 'Air Cooled Flagship', 'Game-enhanced', 'Basic', 'Uncategorized']
-    category_stats = {}
-    
-    for category in categories:
-        if category in df['category'].unique():
-            cat_df = df[df['category'] == category]
-            stats_dict = {
-                'count': len(cat_df),
-                'mean_price': cat_df['price'].mean(),
-                'median_price': cat_df['price'].median(),
-                'min_price': cat_df['price'].min(),
-                'max_price': cat_df['price'].max(),
-                'price_std': cat_df['price'].std(),
-                'brands': cat_df['brand'].nunique(),
-                'avg_title_length': cat_df['title'].str.len().mean()
-            }
-            category_stats[category] = stats_dict
-            
-            print(f"\n{category}:")
-            print(f"  Products: {stats_dict['count']}")
-            print(f"  Average Price: ${stats_dict['mean_price']:.2f}")
-            print(f"  Price Range: ${stats_dict['min_price']:.2f} - ${stats_dict['max_price']:.2f}")
-            print(f"  Unique Brands: {stats_dict['brands']}")
-    
-    # Brand analysis
-    print("\n   3. BRAND ANALYSIS:")
-    print("-" * 40)
-    
-    brand_stats = df.groupby('brand').agg({
-        'price': ['count', 'mean', 'median', 'min', 'max', 'std'],
-        'title': 'count'
-    }).round(2)
-    
-    brand_stats.columns = ['Count', 'Mean_Price', 'Median_Price', 'Min_Price', 'Max_Price', 'Price_Std', 'Title_Count']
-    brand_stats = brand_stats.sort_values('Count', ascending=False)
-    
-    print("\nTop 5 Brands by Product Count:")
-    print(brand_stats.head())
-    
+    heading("BASIC DESCRIPTIVE STATISTICS")
+    out(f"Total Products Analyzed: {len(df)}")
+    overview = {'products': len(df)}
+    for key, options in keys.items():
+        if options.get('list'):
+            names = sorted(str(name) for name in group_stats.by[key].index)
+            out(f"Unique {key_plural(key, options)}: {len(names)}")
+            out(f"{key_plural(key, options)}: {', '.join(names)}")
+            overview[key] = names
+
+    price_stats = group_stats.overall
+    out(f"\nPrice Statistics:")
+    out(f"  Mean Price: ${price_stats['mean']:.2f}")
+    out(f"  Median Price: ${price_stats['median']:.2f}")
+    out(f"  Minimum Price: ${price_stats['min']:.2f}")
+    out(f"  Maximum Price: ${price_stats['max']:.2f}")
+    out(f"  Price Range: ${price_stats['max'] - price_stats['min']:.2f}")
+    out(f"  Standard Deviation: ${price_stats['std']:.2f}")
+    price_record = price_stats[['count', 'mean', 'median', 'min', 'max', 'std']].to_dict()
+
+    if spec.get('outliers'):
+        # Identify outliers using IQR method
+        prices = df['price'].to_numpy(dtype=float)
+        price_q1, price_q3 = np.nanpercentile(prices, [25, 75])
+        price_iqr = price_q3 - price_q1
+        outliers = int(((prices < price_q1 - 1.5 * price_iqr) | (prices > price_q3 + 1.5 * price_iqr)).sum())
+        out(f"  IQR (Middle 50%): ${price_q1:.2f} - ${price_q3:.2f}")
+        out(f"  Potential Price Outliers: {outliers} products")
+        price_record.update(q1=price_q1, q3=price_q3, outliers=outliers)
+    sink.record(family, 'overview', overview)
+    sink.record(family, 'price', price_record)
+
+    # Per-key analysis: keys with an order get one block per group, the others
+    # a table ranked by product count
+    ranked = {}
+    tables = {}
+    for key, options in keys.items():
+        table = group_stats.by[key]
+        label = key_label(key, options)
+        if 'order' in options:
+            heading(f"{label.upper()}-WISE ANALYSIS")
+            unique = {other: group_stats.nunique(key, other) for other in options.get('unique', []) if other in keys}
+            key_stats = {}
+            for group in options['order']:
+                if group in table.index:
+                    row = table.loc[group]
+                    key_stats[group] = {
+                        'count': int(row['rows']),
+                        'mean_price': row['mean'],
+                        'median_price': row['median'],
+                        'min_price': row['min'],
+                        'max_price': row['max'],
+                        'price_std': row['std'],
+                    }
+                    out(f"\n{group}:")
+                    out(f"  Products: {key_stats[group]['count']}")
+                    out(f"  Average Price: ${row['mean']:.2f}")
+                    out(f"  Price Range: ${row['min']:.2f} - ${row['max']:.2f}")
+                    for other, counts in unique.items():
+                        key_stats[group][other + 's'] = int(counts[group])
+                        out(f"  Unique {key_plural(other, keys[other])}: {int(counts[group])}")
+            sink.record(family, key, key_stats)
+            tables[key] = key_stats
+        else:
+            heading(f"{label.upper()} ANALYSIS")
+            key_table = table[['count', 'mean', 'median', 'min', 'max', 'std']].round(2)
+            key_table.columns = ['Count', 'Mean_Price', 'Median_Price', 'Min_Price', 'Max_Price', 'Price_Std']
+            # non-null counts of other columns, e.g. Title_Count
+            for column in options.get('counts', []):
+                if f'{column}_count' in table.columns:
+                    key_table[f'{column.title()}_Count'] = table[f'{column}_count']
+            key_table = key_table.sort_values('Count', ascending=False)
+            ranked[key] = key_table
+            tables[key] = key_table
+            top = options.get('top', 5)
+            out(f"\nTop {top} {key_plural(key, options)} by Product Count:")
+            # to_string: the whole table, however wide
+            out(key_table.head(top).to_string())
+            sink.record(family, key, key_table)
+
     # Price segmentation
-    print("\n   4. PRICE SEGMENTATION:")
-    print("-" * 40)
-    
-    # Define price tiers
-    price_tiers = {
-        'Budget (<$1000)': df[df['price'] < 1000],
-        'Mid-range ($1000-$1500)': df[(df['price'] >= 1000) & (df['price'] < 1500)],
-        'High-end ($1500-$2000)': df[(df['price'] >= 1500) & (df['price'] < 2000)],
-        'Premium (≥$2000)': df[df['price'] >= 2000]
-    }
-    
-    for tier_name, tier_df in price_tiers.items():
-        if len(tier_df) > 0:
-            print(f"{tier_name}: {len(tier_df)} products (${tier_df['price'].min():.2f}-${tier_df['price'].max():.2f})")
-    
-    # Statistical tests
-    print("\n   5. STATISTICAL TESTS:")
-    print("-" * 40)
-    
-    # Test if there are significant price differences between categories
-    category_groups = []
-    for category in ['Water Cooled Flagship', 'Air Cooled Flagship', 'Game-enhanced', 'Basic']:
-        if category in df['category'].unique():
-            category_groups.append(df[df['category'] == category]['price'])
-    
-    if len(category_groups) >= 2:
-        # One-way ANOVA test
-        f_stat, p_value = stats.f_oneway(*category_groups)
-        print(f"ANOVA Test for Price Differences Between Categories:")
-        print(f"  F-statistic: {f_stat:.4f}")
-        print(f"  P-value: {p_value:.4f}")
-        
-        if p_value < 0.05:
-            print("  Result: Significant price differences exist between categories (p < 0.05)")
+    if tiers:
+        heading("PRICE SEGMENTATION")
+        by_tier = group_stats.by['price_tier']
+        for tier_name in tiers['labels']:
+            if tier_name in by_tier.index:
+                tier = by_tier.loc[tier_name]
+                out(f"{tier_name}: {int(tier['rows'])} products (${tier['min']:.2f}-${tier['max']:.2f})")
+        sink.record(family, 'price_tiers', by_tier[['rows', 'min', 'max']].rename(columns={'rows': 'products'}))
+
+    tests = spec.get('tests')
+    if tests and tests['key'] in keys:
+        test_key = tests['key']
+        test_plural = key_plural(test_key, keys[test_key])
+        by_test_key = group_stats.by[test_key]
+        candidates = [g for g in tests.get('groups', keys[test_key].get('order', list(by_test_key.index)))
+                      if g in by_test_key.index]
+        # the default label of the classification and groups too small to test are left out
+        min_group_size = tests.get('min_group_size', MIN_GROUP_SIZE)
+        excluded = {g: 'excluded' for g in candidates if g in tests.get('exclude', [])}
+        for g in candidates:
+            count = int(by_test_key.loc[g, 'count'])
+            if g not in excluded and count < min_group_size:
+                excluded[g] = f"{count} product{'s' if count != 1 else ''}, fewer than {min_group_size}"
+        test_groups = [g for g in candidates if g not in excluded]
+        resamples = tests.get('resamples', RESAMPLES)
+        seed = tests.get('seed', RESAMPLE_SEED)
+
+        # Test if there are significant price differences between the groups
+        heading("STATISTICAL TESTS")
+        if excluded:
+            out(f"Left out of the tests: {', '.join(f'{g} ({reason})' for g, reason in excluded.items())}")
+        if len(test_groups) >= 2:
+            # One-way ANOVA test, from the per-group counts, means and variances
+            f_stat, p_value = group_stats.anova(test_key, test_groups)
+            out(f"ANOVA Test for Price Differences Between {test_plural}:")
+            out(f"  F-statistic: {f_stat:.4f}")
+            out(f"  P-value: {p_value:.4f}")
+
+            if p_value < 0.05:
+                out(f"  Result: Significant price differences exist between {test_plural.lower()} (p < 0.05)")
+            else:
+                out(f"  Result: No significant price differences between {test_plural.lower()}")
+            sink.record(family, 'anova', {'key': test_key, 'groups': test_groups, 'f_stat': f_stat, 'p_value': p_value})
         else:
-            print("  Result: No significant price differences between categories")
-    
+            out(f"Fewer than two {test_plural.lower()} to compare.")
+
+        # Resampling tests: no normality assumption, which matters with a few products per group
+        heading("RESAMPLING TESTS")
+        out(f"Bootstrap 95% Confidence Intervals ({resamples} resamples):")
+        for key in tests.get('bootstrap', []):
+            if key not in keys:
+                continue
+            order = ranked[key].index if key in ranked else keys[key].get('order', group_stats.by[key].index)
+            groups = [g for g in order if g in group_stats.by[key].index and (key != test_key or g in test_groups)]
+            means = Resample.bootstrap_ci(df['price'], df[key], 'mean', resamples, seed=seed, groups=groups)
+            medians = Resample.bootstrap_ci(df['price'], df[key], 'median', resamples, seed=seed, groups=groups)
+            out(f"  By {key_label(key, keys[key]).lower()}:")
+            for group in groups:
+                m, md = means.loc[group], medians.loc[group]
+                out(f"    {group}: mean ${m['mean']:.2f} [${m['low']:.2f}, ${m['high']:.2f}], "
+                    f"median ${md['median']:.2f} [${md['low']:.2f}, ${md['high']:.2f}]")
+            sink.record(family, f'bootstrap_{key}',
+                        means.join(medians.drop(columns='n'), lsuffix='_mean', rsuffix='_median'))
+
+        tested = df[df[test_key].isin(test_groups)]
+        if len(test_groups) >= 2 and len(tested) > len(test_groups):
+            permutation = Resample.permutation_anova(tested['price'], tested[test_key], resamples,
+                                                     seed=seed, groups=test_groups)
+            out(f"\nPermutation Tests Between {test_plural} ({resamples} permutations):")
+            out(f"  ANOVA F-statistic: {permutation['f_stat']:.4f}, permutation p-value: {permutation['f_p_value']:.4f}")
+            out(f"  Kruskal-Wallis H: {permutation['h_stat']:.4f}, permutation p-value: {permutation['h_p_value']:.4f} "
+                f"(chi-square p-value: {permutation['h_p_value_asymptotic']:.4f})")
+            sink.record(family, 'permutation_anova', permutation)
+
+            pairwise = Resample.pairwise_permutation(tested['price'], tested[test_key], resamples,
+                                                     seed=seed, groups=test_groups)
+            out("\nPairwise Mean Differences (Holm-adjusted permutation p-values):")
+            for row in pairwise.itertuples(index=False):
+                sign = '+' if row.mean_diff >= 0 else '-'
+                out(f"  {row.group_a} vs {row.group_b}: {sign}${abs(row.mean_diff):.2f} (p = {row.p_holm:.4f})")
+            sink.record(family, 'pairwise', pairwise)
+
+    # Listing changes between the last two scrapes of the family's search (Diff.run_diff)
+    changes_file = os.path.join(processed_dir, spec['changes']) if 'changes' in spec else None
+    if changes_file and Storage.table_exists(changes_file):
+        changes = Storage.load_table(changes_file)
+        counts = changes['change'].value_counts().reindex(Diff.CHANGE_KINDS, fill_value=0)
+        price_changes = changes.loc[changes['change'] == 'price', ['title', 'old_price', 'new_price', 'price_delta', 'price_pct']]
+        heading("LISTING CHANGES SINCE THE LAST SCRAPE")
+        out(", ".join(f"{int(n)} {kind}" for kind, n in counts.items()))
+        changes_record = {'counts': counts, 'price_changes': price_changes.reset_index(drop=True)}
+        if len(price_changes):
+            changes_record['median_price_pct'] = price_changes['price_pct'].median()
+            out(f"Median price change: {changes_record['median_price_pct']:+.1f}% over {len(price_changes)} products")
+            for title, moves in (("Price drops", price_changes[price_changes['price_delta'] < 0].nsmallest(3, 'price_pct')),
+                                 ("Price increases", price_changes[price_changes['price_delta'] > 0].nlargest(3, 'price_pct'))):
+                if len(moves):
+                    out(f"{title}:")
+                    for row in moves.itertuples():
+                        out(f"  {row.price_pct:+.1f}% (${row.old_price:.2f} -> ${row.new_price:.2f}) {str(row.title)[:60]}")
+        sink.record(family, 'changes', changes_record)
+
     # Key insights
-    print("\n   7. KEY INSIGHTS:")
-    print("-" * 40)
-    
-    # Most expensive brand
-    most_expensive_brand = brand_stats.loc[brand_stats['Mean_Price'].idxmax()]
-    print(f"• Most expensive brand on average: {most_expensive_brand.name} (${most_expensive_brand['Mean_Price']:.2f})")
-    
-    # Most popular brand
-    most_popular_brand = brand_stats.iloc[0]
-    print(f"• Most popular brand by product count: {most_popular_brand.name} ({int(most_popular_brand['Count'])} products)")
-    
-    # Price premium analysis
-    premium_categories = ['Water Cooled Flagship', 'Air Cooled Flagship']
-    premium_df = df[df['category'].isin(premium_categories)]
-    standard_df = df[df['category'].isin(['Game-enhanced', 'Basic'])]
-    
-    if len(premium_df) > 0 and len(standard_df) > 0:
-        premium_avg = premium_df['price'].mean()
-        standard_avg = standard_df['price'].mean()
-        premium_pct = ((premium_avg - standard_avg) / standard_avg) * 100
-        
-        print(f"• Premium categories cost {premium_pct:.1f}% more than standard categories")
-        print(f"  (${premium_avg:.2f} vs ${standard_avg:.2f})")
-    
-    return df, category_stats, brand_stats
-
-def analyze_ssd_data():
-    print("\n" + "=" * 60)
-    print("SSD MARKET ANALYSIS (2TB)")
-    print("=" * 60)
-    
-    input_file = '../data/processed/cleaned_2t_ssd.csv'
-    if not os.path.exists(input_file):
-        print(f"Error: {input_file} not found.")
+    heading("KEY INSIGHTS")
+    insights = {}
+    for key, key_table in ranked.items():
+        label = key_label(key, keys[key]).lower()
+        most_expensive = key_table.loc[key_table['Mean_Price'].idxmax()]
+        most_popular = key_table.iloc[0]
+        out(f"• Most expensive {label} on average: {most_expensive.name} (${most_expensive['Mean_Price']:.2f})")
+        out(f"• Most popular {label} by product count: {most_popular.name} ({int(most_popular['Count'])} products)")
+        insights[f'most_expensive_{key}'] = {'name': most_expensive.name, 'mean_price': most_expensive['Mean_Price']}
+        insights[f'most_popular_{key}'] = {'name': most_popular.name, 'count': int(most_popular['Count'])}
+
+    # Price premium of one set of groups over another
+    for contrast in spec.get('contrasts', []):
+        table = group_stats.by.get(contrast['key'])
+        if table is None:
+            continue
+        rows = table['rows'].reindex(contrast['groups'], fill_value=0).sum()
+        versus_rows = table['rows'].reindex(contrast['versus_groups'], fill_value=0).sum()
+        if rows > 0 and versus_rows > 0:
+            avg = group_stats.pooled_mean(contrast['key'], contrast['groups'])
+            versus_avg = group_stats.pooled_mean(contrast['key'], contrast['versus_groups'])
+            premium_pct = ((avg - versus_avg) / versus_avg) * 100
+            out(f"• {contrast['name']} cost {premium_pct:.1f}% more than {contrast['versus']}")
+            out(f"  (${avg:.2f} vs ${versus_avg:.2f})")
+            insights[contrast['name']] = {'mean_price': avg, 'versus_mean_price': versus_avg, 'premium_pct': premium_pct}
+    sink.record(family, 'insights', insights)
+
+    return {'df': df, 'group_stats': group_stats, 'tables': tables}
+
+def _analyze_captured(family: str, spec: Dict[str, Any], processed_dir: str):
+    # worker side of run_families: the report lines and records are kept and
+    # sent back, so the families' reports never interleave
+    sink = Results.ResultsSink(console=False, capture=True)
+    result = analyze_family(family, spec, sink, processed_dir)
+    return sink.lines, sink.records, result
+
+def run_families(sink, families: Optional[List[str]] = None, families_file: str = FAMILIES_FILE,
+                 processed_dir: str = PROCESSED_DIR, workers: int = 1) -> Dict[str, Any]:
+    # analyzes every family (default: all in families_file) into one sink, in
+    # the file's order; workers > 1 analyzes the families in a process pool
+    specs = load_families(families_file)
+    names = list(specs) if families is None else families
+    results = {}
+    if workers > 1 and len(names) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(names))) as pool:
+            futures = [pool.submit(_analyze_captured, name, specs[name], processed_dir) for name in names]
+            for name, future in zip(names, futures):
+                lines, records, results[name] = future.result()
+                if name != names[0]:
+                    sink.print()
+                sink.replay(lines, records)
+    else:
+        for name in names:
+            if name != names[0]:
+                sink.print()
+            results[name] = analyze_family(name, specs[name], sink, processed_dir)
+    return results
+
+def _finish_report(sink):
+    sink.print("\n" + "=" * 60)
+    sink.print("ANALYSIS COMPLETE")
+    sink.print("=" * 60)
+    sink.print(f"Analysis results saved to: {', '.join(sink.paths.values())}")
+
+def save_families_to_file(families: Optional[List[str]] = None, formats=("ndjson", "text"), console=True,
+                          workers: int = 1):
+    # the analyses write their report lines and structured records to one
+    # ResultsSink: buffered analysis_results.* files plus the console
+    t0 = time.perf_counter()
+    with Results.ResultsSink(PROCESSED_DIR, formats=formats, console=console) as sink:
+        results = run_families(sink, families, workers=workers)
+        _finish_report(sink)
+
+    elapsed = time.perf_counter() - t0
+    print(f"\nResults also saved to: {', '.join(sink.paths.values())}")
+    print(f"Analyzed {len(results)} product families in {elapsed:.2f}s ({workers} worker{'s' if workers > 1 else ''})")
+    return results
+
+def save_analysis_to_file(gpu_analysis_func=None, ssd_analysis_func=None):
+    # the entry point from before the families config, returning
+    # (gpu_results, ssd_results) shaped like analyze_gpu_data / analyze_ssd_data.
+    # Without functions it is run_families over gpu and ssd; given functions
+    # are called with the sink, as analyze_gpu_data / analyze_ssd_data take it
+    with Results.ResultsSink(PROCESSED_DIR) as sink:
+        if gpu_analysis_func is None and ssd_analysis_func is None:
+            results = run_families(sink, ['gpu', 'ssd'])
+            gpu_results, ssd_results = gpu_results_of(results['gpu']), ssd_results_of(results['ssd'])
+        else:
+            gpu_results = (gpu_analysis_func or analyze_gpu_data)(sink)
+            sink.print()
+            ssd_results = (ssd_analysis_func or analyze_ssd_data)(sink)
+        _finish_report(sink)
+
+    print(f"\nResults also saved to: {', '.join(sink.paths.values())}")
+    return gpu_results, ssd_results
+
+def gpu_results_of(result):
+    # analyze_family's gpu result as (df, category_stats, brand_stats): the
+    # classified GPUs, a dict of statistics per category and the per-brand table
+    if result is None:
         return None
-    
-    df = pd.read_csv(input_file)
-    
-    # Basic statistics
-    print(f"\nTotal 2TB SSDs Analyzed: {len(df)}")
-    
-    if 'price' in df.columns:
-        price_stats = df['price'].describe()
-        print(f"\nSSD Price Statistics:")
-        print(f"  Mean: ${price_stats['mean']:.2f}")
-        print(f"  Median: ${price_stats['50%']:.2f}")
-        print(f"  Range: ${price_stats['min']:.2f} - ${price_stats['max']:.2f}")
-        print(f"  Standard Deviation: ${price_stats['std']:.2f}")
-        
-        # Price distribution analysis
-        price_q1 = df['price'].quantile(0.25)
-        price_q3 = df['price'].quantile(0.75)
-        price_iqr = price_q3 - price_q1
-        print(f"  IQR (Middle 50%): ${price_q1:.2f} - ${price_q3:.2f}")
-        
-        # Identify outliers using IQR method
-        lower_bound = price_q1 - 1.5 * price_iqr
-        upper_bound = price_q3 + 1.5 * price_iqr
-        outliers = df[(df['price'] < lower_bound) | (df['price'] > upper_bound)]
-        print(f"  Potential Price Outliers: {len(outliers)} products")
-    
-    if 'brand' in df.columns:
-        print(f"\nSSD Brands Available: {df['brand'].nunique()}")
-        brand_counts = df['brand'].value_counts()
-        print(f"\nTop 5 Brands by Product Count:")
-        for brand, count in brand_counts.head().items():
-            print(f"  {brand}: {count} products")
-
-    if 'price' in df.columns and 'brand' in df.columns:
-        brand_price_stats = df.groupby('brand')['price'].agg(['mean', 'median', 'count']).round(2)
-        brand_price_stats = brand_price_stats.sort_values('count', ascending=False)
-        
-        print(f"\nBrand Price Analysis:")
-        print(brand_price_stats.head(10))
-    
-    return df
-
-def run_analysis():
+    df = result['df']
+    category_stats = result['tables'].get('category', {})
+    if 'title' in df.columns:
+        title_lengths = df['title'].str.len().groupby(df['category'], observed=True).mean()
+        for category, stats_dict in category_stats.items():
+            stats_dict['avg_title_length'] = title_lengths[category]
+    return df, category_stats, result['tables'].get('brand')
+
+def ssd_results_of(result):
+    # analyze_family's ssd result as the analyzed SSD table
+    return result['df'] if result is not None else None
+
+def analyze_gpu_data(sink=None):
+    return gpu_results_of(analyze_family('gpu', load_families()['gpu'], sink))
+
+def analyze_ssd_data(sink=None):
+    return ssd_results_of(analyze_family('ssd', load_families()['ssd'], sink))
+
+def run_analysis(families: Optional[List[str]] = None, workers: int = 1):
     print(" --- Starting analysis --- ")
-    return save_analysis_to_file(analyze_gpu_data, analyze_ssd_data)
+    return save_families_to_file(families, workers=workers)
 
 #if __name__ == "__main__":
-#    run_analysis()
\ No newline at end of file
+#    run_analysis()
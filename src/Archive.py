@@ -0,0 +1,140 @@
+import os
+import re
+import csv
+import gzip
+import json
+import hashlib
+import threading
+from datetime import datetime, timezone
+from typing import List, Dict, Optional
+
+# Each page body is stored once, gzip-compressed, under the sha256 of its
+# content. index.csv records every fetch (keyword, page, url, fetched_at, hash),
+# so re-fetching an unchanged page only adds one index row.
+ARCHIVE_DIR = "../data/raw/page_archive"
+INDEX_FILE = "index.csv"
+INDEX_FIELDS = ["keyword", "page", "url", "fetched_at", "sha256"]
+
+# the concurrent scraper stores pages from several threads
+_index_lock = threading.Lock()
+
+
+def object_path(digest: str, archive_dir: str = ARCHIVE_DIR) -> str:
+    return os.path.join(archive_dir, "objects", digest[:2], f"{digest}.html.gz")
+
+
+def store_page(keyword: str, page: int, url: str, html: str, archive_dir: str = ARCHIVE_DIR,
+               fetched_at: Optional[str] = None) -> str:
+    data = html.encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    path = object_path(digest, archive_dir)
+
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temp name first so readers never see a half-written object
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    if fetched_at is None:
+        fetched_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    index_path = os.path.join(archive_dir, INDEX_FILE)
+    with _index_lock:
+        new_index = not os.path.exists(index_path)
+        with open(index_path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=INDEX_FIELDS)
+            if new_index:
+                writer.writeheader()
+            writer.writerow({"keyword": keyword, "page": page, "url": url,
+                             "fetched_at": fetched_at, "sha256": digest})
+    return digest
+
+
+def load_index(archive_dir: str = ARCHIVE_DIR) -> List[Dict]:
+    index_path = os.path.join(archive_dir, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return []
+    with open(index_path, "r", newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def latest_pages(keyword: str, archive_dir: str = ARCHIVE_DIR) -> Dict[int, Dict]:
+    # page number -> most recent index entry for that keyword
+    pages: Dict[int, Dict] = {}
+    for entry in load_index(archive_dir):
+        if entry["keyword"] != keyword:
+            continue
+        page = int(entry["page"])
+        if page not in pages or entry["fetched_at"] >= pages[page]["fetched_at"]:
+            pages[page] = entry
+    return pages
+
+
+def open_page(digest: str, archive_dir: str = ARCHIVE_DIR):
+    # streaming text reader, the page is decompressed as it is read
+    return gzip.open(object_path(digest, archive_dir), "rt", encoding="utf-8", newline="")
+
+
+def read_page(digest: str, archive_dir: str = ARCHIVE_DIR) -> str:
+    with open_page(digest, archive_dir) as f:
+        return f.read()
+
+
+def archive_size(archive_dir: str = ARCHIVE_DIR) -> int:
+    total = 0
+    for root, _, files in os.walk(archive_dir):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def import_raw_html_dir(raw_dir: str = "../data/raw/raw_html_data", archive_dir: str = ARCHIVE_DIR,
+                        remove_source: bool = False) -> int:
+    # copies the old Raw_{keyword}_p_{n}.html/.json pairs into the archive; the
+    # .json copy has the same page, so only its url is used. Pages are read as
+    # bytes so their line endings survive, and a page already in the index is
+    # skipped. With remove_source a pair is deleted only once the stored object
+    # reads back byte for byte, and the folder when empty
+    pattern = re.compile(r"Raw_(.+)_p_(\d+)\.html$")
+    archived = {(e["keyword"], e["page"], e["sha256"]) for e in load_index(archive_dir)}
+    imported = 0
+    for name in sorted(os.listdir(raw_dir)):
+        m = pattern.match(name)
+        if not m:
+            continue
+        keyword = m.group(1).replace("_", " ")
+        page = int(m.group(2))
+        html_path = os.path.join(raw_dir, name)
+        with open(html_path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+
+        url = ""
+        json_path = html_path[:-len(".html")] + ".json"
+        if os.path.exists(json_path):
+            with open(json_path, "r", encoding="utf-8") as f:
+                url = json.load(f).get("url", "")
+
+        if (keyword, str(page), digest) not in archived:
+            fetched_at = datetime.fromtimestamp(os.path.getmtime(html_path), timezone.utc).isoformat(timespec="seconds")
+            store_page(keyword, page, url, data.decode("utf-8"), archive_dir, fetched_at=fetched_at)
+            imported += 1
+        if remove_source:
+            with gzip.open(object_path(digest, archive_dir), "rb") as f:
+                if f.read() != data:
+                    print(f" ! Archived copy of {name} differs from the original, keeping it.")
+                    continue
+            os.remove(html_path)
+            if os.path.exists(json_path):
+                os.remove(json_path)
+
+    if remove_source and not os.listdir(raw_dir):
+        os.rmdir(raw_dir)
+    print(f"Imported {imported} pages from {raw_dir} into {archive_dir} "
+          f"({archive_size(archive_dir) / 1e6:.2f} MB on disk)")
+    return imported
+
+
+if __name__ == "__main__":
+    import_raw_html_dir()
@@ -0,0 +1,524 @@
+import os
+import json
+import time
+import random
+import hashlib
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import Archive
+import Fetch
+import Scheduler
+import Clean
+import Classify_gpu
+import Storage
+import GroupStats
+import Results
+import Analysis
+import Sketches
+import Diff
+import History
+import Charts
+import Visualization_5090
+import Visualization_ssd
+import Resample
+import pandas as pd
+import numpy as np
+from RateLimit import AdaptiveRateLimiter
+
+def archived_pages(archive_dir: str = Archive.ARCHIVE_DIR):
+    # (keyword, page) -> sha256 of the latest archived copy, in keyword/page order
+    keywords = sorted({entry["keyword"] for entry in Archive.load_index(archive_dir)})
+    return {(keyword, page): entry["sha256"] for keyword in keywords
+            for page, entry in sorted(Archive.latest_pages(keyword, archive_dir).items())}
+
+
+# Local stand-in for newegg: serves the archived search pages by keyword/page.
+# It only reads archive_dir; the crawls run against it archive into their own folders
+def start_local_server(archive_dir: str = Archive.ARCHIVE_DIR, latency: float = 0.2, error_rate: float = 0.0):
+    pages = {key: Archive.read_page(digest, archive_dir).encode("utf-8")
+             for key, digest in archived_pages(archive_dir).items()}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            keyword = query.get("d", [""])[0]
+            page = int(query.get("page", ["1"])[0])
+            time.sleep(latency)
+            if random.random() < error_rate:
+                # simulated overload, the scraper should back off and retry
+                self.send_response(503)
+                self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = pages.get((keyword, page), b"<html><body></body></html>")
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench_fetch(keyword: str = "5090", pages: int = 8, concurrency_levels=(1, 4, 8), latency: float = 0.2,
+                error_rate: float = 0.0):
+    print(f" --- Fetch benchmark: '{keyword}', {pages} pages, {latency:.2f}s server latency, "
+          f"{error_rate:.0%} 503s --- ")
+    server = start_local_server(latency=latency, error_rate=error_rate)
+    start_url = f"http://127.0.0.1:{server.server_address[1]}/p/pl?d={keyword.replace(' ', '+')}"
+    try:
+        for concurrency in concurrency_levels:
+            with tempfile.TemporaryDirectory() as archive_dir:
+                t0 = time.perf_counter()
+                # the local server can take far more than newegg, so start the limiter high
+                limiter = AdaptiveRateLimiter(initial_rate=20.0, max_rate=100.0)
+                rows = Fetch.run_paginated_scraper(start_url, keyword, max_pages_limit=pages,
+                                                   concurrency=concurrency, archive_dir=archive_dir,
+                                                   limiter=limiter)
+                elapsed = time.perf_counter() - t0
+            print(f"[BENCH] concurrency={concurrency}: {len(rows)} rows in {elapsed:.2f}s "
+                  f"({pages / elapsed:.2f} pages/sec)")
+    finally:
+        server.shutdown()
+
+
+def bench_scheduler(keywords: int = 6, pages: int = 8, max_in_flight: int = 8, latency: float = 0.2,
+                    backend: str = "state"):
+    # `keywords` copies of the 5090 crawl, one after another with Fetch.run_fetch
+    # and then all together through Scheduler.run_jobs
+    print(f" --- Scheduler benchmark: {keywords} keywords x {pages} pages, {latency:.2f}s server latency --- ")
+    with tempfile.TemporaryDirectory() as source_dir, tempfile.TemporaryDirectory() as work_dir:
+        # the copies are archived under their own keywords for the server; every
+        # copy's page is the same object
+        originals = Archive.latest_pages("5090")
+        jobs = []
+        for i in range(keywords):
+            keyword = f"5090 copy{i}"
+            for page in range(1, pages + 1):
+                Archive.store_page(keyword, page, "", Archive.read_page(originals[page]["sha256"]), source_dir)
+            jobs.append({"keyword": keyword, "output_base": f"copy{i}", "page_limit": pages})
+
+        server = start_local_server(source_dir, latency=latency)
+        search_url = f"http://127.0.0.1:{server.server_address[1]}/p/pl?d="
+        archive_dir = os.path.join(work_dir, "archive")
+        try:
+            t0 = time.perf_counter()
+            for job in jobs:
+                Fetch.run_fetch(job["keyword"], os.path.join(work_dir, "serial"), job["output_base"],
+                                job["page_limit"], backend=backend, search_url=search_url, archive_dir=archive_dir,
+                                snapshot_dir=None,
+                                limiter=AdaptiveRateLimiter(initial_rate=20.0, max_rate=100.0))
+            serial = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            Scheduler.run_jobs(jobs, os.path.join(work_dir, "batch"), max_in_flight=max_in_flight,
+                               backend=backend, archive_dir=archive_dir, search_url=search_url, snapshot_dir=None,
+                               limiter=AdaptiveRateLimiter(initial_rate=20.0, max_rate=100.0))
+            batch = time.perf_counter() - t0
+        finally:
+            server.shutdown()
+
+        identical = all(
+            open(os.path.join(work_dir, "serial", f"Raw_{job['output_base']}_p{pages}.csv"), "rb").read()
+            == open(os.path.join(work_dir, "batch", f"Raw_{job['output_base']}_p{pages}.csv"), "rb").read()
+            for job in jobs)
+
+    total = keywords * pages
+    print(f"[BENCH] one keyword at a time: {serial:.2f}s ({total / serial:.2f} pages/sec)")
+    print(f"[BENCH] scheduler, {max_in_flight} in flight: {batch:.2f}s ({total / batch:.2f} pages/sec, "
+          f"{'identical CSVs' if identical else 'CSVs differ'})")
+
+
+def bench_storage(rows: int = 1_000_000, csv_path: str = "../data/processed/cleaned_2t_ssd.csv",
+                  columns=("price", "brand", "review_count", "shipping"), repeat: int = 3):
+    # the processed SSD table repeated to `rows` rows, loaded whole and projected from each format
+    base = Storage.load_table(csv_path)
+    df = pd.concat([base] * (rows // len(base) + 1), ignore_index=True).iloc[:rows]
+    print(f" --- Storage benchmark: {len(df)} rows x {len(df.columns)} columns, {repeat} rounds --- ")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for fmt in Storage.PROCESSED_FORMATS:
+            if fmt != "csv" and Storage.pyarrow is None:
+                print(f"[BENCH] {fmt:8s}: skipped (pyarrow is not installed)")
+                continue
+            table_csv = os.path.join(tmp_dir, f"{fmt}_table.csv")
+            t0 = time.perf_counter()
+            path = Storage.save_table(df, table_csv, fmt)
+            write = time.perf_counter() - t0
+            timings = []
+            for projection in (None, list(columns)):
+                t0 = time.perf_counter()
+                for _ in range(repeat):
+                    loaded = Storage.load_table(table_csv, columns=projection)
+                timings.append((time.perf_counter() - t0) / repeat)
+            print(f"[BENCH] {fmt:8s}: {os.path.getsize(path) / 1e6:7.1f} MB, write {write:.2f}s, "
+                  f"load all {timings[0]:.3f}s, load {len(loaded.columns)} columns {timings[1]:.3f}s")
+
+
+def bench_schema(rows: int = 1_000_000, csv_path: str = "../data/processed/classified_5090.csv", repeat: int = 5):
+    # default read_csv dtypes vs Storage.apply_product_schema on a product table repeated to `rows` rows
+    base = Storage.load_table(csv_path)
+    if "total_price" not in base.columns:
+        base = Clean.add_price_columns(base)
+    default = pd.concat([base] * (rows // len(base) + 1), ignore_index=True).iloc[:rows]
+    print(f" --- Schema benchmark: {len(default)} rows x {len(default.columns)} columns, {repeat} rounds --- ")
+    frames = [("default", default), ("compact", Storage.apply_product_schema(default))]
+    if Storage.pyarrow is not None:
+        frames.append(("compact+arrow", Storage.apply_product_schema(default, arrow_strings=True)))
+    for name, df in frames:
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            df.groupby("brand", observed=True)["price"].agg(["mean", "median", "count"])
+            df.groupby("category", observed=True)["total_price"].mean()
+        elapsed = (time.perf_counter() - t0) / repeat
+        print(f"[BENCH] {name:14s}: {Storage.memory_mb(df):8.1f} MB, brand + category groupby {elapsed:.3f}s")
+
+
+def bench_classify(rows: int = 1_000_000, raw_csv: str = "../data/raw/Raw_newegg_5090_results_p8.csv",
+                   workers: int = os.cpu_count() or 1):
+    # classify_gpu_logic row by row vs classify_gpu_titles on `rows` titles, once
+    # with every title distinct (serial suffix) and once as repeated listings.
+    # The compiled run starts from an empty label cache, the warm run repeats it
+    # the way the next daily snapshot would; with workers > 1 the distinct titles
+    # are also matched in a process pool.
+    raw = pd.read_csv(raw_csv).dropna(subset=["title"])
+    titles = raw["title"].tolist()
+    repeated = pd.Series([titles[i % len(titles)] for i in range(rows)], dtype="string")
+    distinct = repeated + pd.Series([f" #{i}" for i in range(rows)], dtype="string")
+    rules = Classify_gpu.gpu_rules()
+    print(f" --- Classification benchmark: {rows} titles, label cache of {rules.cache.maxsize} --- ")
+    for name, series in (("distinct", distinct), ("repeated", repeated)):
+        t0 = time.perf_counter()
+        expected = series.apply(Classify_gpu.classify_gpu_logic)
+        row_wise = time.perf_counter() - t0
+        rules.cache.clear()
+        t0 = time.perf_counter()
+        labels = Classify_gpu.classify_gpu_titles(series)
+        compiled = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        warm_labels = Classify_gpu.classify_gpu_titles(series)
+        warm = time.perf_counter() - t0
+        identical = "identical" if (labels == expected).all() and (warm_labels == expected).all() else "labels differ"
+        print(f"[BENCH] {name:8s}: row-wise {row_wise:.2f}s ({rows / row_wise:,.0f} titles/sec), "
+              f"compiled {compiled:.2f}s ({rows / compiled:,.0f} titles/sec), "
+              f"warm cache {warm:.2f}s ({rows / warm:,.0f} titles/sec, {identical})")
+    rules.cache.report(rules.family)
+
+    if workers > 1:
+        rules.cache.clear()
+        t0 = time.perf_counter()
+        pooled = rules.classify(distinct, workers=workers, chunksize=rows // workers // 2 or 1)["category"]
+        elapsed = time.perf_counter() - t0
+        identical = "identical" if (pooled == labels).all() else "labels differ"
+        print(f"[BENCH] distinct, {workers} workers: {elapsed:.2f}s ({rows / elapsed:,.0f} titles/sec, {identical})")
+
+    # the category report: one groupby and the top listings vs listing every row
+    df = pd.DataFrame({"title": distinct, "brand": [raw["brand"].iloc[i % len(raw)] for i in range(rows)],
+                       "price": np.resize(raw["price"].to_numpy(dtype=float), rows), "category": labels})
+    order = rules.labels("category")
+    for max_rows in (10, None):
+        t0 = time.perf_counter()
+        report = Classify_gpu.summarize_categories(df, order, max_rows)
+        elapsed = time.perf_counter() - t0
+        print(f"[BENCH] category report, max_rows={max_rows}: {elapsed:.2f}s ({report.count(chr(10)) + 1} lines)")
+
+
+def bench_group_stats(rows: int = 1_000_000, csv_path: str = "../data/processed/classified_5090.csv",
+                      brand_counts=(10, 100, 1000)):
+    # per-category / per-brand / per-tier price statistics on `rows` listings:
+    # a filtered copy per group (the old analyze_gpu_data loops) vs GroupStats,
+    # with the brands split into more and more groups
+    df = Storage.load_products(csv_path, columns=["title", "brand", "price", "category"], float_dtype="float64", report=False)
+    df = df.iloc[np.arange(rows) % len(df)].reset_index(drop=True)
+    df["tier"] = GroupStats.price_tiers(df["price"])
+    print(f" --- Group statistics benchmark: {rows} rows --- ")
+    base_brands = df["brand"].astype(str)
+    for brands in brand_counts:
+        splits = max(brands // base_brands.nunique(), 1)
+        df["brand"] = (base_brands + " " + pd.Series(np.arange(rows) % splits).astype(str)).astype("category")
+        t0 = time.perf_counter()
+        filtered = {}
+        for key in ("category", "brand", "tier"):
+            for group in df[key].unique():
+                prices = df[df[key] == group]["price"]
+                filtered[key, group] = (len(prices), prices.mean(), prices.median(), prices.min(), prices.max(), prices.std())
+        per_group = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        group_stats = GroupStats.GroupStats(df, ["category", "brand", "tier"])
+        engine = time.perf_counter() - t0
+        groups = sum(len(table) for table in group_stats.by.values())
+        print(f"[BENCH] {groups:5d} groups: filtered copies {per_group:.2f}s, one pass {engine:.2f}s ({per_group / engine:.1f}x)")
+
+
+def bench_results(lines: int = 200_000):
+    # report lines written the old Tee way (flush after every write) vs through
+    # a ResultsSink, which buffers and flushes once at close
+    with tempfile.TemporaryDirectory() as tmp:
+        text = [f"  Brand {i % 50}: {i} products (${i * 1.25:.2f})" for i in range(lines)]
+        t0 = time.perf_counter()
+        with open(os.path.join(tmp, "flushed.txt"), "w", encoding="utf-8") as f:
+            for line in text:
+                f.write(line)
+                f.flush()
+                f.write("\n")
+                f.flush()
+        flushed = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        with Results.ResultsSink(tmp, formats=("text",), console=False) as sink:
+            for line in text:
+                sink.print(line)
+        buffered = time.perf_counter() - t0
+        print(f"[BENCH] {lines} report lines: flush per write {flushed:.2f}s, buffered sink {buffered:.2f}s "
+              f"({flushed / buffered:.1f}x)")
+
+
+def bench_resample(csv_path: str = "../data/processed/classified_5090.csv", resamples=(10_000, 100_000), seed: int = 0):
+    # time of the resampling tests of the GPU analysis on the classified GPUs
+    df = Storage.load_products(csv_path, columns=["brand", "price", "category"], float_dtype="float64", report=False)
+    df = df[df["category"] != "Uncategorized"]
+    print(f" --- Resampling benchmark: {len(df)} GPUs in {df['category'].nunique()} categories --- ")
+    for count in resamples:
+        timings = []
+        for test in (lambda: Resample.bootstrap_ci(df["price"], df["category"], "mean", count, seed=seed),
+                     lambda: Resample.bootstrap_ci(df["price"], df["category"], "median", count, seed=seed),
+                     lambda: Resample.permutation_anova(df["price"], df["category"], count, seed=seed),
+                     lambda: Resample.pairwise_permutation(df["price"], df["category"], count, seed=seed)):
+            t0 = time.perf_counter()
+            test()
+            timings.append(time.perf_counter() - t0)
+        print(f"[BENCH] {count} resamples: bootstrap mean {timings[0]:.3f}s, median {timings[1]:.3f}s, "
+              f"permutation ANOVA / Kruskal-Wallis {timings[2]:.3f}s, pairwise {timings[3]:.3f}s")
+
+
+def bench_analysis(family_counts=(2, 8, 24), rows: int = 200, workers: int = os.cpu_count() or 1):
+    # wall time of run_families for growing numbers of product families (copies
+    # of the gpu / ssd specs, each on its own `rows`-row table), serial and in a
+    # process pool of `workers`
+    specs = Analysis.load_families()
+    with tempfile.TemporaryDirectory() as tmp:
+        families = {}
+        for i in range(max(family_counts)):
+            base = list(specs)[i % len(specs)]
+            spec = dict(specs[base], input=f"{base}_{i}.csv")
+            df = Storage.load_table(os.path.join(Analysis.PROCESSED_DIR, specs[base]["input"]), spec["columns"])
+            df.iloc[np.arange(rows) % len(df)].to_csv(os.path.join(tmp, spec["input"]), index=False)
+            families[f"{base}_{i}"] = spec
+        families_file = os.path.join(tmp, "families.json")
+        with open(families_file, "w", encoding="utf-8") as f:
+            json.dump(families, f)
+
+        print(f" --- Analysis benchmark: {rows} rows per family, {workers} workers --- ")
+        for count in family_counts:
+            names = list(families)[:count]
+            timings = []
+            for pool_size in (1, workers):
+                t0 = time.perf_counter()
+                Analysis.run_families(Results.ResultsSink(console=False), names, families_file, tmp, pool_size)
+                timings.append(time.perf_counter() - t0)
+            print(f"[BENCH] {count:3d} families: serial {timings[0]:.2f}s, {workers} workers {timings[1]:.2f}s")
+
+
+def bench_sketches(days: int = 30, rows: int = 100_000, csv_path: str = "../data/processed/cleaned_2t_ssd.csv"):
+    # a daily summary after `days` snapshots of `rows` listings: describe /
+    # quantile / nunique over the whole history vs adding the new snapshot to
+    # a MarketSummary; then the sketch's quantile and distinct-count error
+    df = Storage.load_table(csv_path, ["brand", "price", "product_url"])
+    rng = np.random.default_rng(0)
+    snapshots = []
+    for day in range(days):
+        snapshot = df.iloc[rng.integers(0, len(df), rows)].reset_index(drop=True)
+        snapshot["price"] = snapshot["price"] * rng.uniform(0.8, 1.2, rows)
+        snapshot["product_url"] = snapshot["product_url"] + f"?day={day % 7}"
+        snapshots.append(snapshot)
+    summary = Sketches.MarketSummary("bench", ["brand"])
+    for snapshot in snapshots[:-1]:
+        summary.update(snapshot)
+    history = pd.concat(snapshots, ignore_index=True)
+    print(f" --- Sketch benchmark: day {days}, {rows} new rows, {len(history)} rows of history --- ")
+
+    t0 = time.perf_counter()
+    history["price"].describe()
+    exact = history["price"].quantile([0.25, 0.5, 0.75]).to_numpy()
+    history.groupby("brand")["price"].agg(["mean", "median", "std"])
+    distinct = history["product_url"].nunique()
+    full = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    summary.update(snapshots[-1])
+    report = summary.summary()
+    incremental = time.perf_counter() - t0
+    print(f"[BENCH] daily summary: full recompute {full:.2f}s, incremental {incremental:.2f}s")
+
+    prices = np.sort(history["price"].to_numpy(dtype=float))
+    sketch = summary.metrics["price"].sketch
+    estimates = sketch.quantiles([0.25, 0.5, 0.75])
+    rank_errors = np.abs(np.searchsorted(prices, estimates) / len(prices) - np.array([0.25, 0.5, 0.75]))
+    print(f"[BENCH] quartiles {np.round(estimates, 2)} vs exact {np.round(exact, 2)}: rank error "
+          f"{rank_errors.max():.4f} (bound {sketch.rank_error():.4f}), {sum(len(items) for items in sketch.levels)} items kept")
+    estimate = report["distinct"]["product_url"]
+    print(f"[BENCH] distinct listings ~{estimate:.0f} vs exact {distinct}: error {abs(estimate - distinct) / distinct:.2%} "
+          f"(standard error {summary.distinct['product_url'].relative_error:.2%})")
+
+
+def bench_diff(rows: int = 1_000_000, raw_csv: str = "../data/raw/Raw_newegg_5090_results_p8.csv",
+               changed: float = 0.01):
+    # two snapshots of `rows` distinct listings, the second with `changed` of
+    # them repriced, re-rated, re-shipped, dropped or added; the hash-index
+    # diff against an outer merge of the two on the product key
+    raw = pd.read_csv(raw_csv, dtype=Clean.RAW_DTYPES)
+    rng = np.random.default_rng(0)
+    old = raw.iloc[rng.integers(0, len(raw), rows)].reset_index(drop=True)
+    old["product_url"] = [f"https://www.newegg.com/p/N82E{i:011d}" for i in range(rows)]
+    new = old.copy()
+    picks = rng.choice(rows, int(rows * changed * 5), replace=False).reshape(5, -1)
+    new.loc[picks[0], "price"] = new.loc[picks[0], "price"] * rng.uniform(0.8, 1.2, len(picks[0]))
+    new.loc[picks[1], "rating"] = rng.uniform(1, 5, len(picks[1])).round(1)
+    new.loc[picks[2], "review_count"] = new.loc[picks[2], "review_count"].fillna(0) + 50
+    new.loc[picks[3], "shipping"] = "$9.99 Shipping"
+    added = old.iloc[picks[4]].assign(product_url=[f"https://www.newegg.com/p/NEW{i:011d}" for i in range(len(picks[4]))])
+    new = pd.concat([new.drop(index=picks[4]), added], ignore_index=True)
+    print(f" --- Snapshot diff benchmark: {rows} listings, {changed:.0%} changed per kind --- ")
+
+    t0 = time.perf_counter()
+    old_snapshot, new_snapshot = Diff.prepare_snapshot(old), Diff.prepare_snapshot(new)
+    keyed = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    changes = Diff.diff_snapshots(old_snapshot, new_snapshot)
+    hashed = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    merged = old_snapshot.merge(new_snapshot, on="key", how="outer", suffixes=("_old", "_new"), indicator=True)
+    merged_prices = int(((merged["price_new"] - merged["price_old"]).abs() > Diff.PRICE_TOLERANCE).sum())
+    merge = time.perf_counter() - t0
+
+    counts = changes.counts()
+    print(f"[BENCH] keys + shipping costs of both snapshots: {keyed:.2f}s ({2 * rows / keyed:,.0f} rows/sec)")
+    print(f"[BENCH] hash-index diff: {hashed:.2f}s, outer merge (prices only): {merge:.2f}s")
+    print(f"[BENCH] changes: {counts} ({'prices match merge' if counts['price'] == merged_prices else 'prices differ'})")
+
+
+def bench_history(days: int = 90, rows: int = 20_000, csv_path: str = "../data/processed/classified_5090.csv",
+                  repeat: int = 20):
+    # `days` daily snapshots of `rows` products appended to a PriceHistory,
+    # then the indexed queries against the same answers from the whole
+    # history in memory (what rescanning the CSVs costs at best)
+    df = Storage.load_table(csv_path, ["title", "brand", "price", "total_price", "rating", "review_count", "category"])
+    rng = np.random.default_rng(0)
+    base = df.iloc[rng.integers(0, len(df), rows)].reset_index(drop=True)
+    base["product_url"] = [f"https://www.newegg.com/p/N82E{i:011d}" for i in range(rows)]
+    start = pd.Timestamp("2026-01-01", tz="UTC")
+    print(f" --- History benchmark: {days} days x {rows} products --- ")
+    with tempfile.TemporaryDirectory() as work_dir:
+        snapshots = []
+        t0 = time.perf_counter()
+        with History.PriceHistory(os.path.join(work_dir, "history.sqlite")) as history:
+            for day in range(days):
+                snapshot = base.assign(price=(base["price"] * rng.uniform(0.9, 1.1, rows)).round(2))
+                taken_at = (start + pd.Timedelta(days=day)).isoformat(timespec="seconds")
+                history.append("bench", snapshot, taken_at=taken_at, labels=["category"])
+                snapshots.append(snapshot.assign(taken_at=taken_at))
+            append = time.perf_counter() - t0
+            all_rows = pd.concat(snapshots, ignore_index=True)
+            url = base["product_url"].iloc[rows // 2]
+            queries = {
+                "price history of one product": (
+                    lambda: history.price_history("bench", url),
+                    lambda: all_rows.loc[all_rows["product_url"] == url, ["taken_at", "price"]]),
+                "daily median per category": (
+                    lambda: history.daily_stats("bench", "category"),
+                    lambda: all_rows.groupby(["category", all_rows["taken_at"].str[:10]])["price"].agg(["min", "median"])),
+                "30-day low of one product": (
+                    lambda: history.lowest_price("bench", url),
+                    lambda: all_rows.loc[(all_rows["product_url"] == url) &
+                                         (all_rows["taken_at"] > (start + pd.Timedelta(days=days - 31)).isoformat()), "price"].min()),
+            }
+            print(f"[BENCH] appended {days * rows:,} rows in {append:.2f}s ({days * rows / append:,.0f} rows/sec), "
+                  f"{os.path.getsize(history.db_path) / 1e6:.0f} MB")
+            for name, (indexed, scan) in queries.items():
+                t0 = time.perf_counter()
+                for _ in range(repeat):
+                    indexed()
+                indexed_ms = (time.perf_counter() - t0) / repeat * 1000
+                t0 = time.perf_counter()
+                scan()
+                scan_ms = (time.perf_counter() - t0) * 1000
+                print(f"[BENCH] {name}: {indexed_ms:.2f} ms indexed, {scan_ms:.0f} ms over the history in memory")
+            t0 = time.perf_counter()
+            lows = history.lowest_prices("bench", days=30)
+            print(f"[BENCH] 30-day low of all {len(lows)} products: {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+
+def bench_charts(workers: int = os.cpu_count() or 1):
+    # the GPU and SSD charts drawn one after another, in a process pool, and
+    # again with unchanged data (every chart skipped by its key)
+    charts = Visualization_5090.build_charts() + Visualization_ssd.build_charts()
+    print(f" --- Chart benchmark: {len([c for c in charts if c is not None])} charts, {workers} workers --- ")
+    with tempfile.TemporaryDirectory() as images_dir:
+        timings = {}
+        runs = (("serial", dict(workers=1, force=True)), (f"{workers} workers", dict(workers=workers, force=True)),
+                ("unchanged data", dict(workers=workers)))
+        for name, kwargs in runs:
+            t0 = time.perf_counter()
+            Charts.render_charts(charts, images_dir, **kwargs)
+            timings[name] = time.perf_counter() - t0
+    for name, elapsed in timings.items():
+        print(f"[BENCH] {name}: {elapsed:.2f}s")
+
+
+def bench_parsers(archive_dir: str = Archive.ARCHIVE_DIR, backends=Fetch.PARSER_BACKENDS, repeat: int = 3):
+    # DOM backends must give the same rows as the reference BeautifulSoup parser;
+    # "state" reads the embedded JSON and is expected to differ (see parse_search_page_state)
+    pages = [Archive.read_page(digest, archive_dir) for digest in archived_pages(archive_dir).values()]
+    total_mb = sum(len(html) for html in pages) / 1e6
+    print(f" --- Parser benchmark: {len(pages)} archived pages ({total_mb:.1f} MB), {repeat} rounds --- ")
+
+    reference = [Fetch.parse_search_page(html, "") for html in pages]
+    for backend in backends:
+        try:
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                parsed = [Fetch.parse_search_page(html, "", backend=backend) for html in pages]
+            elapsed = time.perf_counter() - t0
+        except ImportError as e:
+            print(f"[BENCH] {backend:8s}: skipped ({e})")
+            continue
+        rows = [row for page_rows, _ in parsed for row in page_rows]
+        reference_rows = [row for page_rows, _ in reference for row in page_rows]
+        differing = sum(a != b for a, b in zip(rows, reference_rows)) + abs(len(rows) - len(reference_rows))
+        identical = "identical" if differing == 0 else f"{differing} of {len(reference_rows)} rows differ"
+        print(f"[BENCH] {backend:8s}: {len(pages) * repeat / elapsed:7.2f} pages/sec ({identical})")
+
+
+if __name__ == "__main__":
+    bench_parsers()
+    bench_fetch()
+    bench_scheduler()
+    bench_storage()
+    bench_schema()
+    bench_classify()
+    bench_group_stats()
+    bench_results()
+    bench_resample()
+    bench_analysis()
+    bench_sketches()
+    bench_diff()
+    bench_history()
+    bench_charts()
@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import hashlib
+import inspect
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Charts are drawn in two steps: the plot module aggregates its table into the
+# small frame a chart shows (cheap, in this process), and a renderer draws
+# that frame to a PNG with the Agg backend. Each PNG is keyed by a hash of its
+# aggregate, its parameters and its renderer's module source; the keys of the
+# last render are kept in CACHE_FILE next to the images, and a chart whose key
+# did not change is not drawn again. Charts that need drawing are rendered in
+# a process pool.
+IMAGES_DIR = "../data/images"
+CACHE_FILE = ".chart_cache.json"
+
+
+class Chart:
+    # One output image: render(data, output_path, **params) draws `data` and
+    # saves it to output_path. render must be a module-level function so the
+    # process pool can pickle it.
+
+    def __init__(self, filename: str, render: Callable, data: Any, **params):
+        self.filename = filename
+        self.render = render
+        self.data = data
+        self.params = params
+
+    def key(self) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{self.filename}|{self.render.__module__}.{self.render.__qualname__}".encode("utf-8"))
+        # editing the plot module re-renders its charts
+        with open(inspect.getsourcefile(self.render), "rb") as f:
+            digest.update(f.read())
+        digest.update(matplotlib.__version__.encode("utf-8"))
+        digest.update(json.dumps(self.params, sort_keys=True, default=str).encode("utf-8"))
+        data = self.data
+        if isinstance(data, (pd.DataFrame, pd.Series)):
+            digest.update(repr((list(data.columns) if isinstance(data, pd.DataFrame) else data.name,
+                                data.index.names, [str(t) for t in pd.DataFrame(data).dtypes])).encode("utf-8"))
+            digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+        else:
+            digest.update(json.dumps(data, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+
+def load_cache(images_dir: str = IMAGES_DIR) -> Dict[str, str]:
+    path = os.path.join(images_dir, CACHE_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache: Dict[str, str], images_dir: str = IMAGES_DIR):
+    path = os.path.join(images_dir, CACHE_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _render(render: Callable, data: Any, output_path: str, params: Dict[str, Any]) -> str:
+    # draws into a temporary file renamed at the end, so a failed render never
+    # leaves a partial image; rc_context keeps one chart's style changes
+    # (e.g. seaborn's set_style) from leaking into the next chart of a worker
+    tmp_path = output_path[:-len(".png")] + ".tmp.png"
+    try:
+        with plt.rc_context():
+            render(data, tmp_path, **params)
+    finally:
+        plt.close("all")
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def render_charts(charts: List[Optional[Chart]], images_dir: str = IMAGES_DIR, workers: int = os.cpu_count() or 1,
+                  force: bool = False) -> Dict[str, str]:
+    # renders every chart whose key changed (all of them with force=True) and
+    # returns filename -> "rendered" / "unchanged"; None entries are charts a
+    # plot module had no data for
+    charts = [chart for chart in charts if chart is not None]
+    os.makedirs(images_dir, exist_ok=True)
+    t0 = time.perf_counter()
+    cache = load_cache(images_dir)
+    keys = {chart.filename: chart.key() for chart in charts}
+    status = {}
+    stale = []
+    for chart in charts:
+        if not force and cache.get(chart.filename) == keys[chart.filename] \
+                and os.path.exists(os.path.join(images_dir, chart.filename)):
+            status[chart.filename] = "unchanged"
+        else:
+            stale.append(chart)
+
+    def done(chart, output_path):
+        print(f"Saved {output_path}")
+        status[chart.filename] = "rendered"
+        cache[chart.filename] = keys[chart.filename]
+
+    try:
+        if workers > 1 and len(stale) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(stale))) as pool:
+                futures = [pool.submit(_render, chart.render, chart.data, os.path.join(images_dir, chart.filename),
+                                       chart.params) for chart in stale]
+                for chart, future in zip(stale, futures):
+                    done(chart, future.result())
+        else:
+            for chart in stale:
+                done(chart, _render(chart.render, chart.data, os.path.join(images_dir, chart.filename), chart.params))
+    finally:
+        # charts finished before a failure keep their keys
+        save_cache(cache, images_dir)
+
+    elapsed = time.perf_counter() - t0
+    rendered = sum(1 for value in status.values() if value == "rendered")
+    print(f" -- {rendered} chart(s) rendered, {len(status) - rendered} unchanged in {elapsed:.2f}s -- ")
+    return status
@@ -0,0 +1,106 @@
+import os
+import csv
+import json
+from datetime import datetime, timezone
+from typing import List, Dict, Optional
+
+
+class CheckpointedCsvSink:
+    # Streams scraped rows to the output CSV one page at a time and records the
+    # last completed page next to it ({csv}.checkpoint.json). The checkpoint also
+    # keeps the CSV size after that page, so a resumed run first cuts off rows
+    # from a page that was written but never checkpointed. finish() marks the
+    # checkpoint of a crawl that ended normally; resuming from it starts over.
+
+    def __init__(self, csv_filename: str, keyword: str, resume: bool = False):
+        self.csv_filename = csv_filename
+        self.checkpoint_filename = f"{csv_filename}.checkpoint.json"
+        self.keyword = keyword
+        self.last_page = 0
+        self.rows_written = 0
+        self.fieldnames: Optional[List[str]] = None
+        self.finished = False
+        self._file = None
+        self._writer = None
+
+        checkpoint = self._load_checkpoint() if resume else None
+        if checkpoint is not None and os.path.exists(csv_filename):
+            self.last_page = checkpoint["last_page"]
+            self.rows_written = checkpoint["rows"]
+            self.fieldnames = checkpoint["fieldnames"]
+            with open(csv_filename, "r+b") as f:
+                f.truncate(checkpoint["csv_bytes"])
+            self._open(append=True)
+            print(f" -- Resuming '{keyword}' after page {self.last_page} ({self.rows_written} rows kept) -- ")
+        elif os.path.exists(self.checkpoint_filename):
+            os.remove(self.checkpoint_filename)
+
+    @property
+    def next_page(self) -> int:
+        return self.last_page + 1
+
+    def _load_checkpoint(self) -> Optional[Dict]:
+        if not os.path.exists(self.checkpoint_filename):
+            return None
+        try:
+            with open(self.checkpoint_filename, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            print(f"[WARN] Unreadable checkpoint {self.checkpoint_filename}, starting over.")
+            return None
+        if checkpoint.get("keyword") != self.keyword:
+            print(f"[WARN] Checkpoint {self.checkpoint_filename} is for '{checkpoint.get('keyword')}', starting over.")
+            return None
+        if checkpoint.get("finished"):
+            print(f" -- The crawl in {self.checkpoint_filename} finished, starting a new one -- ")
+            return None
+        return checkpoint
+
+    def _open(self, append: bool):
+        self._file = open(self.csv_filename, "a" if append else "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+        if not append:
+            self._writer.writeheader()
+
+    def write_page(self, page: int, rows: List[Dict]):
+        if self._writer is None:
+            self.fieldnames = list(rows[0].keys())
+            directory = os.path.dirname(self.csv_filename)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            self._open(append=False)
+
+        self._writer.writerows(rows)
+        self._file.flush()
+        self.last_page = page
+        self.rows_written += len(rows)
+        self._save_checkpoint()
+
+    def _save_checkpoint(self):
+        checkpoint = {
+            "keyword": self.keyword,
+            "last_page": self.last_page,
+            "rows": self.rows_written,
+            "csv_bytes": self._file.tell(),
+            "fieldnames": self.fieldnames,
+            "finished": self.finished,
+            "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        tmp_filename = f"{self.checkpoint_filename}.tmp"
+        with open(tmp_filename, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_filename, self.checkpoint_filename)
+
+    def finish(self):
+        # the crawl reached its last page (or the end of the results): keep the
+        # checkpoint, marked finished, and close the CSV
+        if self._file is not None:
+            self.finished = True
+            self._save_checkpoint()
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
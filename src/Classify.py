@@ -0,0 +1,326 @@
+import os
+import re
+import time
+import json
+import hashlib
+import functools
+import pandas as pd
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional
+import Storage
+
+# pyarrow is optional: with it the keyword scans run as RE2 over Arrow arrays
+if Storage.pyarrow is not None:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+# the rules are configuration, not pipeline data: found next to this file so
+# classify_gpu_logic and load_rules work from any working directory
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "classify_rules.json")
+LABEL_CACHE_DIR = "../data/raw/label_cache"
+
+
+# the same whitespace for the scalar and the vectorized (RE2) normalization
+WHITESPACE = r"[ \t\n\r\f\v]"
+WHITESPACE_RUN = re.compile(WHITESPACE + "+")
+
+
+def normalize_title(title: str) -> str:
+    # the form rules are matched against and the label cache is keyed by
+    # tabs / newlines are not printable, so clean titles skip the regex
+    if "  " in title or not title.isprintable() or title.startswith(" ") or title.endswith(" "):
+        title = WHITESPACE_RUN.sub(" ", title).strip(" ")
+    return title.upper()
+
+
+def normalize_titles(titles: pd.Series) -> pd.Series:
+    # only runs of two or more and tabs / newlines are replaced; RE2 is much
+    # slower when every single space is a match
+    runs = f"{WHITESPACE}{{2,}}|[\\t\\n\\r\\f\\v]"
+    return titles.astype("string").str.replace(runs, " ", regex=True).str.strip(" ").str.upper()
+
+
+def compile_keywords(keywords: List[str]) -> str:
+    # one alternation per keyword list, longest keyword first
+    return "|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True))
+
+
+def contains_any(titles: pd.Series, pattern: str) -> np.ndarray:
+    # with pyarrow the alternation runs as one RE2 automaton over the whole
+    # column in C++, otherwise pandas applies the compiled regex per title
+    if Storage.pyarrow is not None:
+        return pc.match_substring_regex(pa.array(titles), pattern).to_numpy(zero_copy_only=False)
+    return titles.str.contains(pattern, regex=True).to_numpy(dtype=bool)
+
+
+class LabelCache:
+    # Bounded LRU of normalized title -> labels (one per rule column). The same
+    # listings come back on every page and in every daily snapshot, so most
+    # titles are looked up here instead of being matched again. The cache can
+    # be saved next to the raw data; a file written under other rules is ignored.
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+        self._labels: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def get_many(self, keys: List[str]) -> List[Optional[tuple]]:
+        if not self._labels:
+            self.stats["misses"] += len(keys)
+            return [None] * len(keys)
+        found = []
+        for key in keys:
+            labels = self._labels.get(key)
+            if labels is not None:
+                self._labels.move_to_end(key)
+            found.append(labels)
+        hits = sum(labels is not None for labels in found)
+        self.stats["hits"] += hits
+        self.stats["misses"] += len(found) - hits
+        return found
+
+    def put_many(self, keys: List[str], labels: List[np.ndarray]):
+        # `labels` holds one array per rule column, parallel to `keys`; of a
+        # batch larger than the cache only the last `maxsize` would survive
+        start = max(0, len(keys) - self.maxsize)
+        for key, row in zip(keys[start:], zip(*(column[start:] for column in labels))):
+            self._labels[key] = row
+            self._labels.move_to_end(key)
+        self.stats["evicted"] += start
+        while len(self._labels) > self.maxsize:
+            self._labels.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def clear(self):
+        self._labels.clear()
+
+    def load(self, path: str, fingerprint: str):
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            print(f"[WARN] Unreadable label cache {path}, starting empty.")
+            return
+        if saved.get("rules") != fingerprint:
+            print(f" -- Rules changed since {os.path.basename(path)} was written, starting empty -- ")
+            return
+        # saved least recently used first
+        entries = saved.get("labels", [])[-self.maxsize:]
+        self._labels = OrderedDict((key, tuple(labels)) for key, labels in entries)
+
+    def save(self, path: str, fingerprint: str):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"rules": fingerprint, "labels": [[key, list(labels)] for key, labels in self._labels.items()]}, f)
+        os.replace(tmp_path, path)
+
+    def report(self, name: str):
+        print(f" -- {name} label cache: {self.stats['hits']} hits, {self.stats['misses']} matched, "
+              f"{self.stats['evicted']} evicted, {len(self)} kept -- ")
+
+
+class RuleSet:
+    # The rules of one product family from the rules file, compiled once.
+    # Every column is an ordered list of rules; a rule matches when the
+    # normalized title contains one of its "any" keywords and every "all"
+    # keyword, and the first matching rule gives the column's label.
+
+    def __init__(self, family: str, spec: Dict, cache_size: int = 100_000):
+        self.family = family
+        self.spec = spec
+        self.input = spec["input"]
+        self.output = spec["output"]
+        self.columns = list(spec["columns"])
+        self.defaults = {column: rules["default"] for column, rules in spec["columns"].items()}
+        self.rules = {column: [(rule["label"], [keyword.upper() for keyword in rule.get("any", [])],
+                                [keyword.upper() for keyword in rule.get("all", [])])
+                               for rule in rules["rules"]]
+                      for column, rules in spec["columns"].items()}
+        # the rarer "all" keywords are scanned first, the "any" alternation last
+        self.patterns = {column: [(label, [compile_keywords([keyword]) for keyword in all_of] +
+                                   ([compile_keywords(any_of)] if any_of else []))
+                                  for label, any_of, all_of in rules]
+                         for column, rules in self.rules.items()}
+        # label -> position in labels(column); matching works on these codes
+        self.label_codes = {column: {label: code for code, label in enumerate(self.labels(column))}
+                            for column in self.columns}
+        self.fingerprint = hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+        self.cache = LabelCache(cache_size)
+
+    def labels(self, column: str) -> List[str]:
+        # every label of the column in rule order, the default last
+        ordered = list(dict.fromkeys(label for label, _, _ in self.rules[column]))
+        return ordered + [self.defaults[column]]
+
+    def match_one(self, key: str) -> Dict[str, str]:
+        # plain substring checks on one normalized title, no cache
+        result = {}
+        for column in self.columns:
+            result[column] = self.defaults[column]
+            for label, any_of, all_of in self.rules[column]:
+                if all(keyword in key for keyword in all_of) and (not any_of or any(keyword in key for keyword in any_of)):
+                    result[column] = label
+                    break
+        return result
+
+    def _match(self, keys: pd.Series) -> Dict[str, np.ndarray]:
+        # vectorized match_one as label codes: each rule only scans the titles
+        # no earlier rule of the column has claimed
+        keys = keys.reset_index(drop=True)
+        matched = {}
+        for column in self.columns:
+            codes = np.full(len(keys), self.label_codes[column][self.defaults[column]], dtype=np.int16)
+            pending = np.arange(len(keys))
+            for label, patterns in self.patterns[column]:
+                if len(pending) == 0:
+                    break
+                hit = pending
+                for pattern in patterns:
+                    if len(hit) > len(keys) // 2:
+                        # cheaper to scan every title than to copy most of them out
+                        hit = hit[contains_any(keys, pattern)[hit]]
+                    else:
+                        hit = hit[contains_any(keys.iloc[hit], pattern)]
+                    if len(hit) == 0:
+                        break
+                codes[hit] = self.label_codes[column][label]
+                claimed = np.zeros(len(keys), dtype=bool)
+                claimed[hit] = True
+                pending = pending[~claimed[pending]]
+            matched[column] = codes
+        return matched
+
+    def match_keys(self, keys: pd.Series, workers: int = 1, chunksize: int = 250_000) -> Dict[str, np.ndarray]:
+        # label codes for normalized titles. With workers > 1 the keys are split
+        # into chunks matched in a process pool, and every chunk's codes are
+        # written straight into the preallocated result arrays.
+        if workers <= 1 or len(keys) <= chunksize:
+            return self._match(keys)
+        matched = {column: np.empty(len(keys), dtype=np.int16) for column in self.columns}
+        starts = range(0, len(keys), chunksize)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.family, self.spec)) as pool:
+            chunks = pool.map(_match_chunk, (keys.iloc[start:start + chunksize] for start in starts))
+            for start, chunk in zip(starts, chunks):
+                for column in self.columns:
+                    matched[column][start:start + len(chunk[column])] = chunk[column]
+        return matched
+
+    def classify(self, titles: pd.Series, workers: int = 1, chunksize: int = 250_000) -> pd.DataFrame:
+        # one categorical label column per rule column, on the titles' index.
+        # Distinct titles are normalized once and looked up in the LRU cache;
+        # only the misses are matched (see match_keys for workers / chunksize).
+        # Missing and non-string titles get the defaults.
+        titles = pd.Series(titles)
+        codes, uniques = pd.factorize(titles)
+        uniques = pd.Series(uniques)
+        if uniques.dtype == object:
+            is_text = uniques.map(type).eq(str).to_numpy()
+            uniques = uniques.where(is_text, "")
+        keys = normalize_titles(uniques).reset_index(drop=True)
+        key_list = keys.tolist()
+
+        # label codes per distinct title plus a trailing defaults slot for code
+        # -1 (missing title); "" from non-string titles matches no rule either
+        table = {column: np.full(len(keys) + 1, self.label_codes[column][self.defaults[column]], dtype=np.int16)
+                 for column in self.columns}
+        found = self.cache.get_many(key_list)
+        hit = np.array([labels is not None for labels in found], dtype=bool)
+        hit_rows = np.flatnonzero(hit)
+        if len(hit_rows):
+            for column, values in zip(self.columns, zip(*(found[i] for i in hit_rows))):
+                table[column][hit_rows] = [self.label_codes[column][label] for label in values]
+        missing = np.flatnonzero(~hit)
+        if len(missing):
+            matched = self.match_keys(keys.iloc[missing], workers, chunksize)
+            for column in self.columns:
+                table[column][missing] = matched[column]
+            self.cache.put_many([key_list[i] for i in missing],
+                                [np.asarray(self.labels(column), dtype=object)[matched[column]] for column in self.columns])
+
+        return pd.DataFrame({column: pd.Categorical.from_codes(table[column][codes], categories=self.labels(column))
+                             for column in self.columns}, index=titles.index)
+
+    def cache_path(self, cache_dir: str = LABEL_CACHE_DIR) -> str:
+        return os.path.join(cache_dir, f"{self.family}.json")
+
+
+# the RuleSet a match_keys worker process compiled once in its initializer
+_worker_rules: Optional[RuleSet] = None
+
+
+def _init_worker(family: str, spec: Dict):
+    global _worker_rules
+    _worker_rules = RuleSet(family, spec, cache_size=0)
+
+
+def _match_chunk(keys: pd.Series) -> Dict[str, np.ndarray]:
+    return _worker_rules._match(keys)
+
+
+@functools.lru_cache(maxsize=None)
+def load_rules(rules_file: str = RULES_FILE) -> Dict[str, RuleSet]:
+    # family -> compiled RuleSet; read and compiled once per process
+    with open(rules_file, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    return {family: RuleSet(family, family_spec) for family, family_spec in spec.items()}
+
+
+def classify_family(rules: RuleSet, path: str, fmt: str = "csv", cache_dir: Optional[str] = LABEL_CACHE_DIR,
+                    workers: int = 1, chunksize: int = 250_000) -> Optional[pd.DataFrame]:
+    # adds the family's label columns to {path}/processed/{input} and saves it
+    # as {output}; cache_dir=None keeps the label cache in memory only
+    print(f" --- Classify {rules.family} --- ")
+    input_file = os.path.join(path, "processed", rules.input)
+    if not Storage.table_exists(input_file):
+        print(f"Error: {input_file} not found.")
+        return None
+
+    if cache_dir is not None and len(rules.cache) == 0:
+        rules.cache.load(rules.cache_path(cache_dir), rules.fingerprint)
+
+    # float64 so the prices are saved back unchanged; the spec_* columns Enrich
+    # saved for the table are joined in and carried into the output
+    df = Storage.merge_specs(Storage.load_products(input_file, float_dtype='float64'), input_file)
+    df = df.drop(columns=[c for c in rules.columns if c in df.columns])
+    t0 = time.perf_counter()
+    labels = rules.classify(df['title'], workers=workers, chunksize=chunksize)
+    elapsed = time.perf_counter() - t0
+    df = df.join(labels)
+    print(f"Classified {len(df)} rows in {elapsed:.2f}s ({len(df) / max(elapsed, 1e-9):,.0f} rows/sec, "
+          f"{workers} worker{'s' if workers > 1 else ''})")
+
+    output_file = Storage.save_table(df, os.path.join(path, "processed", rules.output), fmt)
+    print(f"Saved classified data to {output_file}")
+    for column in rules.columns:
+        print(f"{column}:")
+        counts = df[column].value_counts(sort=False)
+        print(counts[counts > 0].rename_axis(None).to_string())
+    rules.cache.report(rules.family)
+    if cache_dir is not None:
+        rules.cache.save(rules.cache_path(cache_dir), rules.fingerprint)
+    print("\n")
+    return df
+
+
+def run_classification(path: str, fmt: str = "csv", rules_file: str = RULES_FILE,
+                       cache_dir: Optional[str] = LABEL_CACHE_DIR, workers: int = 1,
+                       chunksize: int = 250_000) -> Dict[str, pd.DataFrame]:
+    # every product family in the rules file; a new family needs only a new entry there.
+    # workers > 1 matches large snapshots in a process pool, chunksize titles at a time
+    classified = {}
+    for family, rules in load_rules(rules_file).items():
+        df = classify_family(rules, path, fmt, cache_dir, workers, chunksize)
+        if df is not None:
+            classified[family] = df
+    return classified
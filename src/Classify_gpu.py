@@ -1,116 +1,103 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import os
+import Storage
+import Classify
+import Charts
 
-def classify_gpu_logic(title):
+def gpu_rules(rules_file=Classify.RULES_FILE):
+    # the "gpu" family of data/classify_rules.json
+    return Classify.load_rules(rules_file)["gpu"]
+
+def classify_gpu_logic(title, rules=None):
+    # rules: a compiled gpu RuleSet, gpu_rules() when not given
     if not isinstance(title, str):
         return 'Uncategorized'
-        
-    title = title.upper()
-    
-    water_cooling_keywords = [
-        'LIQUID', 'AIO', 'ARCTICSTORM', 'WATER', 'AORUS AI BOX',
-        'WATERFORCE'
-    ]
-    if 'GIGABYTE' in title and (' W-' in title or ' WB-' in title or 'WATERFORCE' in title):
-        return 'Water Cooled Flagship'
-    elif any(keyword in title for keyword in water_cooling_keywords):
-        return 'Water Cooled Flagship'
     
+    if rules is None:
+        rules = gpu_rules()
+    return rules.match_one(Classify.normalize_title(title))['category']
+
+def classify_gpu_titles(titles, rules=None):
+    # vectorized, cached classify_gpu_logic
+    if rules is None:
+        rules = gpu_rules()
+    return rules.classify(titles)['category']
 
-    flagship_air_keywords = [
-        'SUPRIM', 'ROG ASTRAL', 'AMP EXTREME', 'AORUS X', 'AORUS ST',
-        'AORUS MASTER', 'AORUS ELITE', 'XTREME'
-    ]
-    if any(keyword in title for keyword in flagship_air_keywords):
-        return 'Air Cooled Flagship'
+def summarize_categories(df, order, max_rows=10):
+    # per-category report: count and average price from one groupby plus the
+    # `max_rows` most expensive listings of each category (None lists them all)
+    stats = df.groupby('category', observed=True)['price'].agg(['count', 'mean'])
+    ranked = df[['category', 'brand', 'title', 'price']].sort_values(by='price', ascending=False, kind='stable')
+    top = ranked if max_rows is None else ranked.groupby('category', observed=True).head(max_rows)
+    listing = ("- " + top['brand'].astype(str).str.ljust(8) + ": " + top['title'].astype(str).str[:60].str.ljust(60)
+               + "... | $" + top['price'].map('{:.2f}'.format))
     
-    game_enhanced = [
-        'GAMING TRIO', 'TUF GAMING', 'VANGUARD', 'AORUS M', 'GAMING OC',
-        'AORUS', 'GAMING'
-    ]
-    if any(keyword in title for keyword in game_enhanced):
-        return 'Game-enhanced'
+    lines = []
+    for category in order:
+        if category not in stats.index:
+            continue
+        count, mean = stats.loc[category, 'count'], stats.loc[category, 'mean']
+        shown = listing[top['category'] == category]
+        lines.append(f"=== {category} ===")
+        lines.extend(shown)
+        if count > len(shown):
+            lines.append(f"  ... {count - len(shown)} more")
+        lines.append(f"Total: {count} products, Avg Price: ${mean:.2f}\n")
+    return "\n".join(lines)
+
+def report_classification(df=None, max_rows=10):
+    # category summary and bar chart of the classified GPUs
+    if df is None:
+        input_file = '../data/processed/classified_5090.csv'
+        if not Storage.table_exists(input_file):
+            print(f"Error: {input_file} not found.")
+            return
+        df = Storage.load_products(input_file, columns=['title', 'brand', 'price', 'category'],
+                                   float_dtype='float64', report=False)
     
-    basic_model = ['VENTUS', 'WINDFORCE', 'SOLID']
-    if any(keyword in title for keyword in basic_model):
-        return 'Basic'
+    order = gpu_rules().labels('category')
+    print(summarize_categories(df, order, max_rows))
     
-    return 'Uncategorized'
-
-def run_classification():
-    print(" --- Classify GPU --- ")
+    if not df.empty:
+        category_counts = df['category'].value_counts()
+        # categorical labels also count the categories nothing fell into
+        category_counts = category_counts[category_counts > 0].reindex(order).dropna()
     
-    input_file = '../data/processed/cleaned_5090.csv'
-    if not os.path.exists(input_file):
-        print(f"Error: {input_file} not found.")
-        return
+        if not category_counts.empty:
+            # skipped when the counts did not change since the last run
+            Charts.render_charts([Charts.Chart("gpu_category_distribution_basic.png", plot_category_distribution,
+                                               category_counts)], workers=1)
 
-    df = pd.read_csv(input_file)
+def plot_category_distribution(category_counts, output_path):
+    plt.figure(figsize=(12, 8))
+    bar_width = 0.5
     
-    df['category'] = df['title'].apply(classify_gpu_logic)
+    colors = plt.cm.Set3(np.arange(len(category_counts)) / len(category_counts))
     
-    output_file = '../data/processed/classified_5090.csv'
-    df.to_csv(output_file, index=False)
-    print(f"Saved classified data to {output_file}")
+    bars = plt.bar(category_counts.index, category_counts.values, 
+                width=bar_width, color=colors, 
+                linewidth=1.2, alpha=0.85)
     
-    print("Classification Statistics:")
-    print(df['category'].value_counts())
-    print("\n")
+    plt.title('GPU Category Distribution', fontsize=16, fontweight='bold', pad=20)
+    plt.xlabel('GPU Category', fontsize=12, fontweight='bold')
+    plt.ylabel('Count', fontsize=12, fontweight='bold')
+    plt.xticks(rotation=45, ha='right', fontsize=11)
+    plt.yticks(fontsize=11)
     
-    categories = df['category'].unique()
-    order = ['Water Cooled Flagship', 'Air Cooled Flagship', 'Game-enhanced', 'Basic', 'Uncategorized']
-    sorted_categories = [c for c in order if c in categories]
+    for bar, value in zip(bars, category_counts.values):
+        height = bar.get_height()
+        plt.text(bar.get_x() + bar.get_width()/2, height + max(category_counts.values)*0.01,
+                f'{value}', ha='center', va='bottom', 
+                fontsize=10, fontweight='bold')
     
-    for category in sorted_categories:
-        print(f"=== {category} ===")
-        category_df = df[df['category'] == category][['title', 'brand', 'price']]
-        category_df = category_df.sort_values(by='price', ascending=False)
-        for _, row in category_df.iterrows():
-            title_text = str(row['title'])[:60].ljust(60)
-            print(f"- {str(row['brand']):8s}: {title_text}... | ${row['price']:.2f}")
-        
-        if not category_df.empty:
-            print(f"Total: {len(category_df)} products, Avg Price: ${category_df['price'].mean():.2f}\n")
+    plt.grid(axis='y', alpha=0.3, linestyle='--')
     
-    if not df.empty:
-        plt.figure(figsize=(12, 8))
+    plt.gca().spines['top'].set_visible(False)
+    plt.gca().spines['right'].set_visible(False)
     
-        category_counts = df['category'].value_counts().reindex(order).dropna()
-    
-        if not category_counts.empty:
-            bar_width = 0.5
-            
-            colors = plt.cm.Set3(np.arange(len(category_counts)) / len(category_counts))
-            
-            bars = plt.bar(category_counts.index, category_counts.values, 
-                        width=bar_width, color=colors, 
-                        linewidth=1.2, alpha=0.85)
-            
-            plt.title('GPU Category Distribution', fontsize=16, fontweight='bold', pad=20)
-            plt.xlabel('GPU Category', fontsize=12, fontweight='bold')
-            plt.ylabel('Count', fontsize=12, fontweight='bold')
-            plt.xticks(rotation=45, ha='right', fontsize=11)
-            plt.yticks(fontsize=11)
-            
-            for bar, value in zip(bars, category_counts.values):
-                height = bar.get_height()
-                plt.text(bar.get_x() + bar.get_width()/2, height + max(category_counts.values)*0.01,
-                        f'{value}', ha='center', va='bottom', 
-                        fontsize=10, fontweight='bold')
-            
-            plt.grid(axis='y', alpha=0.3, linestyle='--')
-            
-            plt.gca().spines['top'].set_visible(False)
-            plt.gca().spines['right'].set_visible(False)
-            
-            plt.tight_layout()
-            
-            if not os.path.exists("../data/images"):
-                os.makedirs("../data/images")
-            plt.savefig('../data/images/gpu_category_distribution_basic.png')
-            plt.close()
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
 
 #if __name__ == "__main__":
-#    run_classification()
\ No newline at end of file
+#    report_classification()
\ No newline at end of file
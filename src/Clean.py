@@ -1,7 +1,69 @@
 import pandas as pd
+import numpy as np
 import os
+import time
+import Storage
 
-def run_cleaning(path: str):
+# cleaned table -> the raw scrape it is cleaned from
+RAW_SOURCES = {"cleaned_5090.csv": "Raw_newegg_5090_results_p8.csv",
+               "cleaned_2t_ssd.csv": "Raw_newegg_2tb_ssd_results_p2.csv"}
+
+# raw scrape columns, fixed so every chunk of a chunked read gets the same types
+RAW_DTYPES = {"title": "str", "product_url": "str", "brand": "str", "price": "float64",
+              "rating": "float64", "review_count": "float64", "shipping": "str"}
+
+# "$1,234.56 Shipping" -> 1234.56
+SHIPPING_COST_PATTERN = r"\$\s*([\d,]+(?:\.\d+)?)"
+
+def add_price_columns(df):
+    # numeric price, shipping_cost and total_price for every consumer, computed
+    # once with vectorized string ops; free or missing shipping counts as 0.
+    # There are only a handful of distinct shipping texts, so they are parsed
+    # once each and spread back over the rows by their factorized codes.
+    price = pd.to_numeric(df["price"], errors="coerce")
+    codes, texts = pd.factorize(df["shipping"].astype("string"))
+    texts = pd.Series(texts, dtype="string")
+    cost = texts.str.extract(SHIPPING_COST_PATTERN, expand=False).str.replace(",", "", regex=False)
+    free = texts.str.contains("Free", case=False, na=False).to_numpy(dtype=bool)
+    text_cost = np.where(free, 0.0, pd.to_numeric(cost, errors="coerce").fillna(0.0).to_numpy(dtype=float))
+    # code -1 is a missing shipping text
+    shipping_cost = np.append(text_cost, 0.0)[codes]
+    return df.assign(price=price, shipping_cost=shipping_cost, total_price=(price + shipping_cost).round(2))
+
+def clean_gpu_frame(df):
+    filtered = df[df["title"].str.contains("Graphics Card", case=False, na=False)]
+    return add_price_columns(filtered.dropna())
+
+def clean_ssd_frame(df):
+    return add_price_columns(df)
+
+def clean_in_chunks(input_path: str, output_csv: str, clean_frame, fmt: str = "csv", chunksize: int = 100_000) -> str:
+    # streams the raw CSV `chunksize` rows at a time, memory stays at about one chunk
+    t0 = time.perf_counter()
+    rows_in = 0
+    writer = Storage.TableWriter(output_csv, fmt)
+    try:
+        for chunk in pd.read_csv(input_path, chunksize=chunksize, dtype=RAW_DTYPES):
+            rows_in += len(chunk)
+            writer.write(clean_frame(chunk))
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - t0
+    size_mb = os.path.getsize(input_path) / 1e6
+    print(f"  {rows_in} rows in, {writer.rows} rows out in {elapsed:.2f}s "
+          f"({rows_in / elapsed:,.0f} rows/sec, {size_mb / elapsed:.1f} MB/sec)")
+    return writer.path
+
+def clean_file(input_path: str, output_csv: str, clean_frame, fmt: str = "csv", chunksize: int = 0) -> str:
+    if chunksize > 0:
+        return clean_in_chunks(input_path, output_csv, clean_frame, fmt, chunksize)
+    df = pd.read_csv(input_path, dtype=RAW_DTYPES)
+    return Storage.save_table(clean_frame(df), output_csv, fmt)
+
+def run_cleaning(path: str, fmt: str = "csv", chunksize: int = 0):
+    # chunksize > 0 cleans the raw files in chunks of that many rows (for raw dumps
+    # larger than memory); 0 loads each file at once
     
     data_dir = path
     input_dir = os.path.join(data_dir, 'raw')
@@ -12,28 +74,24 @@ def run_cleaning(path: str):
     print(" --- Clean GPU data --- ")
     
     # 5090 Data (p8)
-    gpu_file = "Raw_newegg_5090_results_p8.csv"
+    gpu_file = RAW_SOURCES["cleaned_5090.csv"]
     gpu_path = os.path.join(input_dir, gpu_file)
     if os.path.exists(gpu_path):
-        df = pd.read_csv(gpu_path)
-        filtered = df[df["title"].str.contains("Graphics Card", case=False, na=False)]
-        filtered = filtered.dropna()
-        filtered.to_csv(os.path.join(output_dir,"cleaned_5090.csv"), index=False)
+        saved = clean_file(gpu_path, os.path.join(output_dir, "cleaned_5090.csv"), clean_gpu_frame, fmt, chunksize)
         
 
-        print(f"Saved cleaned_5090.csv (from {output_dir})")
+        print(f"Saved {os.path.basename(saved)} (from {output_dir})")
     else:
         print(f"Warning: {gpu_file} not found.")
 
     print(" --- Clean 2T SSD --- ")
     
     # 2T SSD Data (p2)
-    ssd_file = "Raw_newegg_2tb_ssd_results_p2.csv"
+    ssd_file = RAW_SOURCES["cleaned_2t_ssd.csv"]
     ssd_path = os.path.join(input_dir, ssd_file)
     if os.path.exists(ssd_path):
-        df = pd.read_csv(ssd_path)
-        df.to_csv(os.path.join(output_dir, "cleaned_2t_ssd.csv"), index=False)
-        print(f"Saved cleaned_2t_ssd.csv (from {ssd_path})")
+        saved = clean_file(ssd_path, os.path.join(output_dir, "cleaned_2t_ssd.csv"), clean_ssd_frame, fmt, chunksize)
+        print(f"Saved {os.path.basename(saved)} (from {ssd_path})")
     else:
         print(f"Warning: {ssd_path} not found.")
 
@@ -0,0 +1,288 @@
+import os
+import gzip
+import hashlib
+import shutil
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Union
+import Clean
+import Storage
+
+# Every fetch overwrites Raw_{base}_p{N}.csv, so a gzip copy of each finished
+# scrape is kept as snapshots/{base}/{taken_at}_{digest}.csv.gz, the digest
+# being the start of the raw CSV's SHA-256; a copy of unchanged content is not
+# kept twice. Two snapshots are joined on a product key derived from
+# product_url through a hash index (pd.Index.get_indexer), one pass over each
+# snapshot, no sort and no pairwise comparison, so million-row snapshots diff
+# in seconds.
+SNAPSHOT_DIR = "../data/raw/snapshots"
+SNAPSHOT_TIME_FORMAT = "%Y%m%dT%H%M%SZ"
+# hex digits of the content digest in a snapshot name
+SNAPSHOT_DIGEST_LENGTH = 16
+
+# Newegg item number in a product URL: .../p/N82E16814137916?Item=...
+ITEM_PATTERN = r"/p/([A-Za-z0-9\-]+)"
+
+CHANGE_KINDS = ["new", "removed", "price", "availability", "rating", "reviews", "shipping"]
+
+# columns of each kind of change next to the product's key, title, brand and URL
+IDENTITY_COLUMNS = ["key", "title", "brand", "product_url"]
+CHANGE_COLUMNS = {
+    "price": ["old_price", "new_price", "price_delta", "price_pct"],
+    "availability": ["old_price", "new_price"],
+    "rating": ["old_rating", "new_rating", "rating_delta"],
+    "reviews": ["old_review_count", "new_review_count", "review_count_delta"],
+    "shipping": ["old_shipping", "new_shipping", "old_shipping_cost", "new_shipping_cost", "shipping_cost_delta"],
+}
+
+# smallest changes that are reported: any cent of price or shipping, a 0.3
+# star rating move, 10 reviews
+PRICE_TOLERANCE = 0.005
+RATING_JUMP = 0.3
+REVIEW_JUMP = 10
+
+
+def content_digest(path: str) -> str:
+    # SHA-256 of a raw CSV, or of the CSV inside a .gz snapshot
+    digest = hashlib.sha256()
+    with (gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")) as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def snapshot_path(output_base: str, taken_at: datetime, digest: str, snapshot_dir: str = SNAPSHOT_DIR) -> str:
+    name = f"{taken_at.strftime(SNAPSHOT_TIME_FORMAT)}_{digest[:SNAPSHOT_DIGEST_LENGTH]}.csv.gz"
+    return os.path.join(snapshot_dir, output_base, name)
+
+
+def snapshot_label(path: str) -> str:
+    return os.path.basename(path).split(".")[0]
+
+
+def snapshot_time(path: str) -> datetime:
+    # the UTC time a snapshot was taken, from its name
+    stamp = snapshot_label(path).split("_")[0]
+    return datetime.strptime(stamp, SNAPSHOT_TIME_FORMAT).replace(tzinfo=timezone.utc)
+
+
+def snapshot_digest(path: str) -> str:
+    # the content digest from the name; snapshots named by time only are hashed
+    parts = snapshot_label(path).split("_")
+    return parts[1] if len(parts) > 1 else content_digest(path)[:SNAPSHOT_DIGEST_LENGTH]
+
+
+def list_snapshots(output_base: str, snapshot_dir: str = SNAPSHOT_DIR) -> List[str]:
+    # oldest first: by the time in the name, then (same second) by file time
+    directory = os.path.join(snapshot_dir, output_base)
+    if not os.path.isdir(directory):
+        return []
+    paths = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".csv.gz")]
+    return sorted(paths, key=lambda path: (snapshot_label(path).split("_")[0], os.path.getmtime(path)))
+
+
+def find_snapshot(csv_path: str, output_base: str, snapshot_dir: str = SNAPSHOT_DIR) -> Optional[str]:
+    # the latest snapshot with the same content as csv_path, None if there is none
+    digest = content_digest(csv_path)[:SNAPSHOT_DIGEST_LENGTH]
+    for path in reversed(list_snapshots(output_base, snapshot_dir)):
+        if snapshot_digest(path) == digest:
+            return path
+    return None
+
+
+def save_snapshot(csv_path: str, output_base: str, snapshot_dir: str = SNAPSHOT_DIR,
+                  taken_at: Optional[datetime] = None) -> str:
+    # compressed copy of a finished raw CSV, written to a temporary file and
+    # renamed so an interrupted copy never looks like a snapshot. Nothing is
+    # written when the latest snapshot has the same content (e.g. a resumed
+    # crawl that had already finished); its path is returned instead.
+    digest = content_digest(csv_path)
+    snapshots = list_snapshots(output_base, snapshot_dir)
+    if snapshots and snapshot_digest(snapshots[-1]) == digest[:SNAPSHOT_DIGEST_LENGTH]:
+        print(f" -- {os.path.basename(csv_path)} is unchanged since snapshot {snapshot_label(snapshots[-1])} -- ")
+        return snapshots[-1]
+    taken_at = taken_at or datetime.now(timezone.utc)
+    path = snapshot_path(output_base, taken_at, digest, snapshot_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(csv_path, "rb") as src, gzip.open(tmp_path, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    os.replace(tmp_path, path)
+    print(f" -- snapshot saved to {path} -- ")
+    return path
+
+
+def product_keys(urls) -> pd.Series:
+    # stable product key: the upper-cased item number when the URL has one,
+    # otherwise the lower-cased URL without its fragment and trailing slash
+    urls = pd.Series(urls, dtype="string").str.strip()
+    keys = urls.str.extract(ITEM_PATTERN, expand=False).str.upper()
+    other = keys.isna() & urls.notna()
+    if other.any():
+        keys[other] = urls[other].str.split("#", n=1).str[0].str.rstrip("/").str.lower()
+    return keys
+
+
+def load_snapshot(path: str) -> pd.DataFrame:
+    # a snapshot (or raw CSV) keyed by product: rows without a URL are dropped
+    # and a product listed twice keeps its last listing
+    df = pd.read_csv(path, dtype=Clean.RAW_DTYPES)
+    return prepare_snapshot(df)
+
+
+def prepare_snapshot(df: pd.DataFrame) -> pd.DataFrame:
+    df = Clean.add_price_columns(df).assign(key=product_keys(df["product_url"]).to_numpy())
+    df = df[df["key"].notna()]
+    return df.drop_duplicates("key", keep="last").reset_index(drop=True)
+
+
+class ChangeSet:
+    # What changed between two snapshots of one search. frames[kind] holds one
+    # row per changed product for every kind in CHANGE_KINDS: new / removed
+    # listings with their price, and old_* / new_* values (plus deltas) for
+    # price, availability (price appeared or disappeared), rating, review
+    # count and shipping changes.
+
+    def __init__(self, frames: Dict[str, pd.DataFrame], old_rows: int, new_rows: int,
+                 old_label: str = "old", new_label: str = "new"):
+        self.frames = frames
+        self.old_rows = old_rows
+        self.new_rows = new_rows
+        self.old_label = old_label
+        self.new_label = new_label
+
+    def counts(self) -> Dict[str, int]:
+        return {kind: len(self.frames[kind]) for kind in CHANGE_KINDS}
+
+    def to_frame(self) -> pd.DataFrame:
+        # every change in one long table, the kind in the 'change' column
+        parts = [frame.assign(change=kind) for kind, frame in self.frames.items() if len(frame)]
+        if not parts:
+            return pd.DataFrame(columns=["change", "key", "title", "brand", "product_url"])
+        table = pd.concat(parts, ignore_index=True)
+        return table[["change"] + [column for column in table.columns if column != "change"]]
+
+    def report(self, top: int = 5) -> str:
+        # the alert text: counts, then the largest changes of each kind
+        counts = self.counts()
+        lines = [f"{self.old_label} -> {self.new_label}: {self.old_rows} -> {self.new_rows} listings",
+                 "  " + ", ".join(f"{counts[kind]} {kind}" for kind in CHANGE_KINDS)]
+
+        def name(row) -> str:
+            return str(row.title)[:70]
+
+        price = self.frames["price"]
+        for title, ascending in (("Biggest price drops", True), ("Biggest price increases", False)):
+            moves = price[price["price_delta"] < 0] if ascending else price[price["price_delta"] > 0]
+            if len(moves):
+                lines.append(f"  {title}:")
+                for row in moves.sort_values("price_pct", ascending=ascending).head(top).itertuples():
+                    lines.append(f"    {row.price_delta:+.2f} ({row.price_pct:+.1f}%) "
+                                 f"${row.old_price:.2f} -> ${row.new_price:.2f}  {name(row)}")
+        for kind, title in (("new", "New listings"), ("removed", "Removed listings")):
+            frame = self.frames[kind]
+            if len(frame):
+                lines.append(f"  {title}:")
+                for row in frame.head(top).itertuples():
+                    lines.append(f"    ${row.price:.2f}  {name(row)}" if pd.notna(row.price) else f"    no price  {name(row)}")
+        availability = self.frames["availability"]
+        if len(availability):
+            lines.append("  Availability:")
+            for row in availability.head(top).itertuples():
+                status = "price removed" if pd.isna(row.new_price) else f"back at ${row.new_price:.2f}"
+                lines.append(f"    {status}  {name(row)}")
+        for kind, title, column, fmt in (("rating", "Rating jumps", "rating", ".1f"),
+                                         ("reviews", "Review jumps", "review_count", ".0f")):
+            frame = self.frames[kind]
+            if len(frame):
+                lines.append(f"  {title}:")
+                largest = frame[f"{column}_delta"].abs().sort_values(ascending=False).index[:top]
+                for row in frame.loc[largest].itertuples():
+                    old, new = (getattr(row, f"{side}_{column}") for side in ("old", "new"))
+                    old, new = (f"{value:{fmt}}" if pd.notna(value) else "none" for value in (old, new))
+                    lines.append(f"    {old} -> {new}  {name(row)}")
+        shipping = self.frames["shipping"]
+        if len(shipping):
+            lines.append("  Shipping changes:")
+            for row in shipping.head(top).itertuples():
+                lines.append(f"    ${row.old_shipping_cost:.2f} -> ${row.new_shipping_cost:.2f}  {name(row)}")
+        return "\n".join(lines)
+
+
+def diff_snapshots(old: Union[str, pd.DataFrame], new: Union[str, pd.DataFrame],
+                   price_tolerance: float = PRICE_TOLERANCE, rating_jump: float = RATING_JUMP,
+                   review_jump: float = REVIEW_JUMP) -> ChangeSet:
+    # old / new are snapshot paths or frames from prepare_snapshot
+    old_label = snapshot_label(old) if isinstance(old, str) else "old"
+    new_label = snapshot_label(new) if isinstance(new, str) else "new"
+    old = load_snapshot(old) if isinstance(old, str) else old
+    new = load_snapshot(new) if isinstance(new, str) else new
+
+    # position of every new product in the old snapshot, -1 for new listings
+    position = pd.Index(old["key"]).get_indexer(new["key"])
+    matched = position >= 0
+    seen = np.zeros(len(old), dtype=bool)
+    seen[position[matched]] = True
+
+    listing = IDENTITY_COLUMNS + ["price", "rating", "review_count", "shipping"]
+    frames = {
+        "new": new.loc[~matched, listing].reset_index(drop=True),
+        "removed": old.loc[~seen, listing].reset_index(drop=True),
+    }
+
+    # matched products are compared on plain arrays, old values gathered by
+    # position; only the changed rows are built into frames
+    new_rows = np.flatnonzero(matched)
+    old_rows = position[matched]
+    sides = {"old": (old, old_rows), "new": (new, new_rows)}
+    values = {}
+    for column in ["price", "rating", "review_count", "shipping_cost"]:
+        for side, (frame, rows) in sides.items():
+            values[f"{side}_{column}"] = frame[column].to_numpy(dtype=float, na_value=np.nan)[rows]
+    for column in ["price", "rating", "shipping_cost"]:
+        values[f"{column}_delta"] = values[f"new_{column}"] - values[f"old_{column}"]
+    # a listing without a review count has no reviews yet
+    values["review_count_delta"] = np.nan_to_num(values["new_review_count"]) - np.nan_to_num(values["old_review_count"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values["price_pct"] = values["price_delta"] / values["old_price"] * 100
+        masks = {
+            "price": np.abs(values["price_delta"]) > price_tolerance,
+            "availability": np.isnan(values["old_price"]) != np.isnan(values["new_price"]),
+            "rating": np.abs(values["rating_delta"]) >= rating_jump,
+            "reviews": np.abs(values["review_count_delta"]) >= review_jump,
+            "shipping": np.abs(values["shipping_cost_delta"]) > price_tolerance,
+        }
+
+    # identity columns come from the new snapshot
+    for kind, mask in masks.items():
+        frame = new.iloc[new_rows[mask]][IDENTITY_COLUMNS].reset_index(drop=True)
+        for column in CHANGE_COLUMNS[kind]:
+            if column in values:
+                frame[column] = values[column][mask]
+            else:
+                side, name = column.split("_", 1)
+                source, rows = sides[side]
+                frame[column] = source[name].iloc[rows[mask]].to_numpy()
+        frames[kind] = frame
+    return ChangeSet(frames, len(old), len(new), old_label, new_label)
+
+
+def changes_path(path: str, output_base: str) -> str:
+    return os.path.join(path, "processed", f"changes_{output_base}.csv")
+
+
+def run_diff(path: str, output_base: str, snapshot_dir: str = SNAPSHOT_DIR, top: int = 5) -> Optional[ChangeSet]:
+    # diffs the two latest snapshots of a search, saves the change table to
+    # processed/changes_{base}.csv (read by Analysis) and prints the alert report
+    snapshots = list_snapshots(output_base, snapshot_dir)
+    if len(snapshots) < 2:
+        print(f" ! {output_base}: {len(snapshots)} snapshot(s), nothing to compare yet.")
+        return None
+    changes = diff_snapshots(snapshots[-2], snapshots[-1])
+    os.makedirs(os.path.join(path, "processed"), exist_ok=True)
+    output_csv = Storage.save_table(changes.to_frame(), changes_path(path, output_base))
+    print(f" === Changes in {output_base} ===")
+    print(changes.report(top))
+    print(f" -- {sum(changes.counts().values())} changes saved to {output_csv} -- ")
+    return changes
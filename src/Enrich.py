@@ -0,0 +1,122 @@
+import os
+import re
+import time
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from bs4 import BeautifulSoup, SoupStrainer
+from typing import List, Dict, Optional
+import Fetch
+import Storage
+from HttpCache import HttpCache
+from RateLimit import AdaptiveRateLimiter
+
+# detail pages change far less often than search results, keep them for a week
+DETAIL_TTL = 7 * 24 * 3600
+
+# spec column -> labels used for it in the "Specs" tables of newegg product pages
+SPEC_LABELS = {
+    "spec_chipset": ["GPU", "Chipset"],
+    "spec_memory_size": ["Memory Size", "Effective Memory"],
+    "spec_memory_type": ["Memory Type"],
+    "spec_boost_clock": ["Boost Clock"],
+    "spec_cooler": ["Cooler"],
+    "spec_interface": ["Interface"],
+    "spec_capacity": ["Capacity"],
+    "spec_form_factor": ["Form Factor"],
+    "spec_tbw": ["TBW", "Terabytes Written (TBW)", "Endurance (TBW)"],
+    "spec_max_read": ["Max Sequential Read"],
+    "spec_max_write": ["Max Sequential Write"],
+}
+SPEC_COLUMNS = list(SPEC_LABELS)
+LABEL_TO_COLUMN = {label.lower(): column for column, labels in SPEC_LABELS.items() for label in labels}
+
+SPEC_STRAINER = SoupStrainer("table")
+
+
+def parse_detail_specs(html: str) -> Dict[str, str]:
+    # spec tables are rows of <th>label</th><td>value</td>; the first match wins
+    # because the same label can appear again in "Additional information"
+    soup = BeautifulSoup(html, "html.parser", parse_only=SPEC_STRAINER)
+    specs: Dict[str, str] = {}
+    for tr in soup.find_all("tr"):
+        th = tr.find("th")
+        td = tr.find("td")
+        if th is None or td is None:
+            continue
+        column = LABEL_TO_COLUMN.get(th.get_text(" ", strip=True).lower())
+        if column and column not in specs:
+            specs[column] = re.sub(r"\s+", " ", td.get_text(" ", strip=True))
+    return specs
+
+
+def fetch_detail_specs(urls: List[str], concurrency: int = 4, cache: Optional[HttpCache] = None,
+                       limiter: Optional[AdaptiveRateLimiter] = None) -> Dict[str, Dict[str, str]]:
+    # product_url -> parsed specs ({} when the page could not be fetched).
+    # Pages fetched within the cache ttl are read from disk without a request.
+    if limiter is None:
+        limiter = AdaptiveRateLimiter()
+
+    def fetch_one(session, url):
+        html = Fetch.fetch_html(url, session=session, cache=cache, limiter=limiter)
+        return url, parse_detail_specs(html) if html else {}
+
+    specs: Dict[str, Dict[str, str]] = {}
+    with Fetch.make_session(concurrency) as session, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i, (url, page_specs) in enumerate(pool.map(lambda url: fetch_one(session, url), urls), 1):
+            specs[url] = page_specs
+            if i % 50 == 0 or i == len(urls):
+                print(f" - Detail pages: {i}/{len(urls)}")
+    limiter.report()
+    return specs
+
+
+def enrich_csv(csv_path: str, concurrency: int = 4, cache: Optional[HttpCache] = None,
+               limiter: Optional[AdaptiveRateLimiter] = None) -> Optional[pd.DataFrame]:
+    if not Storage.table_exists(csv_path):
+        print(f"Warning: {csv_path} not found.")
+        return None
+
+    # the specs go to their own table keyed by product_url (Storage.specs_path),
+    # in whichever format the cleaned table is stored in; Clean rewrites the
+    # cleaned table on every run and Classify merges the specs back in
+    fmt = os.path.splitext(Storage.find_table(csv_path))[1][1:]
+    df = Storage.load_table(csv_path, ["product_url"])
+    urls = df["product_url"].dropna().unique().tolist()
+    print(f" --- Enriching {os.path.basename(csv_path)}: {len(urls)} product pages, {concurrency} in flight --- ")
+
+    t0 = time.perf_counter()
+    specs = fetch_detail_specs(urls, concurrency=concurrency, cache=cache, limiter=limiter)
+    # a page that failed or had no spec table gives no row, rather than an all-empty one
+    spec_df = pd.DataFrame([{"product_url": url, **page_specs} for url, page_specs in specs.items() if page_specs],
+                           columns=["product_url"] + SPEC_COLUMNS)
+    # products no longer listed, or whose page failed this time, keep the specs of an earlier run
+    specs_file = Storage.specs_path(csv_path)
+    if Storage.table_exists(specs_file):
+        previous = Storage.load_table(specs_file)
+        spec_df = pd.concat([previous[~previous["product_url"].isin(spec_df["product_url"])], spec_df],
+                            ignore_index=True)
+    saved = Storage.save_table(spec_df, specs_file, fmt)
+
+    enriched = sum(1 for page_specs in specs.values() if page_specs)
+    print(f"Saved {os.path.basename(saved)} with specs for {enriched} of {len(urls)} products "
+          f"in {time.perf_counter() - t0:.1f}s")
+    return spec_df
+
+
+def run_enrichment(path: str, concurrency: int = 4, cache: Optional[HttpCache] = None,
+                   limiter: Optional[AdaptiveRateLimiter] = None):
+    # optional step between cleaning and classification: follows the product_url
+    # of every cleaned row and saves its spec_* columns in processed/specs_*.csv
+    output_dir = os.path.join(path, "processed")
+    if cache is None:
+        cache = HttpCache(cache_dir=os.path.join(path, "raw", "detail_cache"), ttl=DETAIL_TTL)
+    if limiter is None:
+        limiter = AdaptiveRateLimiter()
+
+    for name in ["cleaned_5090.csv", "cleaned_2t_ssd.csv"]:
+        enrich_csv(os.path.join(output_dir, name), concurrency=concurrency, cache=cache, limiter=limiter)
+    cache.report()
+
+
+if __name__ == "__main__":
+    run_enrichment("../data")
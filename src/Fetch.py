@@ -5,8 +5,26 @@ import random
 import csv
 import json
 import requests
-from bs4 import BeautifulSoup
-from typing import List, Dict, Optional
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from bs4 import BeautifulSoup, SoupStrainer
+from collections import deque
+from typing import Callable, List, Dict, Optional
+import Archive
+import Diff
+from Checkpoint import CheckpointedCsvSink
+from HttpCache import HttpCache
+from RateLimit import AdaptiveRateLimiter, RETRY_STATUSES, backoff_delay, parse_retry_after
+
+# lxml is optional: only needed for the "lxml" parser backend
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:
+    etree = None
+    lxml_html = None
+
+SEARCH_URL = "https://www.newegg.com/p/pl?d="
 
 # random User-Agent pool
 USER_AGENTS = [
@@ -21,10 +39,77 @@ def get_headers() -> Dict[str, str]:
         "Accept-Language": "en-US,en;q=0.9",
     }
 
-def fetch_html(url: str) -> Optional[str]:
+def make_session(pool_size: int = 4) -> requests.Session:
+    # one keep-alive connection pool shared by all worker threads
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_with_retry(getter, url: str, headers: Dict[str, str],
+                   limiter: Optional[AdaptiveRateLimiter] = None, max_retries: int = 3) -> requests.Response:
+    # retries network errors, 429 and 5xx with exponential backoff + jitter;
+    # the last response (or exception) is handed back to the caller
+    host = urlparse(url).netloc
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire(host)
+        started = time.monotonic()
+        try:
+            resp = getter(url, headers=headers, timeout=20)
+        except requests.exceptions.RequestException as e:
+            resp, error, status, retry_after = None, e, None, None
+        else:
+            error, status = None, resp.status_code
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+        if limiter is not None:
+            limiter.record(host, status, time.monotonic() - started, retry_after)
+
+        if status is not None and status not in RETRY_STATUSES:
+            return resp
+        if attempt == max_retries:
+            break
+
+        delay = backoff_delay(attempt)
+        if retry_after and limiter is None:
+            delay = max(delay, retry_after)
+        reason = f"HTTP {status}" if status is not None else str(error)
+        print(f" ! {reason} for {url}, retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+        if limiter is not None:
+            limiter.record_retry()
+        time.sleep(delay)
+
+    if resp is None:
+        raise error
+    return resp
+
+def fetch_html(url: str, session: Optional[requests.Session] = None,
+               cache: Optional[HttpCache] = None, limiter: Optional[AdaptiveRateLimiter] = None,
+               max_retries: int = 3) -> Optional[str]:
+    headers = get_headers()
+    cached = cache.lookup(url) if cache is not None else None
+    if cached is not None:
+        if cache.is_fresh(cached):
+            body = cache.read(url)
+            if body is not None:
+                return body
+        headers.update(cache.conditional_headers(cached))
+
     try:
-        resp = requests.get(url, headers=get_headers(), timeout=20)
+        getter = session.get if session is not None else requests.get
+        resp = get_with_retry(getter, url, headers, limiter, max_retries)
+        if resp.status_code == 304 and cached is not None:
+            body = cache.read(url, revalidated=True)
+            if body is not None:
+                return body
+            # the cached body is gone, ask again without validators
+            resp = get_with_retry(getter, url, get_headers(), limiter, max_retries)
         resp.raise_for_status()
+        if cache is not None:
+            cache.record_download()
+            if "no-store" not in resp.headers.get("Cache-Control", ""):
+                cache.store(url, resp.text, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
         return resp.text
     except requests.exceptions.RequestException as e:
         print(f"[ERROR] Failed to fetch {url}: {e}")
@@ -93,20 +178,62 @@ def parse_rating_and_reviews(block) -> tuple[Optional[float], Optional[int]]:
             reviews = int(m.group(1).replace(",", ""))
     return rating, reviews
 
-def parse_search_page(html: str, keyword: str) -> tuple[List[Dict], Optional[int]]:
-    soup = BeautifulSoup(html, "html.parser")
+PARSER_BACKENDS = ("soup", "strainer", "lxml", "state")
+
+# "strainer" backend: only the item cells and the pagination nav are turned into a tree.
+# The class is matched as a regex because newer bs4 strainers see the raw class string
+# ("item-cell is-blackfriday") instead of the split class list.
+LISTING_STRAINER = SoupStrainer(["div", "nav"], class_=re.compile(r"(^|\s)(item-cell|pagination)(\s|$)"))
+
+def parse_total_pages(text: str) -> Optional[int]:
+    m = re.search(r"of\s+(\d+)", text)
+    if m:
+        try:
+            return int(m.group(1))
+        except ValueError:
+            pass
+    return None
+
+def build_row(title: str, product_url: str, brand: Optional[str], price: Optional[float],
+              rating: Optional[float], review_count: Optional[int], shipping: str) -> Dict:
+    return {
+        "title": title,
+        "product_url": product_url,
+        "brand": brand if brand else title.split()[0],
+        "price": price,
+        "rating": rating,
+        "review_count": review_count,
+        "shipping": shipping,
+    }
+
+def parse_search_page(html: str, keyword: str, backend: str = "soup") -> tuple[List[Dict], Optional[int]]:
+    # line breaks are normalized the way an HTML parser's input stream is, so a page
+    # saved with CRLF endings (the old Windows raw_html_data copies) gives the same rows
+    if "\r" in html:
+        html = html.replace("\r\n", "\n").replace("\r", "\n")
+    if backend == "state":
+        parsed = parse_search_page_state(html, keyword)
+        if parsed is not None:
+            return parsed
+        # no usable embedded payload on this page: scrape the DOM instead
+        backend = "soup"
+    if backend == "lxml":
+        return parse_search_page_lxml(html, keyword)
+    if backend == "strainer":
+        soup = BeautifulSoup(html, "html.parser", parse_only=LISTING_STRAINER)
+        # the strained tree has no div.list-wrap ancestor left to match on
+        page_nav_span = soup.select_one("nav.pagination span.page-title")
+    elif backend == "soup":
+        soup = BeautifulSoup(html, "html.parser")
+        page_nav_span = soup.select_one("div.list-wrap nav.pagination span.page-title")
+    else:
+        raise ValueError(f"Unknown parser backend: {backend} (expected one of {PARSER_BACKENDS})")
+
     results: List[Dict] = []
     total_pages: Optional[int] = None
 
-    page_nav_span = soup.select_one("div.list-wrap nav.pagination span.page-title")
     if page_nav_span:
-        text = page_nav_span.get_text(strip=True)
-        m = re.search(r"of\s+(\d+)", text)
-        if m:
-            try:
-                total_pages = int(m.group(1))
-            except ValueError:
-                pass
+        total_pages = parse_total_pages(page_nav_span.get_text(strip=True))
     
     items = soup.select("div.item-cell")
     for item in items:
@@ -122,24 +249,214 @@ def parse_search_page(html: str, keyword: str) -> tuple[List[Dict], Optional[int
         shipping = ship.get_text(strip=True) if ship else ""
 
         brand_a = item.select_one("a.item-brand img")
-        brand = None
-        if brand_a and brand_a.get("title"):
-            brand = brand_a["title"]
-        else:
-            brand = title.split()[0]
-
-        results.append({
-            "title": title,
-            "product_url": product_url,
-            "brand": brand,
-            "price": price,
-            "rating": rating,
-            "review_count": review_count,
-            "shipping": shipping,
-        })
+        brand = brand_a["title"] if brand_a and brand_a.get("title") else None
+
+        results.append(build_row(title, product_url, brand, price, rating, review_count, shipping))
 
     return results, total_pages
 
+# "lxml" backend: same rules as the BeautifulSoup helpers above, on precompiled XPath
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+if etree is not None:
+    XP_ITEM_CELLS = etree.XPath(f"//div[{_has_class('item-cell')}]")
+    XP_PAGE_TITLE = etree.XPath(
+        f"//div[{_has_class('list-wrap')}]//nav[{_has_class('pagination')}]//span[{_has_class('page-title')}]")
+    XP_TITLE = etree.XPath(f"(.//a[{_has_class('item-title')}])[1]")
+    XP_PRICE_CURRENT = etree.XPath(f"(.//li[{_has_class('price-current')}])[1]")
+    XP_STRONG = etree.XPath("(.//strong)[1]")
+    XP_SUP = etree.XPath("(.//sup)[1]")
+    XP_PRICE_AREA = etree.XPath(f"(.//*[{_has_class('item-action')}]//*[{_has_class('price-area')}])[1]")
+    XP_DATA_PRICE = etree.XPath(f"(.//div[{_has_class('item-cell')} and @data-price])[1]")
+    XP_RATING = etree.XPath(f"(.//i[{_has_class('rating')}])[1]")
+    XP_RATING_NUM = etree.XPath(f"(.//span[{_has_class('item-rating-num')}])[1]")
+    XP_SHIP = etree.XPath(f"(.//li[{_has_class('price-ship')}])[1]")
+    XP_BRAND_IMG = etree.XPath(f"(.//a[{_has_class('item-brand')}]//img)[1]")
+
+# BeautifulSoup's get_text() leaves out comments and the contents of these tags
+LXML_SKIPPED_TEXT_TAGS = {"script", "style", "template", "rt", "rp"}
+
+def _lxml_strings(el):
+    if el.text:
+        yield el.text
+    for child in el:
+        if isinstance(child.tag, str) and child.tag not in LXML_SKIPPED_TEXT_TAGS:
+            yield from _lxml_strings(child)
+        if child.tail:
+            yield child.tail
+
+def lxml_text(el, strip: bool = False) -> str:
+    if strip:
+        return "".join(s.strip() for s in _lxml_strings(el) if s.strip())
+    return "".join(_lxml_strings(el))
+
+def _first(xpath, el):
+    found = xpath(el)
+    return found[0] if found else None
+
+def parse_price_from_element(block) -> Optional[float]:
+    price_li = _first(XP_PRICE_CURRENT, block)
+    if price_li is not None:
+        strong = _first(XP_STRONG, price_li)
+        sup = _first(XP_SUP, price_li)
+        if strong is not None:
+            main = lxml_text(strong, strip=True)
+            frac = lxml_text(sup, strip=True) if sup is not None else "00"
+            num_str = (main + frac).replace(",", "")
+            try:
+                return float(num_str[:-2] + "." + num_str[-2:])
+            except ValueError:
+                pass
+
+    price_block = _first(XP_PRICE_AREA, block)
+    search_scope = lxml_text(price_block) if price_block is not None else lxml_text(block)
+    m = re.search(r"\$\s*([\d,]+\.\d{2})", search_scope)
+    if not m:
+        m = re.search(r"\$\s*([\d,]+)", search_scope)
+    if m:
+        try:
+            return float(m.group(1).replace(",", ""))
+        except ValueError:
+            pass
+
+    price_block_div = _first(XP_DATA_PRICE, block)
+    if price_block_div is not None and price_block_div.get("data-price"):
+        try:
+            return float(price_block_div.get("data-price"))
+        except ValueError:
+            pass
+    return None
+
+def parse_rating_and_reviews_element(block) -> tuple[Optional[float], Optional[int]]:
+    rating = None
+    reviews = None
+    rating_i = _first(XP_RATING, block)
+    if rating_i is not None:
+        aria_label = rating_i.get("aria-label")
+        if aria_label:
+            m_float = re.search(r"Rated\s+([\d\.]+)\s+out", aria_label, re.IGNORECASE)
+            if m_float:
+                try:
+                    rating = float(m_float.group(1))
+                except ValueError:
+                    pass
+        if rating is None:
+            cls = " ".join(rating_i.get("class", "").split())
+            m_int = re.search(r"rating-(\d)", cls)
+            if m_int:
+                rating = float(m_int.group(1))
+
+    reviews_span = _first(XP_RATING_NUM, block)
+    if reviews_span is not None:
+        m = re.search(r"\(([\d,]+)\)", lxml_text(reviews_span, strip=True))
+        if m:
+            reviews = int(m.group(1).replace(",", ""))
+    return rating, reviews
+
+def parse_search_page_lxml(html: str, keyword: str) -> tuple[List[Dict], Optional[int]]:
+    if lxml_html is None:
+        raise ImportError("The 'lxml' parser backend needs the lxml package (pip install lxml).")
+
+    root = lxml_html.document_fromstring(html)
+    results: List[Dict] = []
+    total_pages: Optional[int] = None
+
+    page_nav_span = _first(XP_PAGE_TITLE, root)
+    if page_nav_span is not None:
+        total_pages = parse_total_pages(lxml_text(page_nav_span, strip=True))
+
+    for item in XP_ITEM_CELLS(root):
+        title_a = _first(XP_TITLE, item)
+        if title_a is None:
+            continue
+
+        title = lxml_text(title_a, strip=True)
+        product_url = title_a.get("href", "")
+        price = parse_price_from_element(item)
+        rating, review_count = parse_rating_and_reviews_element(item)
+        ship = _first(XP_SHIP, item)
+        shipping = lxml_text(ship, strip=True) if ship is not None else ""
+
+        brand_img = _first(XP_BRAND_IMG, item)
+        brand = brand_img.get("title") if brand_img is not None else None
+
+        results.append(build_row(title, product_url, brand, price, rating, review_count, shipping))
+
+    return results, total_pages
+
+# "state" backend: read the listings from the window.__initialState__ JSON the page
+# embeds for its own rendering (__neweggState__ only holds site/user settings)
+
+INITIAL_STATE_MARKER = "window.__initialState__ = "
+STATE_DECODER = json.JSONDecoder()
+
+def find_initial_state(html: str) -> Optional[Dict]:
+    start = html.find(INITIAL_STATE_MARKER)
+    if start == -1:
+        return None
+    try:
+        # raw_decode stops at the end of the object, so nothing after it is read
+        state, _ = STATE_DECODER.raw_decode(html, start + len(INITIAL_STATE_MARKER))
+    except ValueError:
+        return None
+    return state if isinstance(state, dict) else None
+
+def build_product_url(item_cell: Dict) -> str:
+    # tracking parameters on sponsored links are not part of the payload
+    item = item_cell.get("ParentItem") or item_cell.get("Item") or ""
+    if re.fullmatch(r"\d{2}-\d{3}-\d{3}", item):
+        item = "N82E168" + item.replace("-", "")
+    url_keywords = (item_cell.get("Description") or {}).get("UrlKeywords")
+    if url_keywords:
+        return f"https://www.newegg.com/{url_keywords}/p/{item}"
+    return f"https://www.newegg.com/p/{item}"
+
+def parse_state_product(product: Dict) -> Optional[Dict]:
+    item_cell = product.get("ItemCell")
+    if not item_cell or not (item_cell.get("Description") or {}).get("LineDescription"):
+        return None
+
+    title = item_cell["Description"]["LineDescription"]
+    manufactory = item_cell.get("ItemManufactory") or {}
+    # the page only shows a brand logo when ManfactoryLogo is set, otherwise the
+    # DOM parser falls back to the first word of the title, and so do we
+    brand = manufactory.get("Manufactory") if manufactory.get("ManfactoryLogo") else None
+
+    review = item_cell.get("Review") or {}
+    review_count = review.get("HumanRating") or None
+    rating = review.get("RatingOneDecimal") if review_count else None
+
+    shipping_charge = item_cell.get("ShippingCharge") or 0
+    if (item_cell.get("ItemTagFlags") or {}).get("FreeShipping"):
+        shipping = "Free Shipping"
+    elif shipping_charge > 0:
+        shipping = f"${shipping_charge:,.2f} Shipping"
+    else:
+        shipping = ""
+
+    price = item_cell.get("FinalPrice")
+    return build_row(title, build_product_url(item_cell), brand,
+                     float(price) if price is not None else None,
+                     float(rating) if rating is not None else None, review_count, shipping)
+
+def parse_search_page_state(html: str, keyword: str) -> Optional[tuple[List[Dict], Optional[int]]]:
+    # returns None when the page has no usable payload, so the caller can fall back to the DOM
+    state = find_initial_state(html)
+    if not state or not isinstance(state.get("Products"), list):
+        return None
+
+    results: List[Dict] = []
+    for product in state["Products"]:
+        row = parse_state_product(product)
+        if row is None:
+            return None
+        results.append(row)
+
+    # the payload carries no page count, same as the rendered pagination on these pages
+    return results, None
+
 def save_to_csv(data: List[Dict], filename: str):
     if not data:
         print(f"[WARN] Data is empty, skipping CSV save.")
@@ -155,45 +472,73 @@ def save_to_csv(data: List[Dict], filename: str):
     except Exception as e:
         print(f"[ERROR] Failed to save CSV file {filename}: {e}")
 
-def run_paginated_scraper(start_url: str, keyword: str, max_pages_limit: int = 0):
+def build_page_url(start_url: str, page: int) -> str:
+    if page > 1:
+        return f"{start_url}&page={page}"
+    return start_url
+
+def save_raw_html(archive_dir: str, keyword: str, page: int, url: str, html: str):
+    digest = Archive.store_page(keyword, page, url, html, archive_dir)
+    print(f"   > Archived raw HTML as {digest[:12]} in {archive_dir}")
+
+def fetch_search_page(start_url: str, keyword: str, page: int, session: Optional[requests.Session] = None,
+                      archive_dir: str = Archive.ARCHIVE_DIR, backend: str = "soup",
+                      cache: Optional[HttpCache] = None, limiter: Optional[AdaptiveRateLimiter] = None):
+    # one page of a crawl: fetch, archive, parse. page_results is None when the fetch failed
+    url = build_page_url(start_url, page)
+    html = fetch_html(url, session=session, cache=cache, limiter=limiter)
+    if not html:
+        return None, None
+    save_raw_html(archive_dir, keyword, page, url, html)
+    return parse_search_page(html, keyword, backend=backend)
+
+def run_paginated_scraper(start_url: str, keyword: str, max_pages_limit: int = 0,
+                          concurrency: int = 1, archive_dir: str = Archive.ARCHIVE_DIR,
+                          backend: str = "soup", cache: Optional[HttpCache] = None,
+                          limiter: Optional[AdaptiveRateLimiter] = None, start_page: int = 1,
+                          on_page: Optional[Callable[[int, List[Dict]], None]] = None,
+                          on_failure: Optional[Callable[[int], None]] = None):
+    # With on_page, each page's rows are handed over as soon as they are parsed
+    # and nothing is kept here, so memory does not grow with the crawl.
+    # on_failure gets the page the crawl stopped at because it could not be fetched.
+    # the limiter paces requests per host, replacing the old fixed 1-3 s sleep
+    if limiter is None:
+        limiter = AdaptiveRateLimiter()
+    if concurrency > 1:
+        results = run_concurrent_scraper(start_url, keyword, max_pages_limit, concurrency, archive_dir, backend,
+                                         cache, limiter, start_page, on_page, on_failure)
+        limiter.report()
+        return results
+
     all_results: List[Dict] = []
-    current_page = 1
+    current_page = start_page
     max_pages: Optional[int] = None
     
     limit_info = f"(Limited to {max_pages_limit} pages)" if max_pages_limit > 0 else "(Full scan)"
     print(f" --- Starting Newegg scraper for keyword: '{keyword}' {limit_info} ---")
 
-    raw_dir = "../data/raw/raw_html_data"
-    if not os.path.exists(raw_dir):
-        os.makedirs(raw_dir)
+    if not os.path.exists(archive_dir):
+        os.makedirs(archive_dir)
 
     while True:
         if max_pages_limit > 0 and current_page > max_pages_limit:
             print(f" || Reached page limit ({max_pages_limit}). Stopping.")
             break
             
-        url = start_url
-        if current_page > 1:
-            url = f"{start_url}&page={current_page}"
+        url = build_page_url(start_url, current_page)
             
         print(f" - Fetching Page {current_page} (URL: {url}...)")
         
-        html = fetch_html(url)
+        html = fetch_html(url, cache=cache, limiter=limiter)
         if not html:
             print(" ! Failed to retrieve HTML. Stopping.")
+            if on_failure is not None:
+                on_failure(current_page)
             break
 
-        raw_filename = os.path.join(raw_dir, f"Raw_{keyword.replace(' ', '_')}_p_{current_page}.html")
-        with open(raw_filename, 'w', encoding='utf-8') as f:
-            f.write(html)
-        print(f"   > Saved raw HTML to {raw_filename}")
-
-        #json_filename = os.path.join(raw_dir, f"Raw_{keyword.replace(' ', '_')}_p_{current_page}.json")
-        #with open(json_filename, 'w', encoding='utf-8') as f:
-        #    json.dump({"url": url, "html": html}, f)
-        #print(f"   > Saved raw JSON to {json_filename}")
+        save_raw_html(archive_dir, keyword, current_page, url, html)
             
-        page_results, parsed_total_pages = parse_search_page(html, keyword)
+        page_results, parsed_total_pages = parse_search_page(html, keyword, backend=backend)
         
         if parsed_total_pages and max_pages is None:
             max_pages = parsed_total_pages
@@ -203,33 +548,135 @@ def run_paginated_scraper(start_url: str, keyword: str, max_pages_limit: int = 0
             print("Error: No items found on this page. Stopping.")
             break
             
-        all_results.extend(page_results)
+        if on_page is not None:
+            on_page(current_page, page_results)
+        else:
+            all_results.extend(page_results)
         
         if max_pages is not None and current_page >= max_pages:
             print(" - Reached the last page reported by the site. Stopping.")
             break
             
         current_page += 1
-        time.sleep(random.uniform(1.0, 3.0)) 
 
+    limiter.report()
     return all_results
 
-def run_fetch(keyword: str, output_path: str, output_base: str, page_limit: int):
+def run_concurrent_scraper(start_url: str, keyword: str, max_pages_limit: int = 0,
+                           concurrency: int = 4, archive_dir: str = Archive.ARCHIVE_DIR,
+                           backend: str = "soup", cache: Optional[HttpCache] = None,
+                           limiter: Optional[AdaptiveRateLimiter] = None, start_page: int = 1,
+                           on_page: Optional[Callable[[int, List[Dict]], None]] = None,
+                           on_failure: Optional[Callable[[int], None]] = None):
+    # The first page is fetched alone to learn total_pages, the rest go out
+    # `concurrency` at a time over one pooled session. Pages are merged back
+    # in page order and the crawl stops at the first failed/empty page, so
+    # the rows match the sequential scraper.
+    all_results: List[Dict] = []
+
+    limit_info = f"(Limited to {max_pages_limit} pages)" if max_pages_limit > 0 else "(Full scan)"
+    print(f" --- Starting concurrent Newegg scraper for keyword: '{keyword}' {limit_info}, "
+          f"{concurrency} in flight ---")
+
+    if max_pages_limit > 0 and start_page > max_pages_limit:
+        print(f" || Reached page limit ({max_pages_limit}). Stopping.")
+        return all_results
+    if not os.path.exists(archive_dir):
+        os.makedirs(archive_dir)
+    if limiter is None:
+        limiter = AdaptiveRateLimiter()
+
+    def fetch_page(session, page):
+        print(f" - Fetching Page {page} (URL: {build_page_url(start_url, page)}...)")
+        page_results, parsed_total_pages = fetch_search_page(start_url, keyword, page, session, archive_dir,
+                                                             backend, cache, limiter)
+        return page, page_results, parsed_total_pages
+
+    def keep(page, page_results):
+        if on_page is not None:
+            on_page(page, page_results)
+        else:
+            all_results.extend(page_results)
+
+    with make_session(concurrency) as session, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        _, page_results, max_pages = fetch_page(session, start_page)
+        if page_results is None:
+            print(" ! Failed to retrieve HTML. Stopping.")
+            if on_failure is not None:
+                on_failure(start_page)
+            return all_results
+        if not page_results:
+            print("Error: No items found on this page. Stopping.")
+            return all_results
+        keep(start_page, page_results)
+
+        last_page = max_pages or 0
+        if max_pages:
+            print(f" -- Total pages detected: {max_pages} -- ")
+        if max_pages_limit > 0:
+            last_page = min(last_page, max_pages_limit) if last_page else max_pages_limit
+
+        # a sliding window of in-order futures: at most 2 x concurrency parsed
+        # pages wait in memory, and with no known last page we never probe
+        # further than the window past the end
+        pending = deque()
+        next_page = start_page + 1
+        while True:
+            while len(pending) < 2 * concurrency and (not last_page or next_page <= last_page):
+                pending.append(pool.submit(fetch_page, session, next_page))
+                next_page += 1
+            if not pending:
+                print(" - Reached the last page. Stopping.")
+                break
+
+            page, page_results, _ = pending.popleft().result()
+            if page_results is None:
+                print(f" ! Failed to retrieve HTML for page {page}. Stopping.")
+                if on_failure is not None:
+                    on_failure(page)
+                break
+            if not page_results:
+                print(f"Error: No items found on page {page}. Stopping.")
+                break
+            keep(page, page_results)
+
+        for future in pending:
+            future.cancel()
+
+    return all_results
+
+def run_fetch(keyword: str, output_path: str, output_base: str, page_limit: int, concurrency: int = 1,
+              backend: str = "soup", cache: Optional[HttpCache] = None,
+              limiter: Optional[AdaptiveRateLimiter] = None, resume: bool = False,
+              search_url: str = SEARCH_URL, archive_dir: str = Archive.ARCHIVE_DIR,
+              snapshot_dir: Optional[str] = Diff.SNAPSHOT_DIR):
     # url encode the keyword: transform spaces to '+'
-    base_url = f"https://www.newegg.com/p/pl?d={keyword.replace(' ', '+')}"
-    
-    data = run_paginated_scraper(base_url, keyword, max_pages_limit=page_limit)
+    base_url = f"{search_url}{keyword.replace(' ', '+')}"
 
-    data_dir = output_path
-    
-    if data:
-        # name format of files: Raw_{base}_p{limit}.csv
-        if not os.path.exists(data_dir):
-            os.makedirs(data_dir)
-
-        csv_filename = os.path.join(data_dir, f"Raw_{output_base}_p{page_limit}.csv")
-        print(f"\n --- Saving Data --- ")
-        save_to_csv(data, csv_filename)
+    # name format of files: Raw_{base}_p{limit}.csv
+    csv_filename = os.path.join(output_path, f"Raw_{output_base}_p{page_limit}.csv")
+
+    # rows are appended page by page and checkpointed, resume=True continues after the last saved page;
+    # a crawl that was not cut short by a failed page marks its checkpoint finished
+    sink = CheckpointedCsvSink(csv_filename, keyword, resume=resume)
+    failed_pages: List[int] = []
+    try:
+        run_paginated_scraper(base_url, keyword, max_pages_limit=page_limit, concurrency=concurrency,
+                              archive_dir=archive_dir, backend=backend, cache=cache, limiter=limiter,
+                              start_page=sink.next_page, on_page=sink.write_page, on_failure=failed_pages.append)
+        if not failed_pages:
+            sink.finish()
+    finally:
+        sink.close()
+    if cache is not None:
+        cache.report()
+
+    if sink.rows_written:
+        print(f" === {sink.rows_written} rows saved to {csv_filename} (through page {sink.last_page}) === ")
+        # the next fetch overwrites csv_filename, keep a dated copy for Diff (snapshot_dir=None skips it);
+        # a resumed crawl that had already finished has the latest snapshot's content and adds none
+        if snapshot_dir is not None:
+            Diff.save_snapshot(csv_filename, output_base, snapshot_dir)
         print("="*80, "\n")
     else:
         print(f" ! No data fetched for {keyword}.")
\ No newline at end of file
@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+from typing import Dict, List, Sequence, Tuple
+
+# GPU price tiers: the lower bound of every tier after the first
+PRICE_TIER_EDGES = [1000, 1500, 2000]
+PRICE_TIER_LABELS = ['Budget (<$1000)', 'Mid-range ($1000-$1500)', 'High-end ($1500-$2000)', 'Premium (≥$2000)']
+
+STAT_COLUMNS = ['rows', 'count', 'mean', 'median', 'min', 'max', 'std']
+
+
+def price_tiers(prices, edges: Sequence[float] = PRICE_TIER_EDGES,
+                labels: Sequence[str] = PRICE_TIER_LABELS) -> pd.Categorical:
+    # tier i holds edges[i-1] <= price < edges[i]; a missing price has no tier
+    prices = np.asarray(prices, dtype=float)
+    codes = np.searchsorted(edges, prices, side='right')
+    codes = np.where(np.isnan(prices), -1, codes)
+    return pd.Categorical.from_codes(codes, categories=list(labels))
+
+
+class GroupStats:
+    # Statistics of one value column per group of several keys, computed from a
+    # single groupby over the key combinations ("cells"). Each key's table is a
+    # roll-up of the cells, and all medians reuse one sort of the values, so the
+    # cost is linear in rows however many groups the keys have. `means` are
+    # further numeric columns whose per-group mean and non-null count are kept,
+    # `counts` columns of any type whose non-null count is kept.
+    #
+    #   by[key]: one row per observed group with rows (all rows), count
+    #            (non-null values), mean, median, min, max, std (ddof=1) and
+    #            {column}_mean / {column}_count for every column in `means`
+    #            and {column}_count for every column in `counts`
+    #   overall: the same statistics over all rows
+
+    def __init__(self, df: pd.DataFrame, keys: List[str], value: str = 'price', means: Sequence[str] = (),
+                 counts: Sequence[str] = ()):
+        self.keys = list(keys)
+        self.value = value
+        self.means = list(means)
+        self.counts = [column for column in counts if column not in self.means]
+        values = pd.to_numeric(df[value], errors='coerce').to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+
+        # per key: integer codes with a trailing level for a missing key
+        self.levels: Dict[str, pd.Index] = {}
+        self._codes: Dict[str, np.ndarray] = {}
+        for key in self.keys:
+            column = df[key]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                codes, levels = column.cat.codes.to_numpy(dtype=np.int64), column.cat.categories
+            else:
+                codes, levels = pd.factorize(column, sort=True)
+                codes = codes.astype(np.int64)
+            codes[codes < 0] = len(levels)
+            self.levels[key] = pd.Index(levels, name=key)
+            self._codes[key] = codes
+
+        cell = np.zeros(len(df), dtype=np.int64)
+        for key in self.keys:
+            cell = cell * (len(self.levels[key]) + 1) + self._codes[key]
+
+        # values are centered on their mean so the sums of squares keep their precision
+        self._center = values[valid].mean() if valid.any() else 0.0
+        centered = values - self._center
+        columns = {'cell': cell, 'value': values, 'centered': centered, 'squared': centered ** 2}
+        aggregations = {'rows': ('value', 'size'), 'count': ('value', 'count'), 'sum': ('centered', 'sum'),
+                        'sumsq': ('squared', 'sum'), 'min': ('value', 'min'), 'max': ('value', 'max')}
+        for column in self.means:
+            columns[column] = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+            aggregations[f'{column}_sum'] = (column, 'sum')
+            aggregations[f'{column}_count'] = (column, 'count')
+        for column in self.counts:
+            columns[f'{column}_present'] = df[column].notna().to_numpy(dtype=np.int64)
+            aggregations[f'{column}_count'] = (f'{column}_present', 'sum')
+        self.cells = pd.DataFrame(columns).groupby('cell', sort=True).agg(**aggregations)
+
+        # the key codes of every cell, peeled off the combined cell code
+        remainder = self.cells.index.to_numpy()
+        self._cell_codes: Dict[str, np.ndarray] = {}
+        for key in reversed(self.keys):
+            size = len(self.levels[key]) + 1
+            self._cell_codes[key] = remainder % size
+            remainder = remainder // size
+
+        # one sort of the values for every key's medians; missing values sort last
+        order = np.argsort(values, kind='stable')[:int(valid.sum())]
+        self._sorted_values = values[order]
+        self._order = order
+
+        self.by: Dict[str, pd.DataFrame] = {key: self._roll_up(key) for key in self.keys}
+        self.overall = self._finish(self.cells.sum().to_frame().T.assign(min=self.cells['min'].min(),
+                                                                           max=self.cells['max'].max()),
+                                    np.array([self._median(self._sorted_values)])).iloc[0]
+
+    def _finish(self, sums: pd.DataFrame, medians: np.ndarray) -> pd.DataFrame:
+        count = sums['count'].to_numpy(dtype=float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_offset = sums['sum'].to_numpy() / count
+            variance = (sums['sumsq'].to_numpy() - sums['sum'].to_numpy() * mean_offset) / (count - 1)
+        table = pd.DataFrame({
+            'rows': sums['rows'].astype(int).to_numpy(),
+            'count': sums['count'].astype(int).to_numpy(),
+            'mean': self._center + mean_offset,
+            'median': medians,
+            'min': sums['min'].to_numpy(),
+            'max': sums['max'].to_numpy(),
+            'std': np.sqrt(np.where(count > 1, np.maximum(variance, 0.0), np.nan)),
+        }, index=sums.index)
+        for column in self.means:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                table[f'{column}_mean'] = (sums[f'{column}_sum'] / sums[f'{column}_count']).to_numpy()
+            table[f'{column}_count'] = sums[f'{column}_count'].astype(int).to_numpy()
+        for column in self.counts:
+            table[f'{column}_count'] = sums[f'{column}_count'].astype(int).to_numpy()
+        return table
+
+    def _roll_up(self, key: str) -> pd.DataFrame:
+        size = len(self.levels[key]) + 1
+        grouped = self.cells.groupby(self._cell_codes[key], sort=True)
+        sums = grouped.sum().drop(columns=['min', 'max']).join(grouped['min'].min()).join(grouped['max'].max())
+        # only observed groups, and not the missing-key level
+        sums = sums[(sums['rows'] > 0) & (sums.index < size - 1)]
+
+        # medians: group the value-sorted rows by key code (a stable sort keeps
+        # them sorted inside each group) and take the middle of every group
+        codes = self._codes[key][self._order]
+        grouped_values = self._sorted_values[np.argsort(codes, kind='stable')]
+        counts = np.bincount(codes, minlength=size)
+        starts = np.cumsum(counts) - counts
+        medians = np.full(size, np.nan)
+        has_values = counts > 0
+        low = starts + (counts - 1) // 2
+        high = starts + counts // 2
+        medians[has_values] = (grouped_values[low[has_values]] + grouped_values[high[has_values]]) / 2
+
+        table = self._finish(sums, medians[sums.index.to_numpy()])
+        table.index = self.levels[key][sums.index.to_numpy()]
+        return table
+
+    @staticmethod
+    def _median(sorted_values: np.ndarray) -> float:
+        if len(sorted_values) == 0:
+            return np.nan
+        return (sorted_values[(len(sorted_values) - 1) // 2] + sorted_values[len(sorted_values) // 2]) / 2
+
+    def nunique(self, key: str, other: str) -> pd.Series:
+        # distinct non-missing `other` values per `key` group, from the cells
+        cells = pd.DataFrame({key: self._cell_codes[key], other: self._cell_codes[other]})
+        cells = cells[(self.cells['rows'].to_numpy() > 0) & (cells[other] < len(self.levels[other]))]
+        counts = cells.drop_duplicates().groupby(key).size()
+        counts = counts[counts.index < len(self.levels[key])]
+        counts.index = self.levels[key][counts.index.to_numpy()]
+        return counts.reindex(self.by[key].index, fill_value=0)
+
+    def pooled_mean(self, key: str, groups: Sequence[str]) -> float:
+        # mean value over all rows of the given groups
+        table = self.by[key].reindex([g for g in groups if g in self.by[key].index])
+        return float((table['mean'] * table['count']).sum() / table['count'].sum())
+
+    def anova(self, key: str, groups: Sequence[str]) -> Tuple[float, float]:
+        # one-way ANOVA of the value across the given groups, from the group
+        # counts, means and variances (same F and p as scipy.stats.f_oneway)
+        table = self.by[key].reindex([g for g in groups if g in self.by[key].index])
+        count, mean, variance = table['count'].to_numpy(), table['mean'].to_numpy(), table['std'].fillna(0).to_numpy() ** 2
+        total = count.sum()
+        grand_mean = (count * mean).sum() / total
+        between = (count * (mean - grand_mean) ** 2).sum()
+        within = ((count - 1) * variance).sum()
+        df_between, df_within = len(table) - 1, total - len(table)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            f_stat = (between / df_between) / (within / df_within)
+        return float(f_stat), float(stats.f.sf(f_stat, df_between, df_within))
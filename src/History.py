@@ -0,0 +1,322 @@
+import os
+import re
+import sqlite3
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+import Classify
+import Clean
+import Diff
+import GroupStats
+import Sketches
+import Storage
+
+# Every classified snapshot is appended to one SQLite file, so prices can be
+# followed over time without keeping or rescanning old CSVs:
+#   snapshots            one row per scrape of a family (family, taken_at), with
+#                        the digest of the table appended for it
+#   products             one row per product of a family, keyed like Diff (item number)
+#   observations_{family} one row per product per snapshot: price, total_price,
+#                        rating, review_count, brand and the family's label columns
+#   daily_stats          count / min / median / mean / max price per day, overall
+#                        and per brand / label, refreshed for the day of each append
+# Product and time lookups go through indexes, so a query reads only the rows it
+# returns, however many snapshots the file holds.
+HISTORY_DB = "../data/processed/history.sqlite"
+
+OBSERVATION_METRICS = ["price", "total_price", "rating", "review_count"]
+# daily_stats key / value of the all-products row
+ALL = "all"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    family TEXT NOT NULL,
+    taken_at TEXT NOT NULL,
+    source TEXT,
+    digest TEXT,
+    rows INTEGER NOT NULL,
+    UNIQUE (family, taken_at)
+);
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    family TEXT NOT NULL,
+    key TEXT NOT NULL,
+    product_url TEXT,
+    title TEXT,
+    brand TEXT,
+    UNIQUE (family, key)
+);
+CREATE TABLE IF NOT EXISTS daily_stats (
+    family TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    min REAL,
+    median REAL,
+    mean REAL,
+    max REAL,
+    PRIMARY KEY (family, key, value, day)
+) WITHOUT ROWID;
+"""
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def utc_timestamp(taken_at: str) -> str:
+    # ISO time in UTC to the second, the form taken_at is stored and compared
+    # in; a time without an offset is taken as UTC
+    when = datetime.fromisoformat(taken_at)
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.astimezone(timezone.utc).isoformat(timespec="seconds")
+
+
+def scrape_time(path: str, rules, snapshot_dir: str = Diff.SNAPSHOT_DIR) -> Optional[str]:
+    # when the raw data behind a family's table was scraped: the time of the
+    # snapshot with the raw CSV's content, else the raw CSV's modification
+    # time; None when the raw CSV is unknown or missing
+    raw_name = Clean.RAW_SOURCES.get(rules.input)
+    raw_path = os.path.join(path, "raw", raw_name) if raw_name else None
+    if raw_path is None or not os.path.exists(raw_path):
+        return None
+    output_base = re.fullmatch(r"Raw_(.+)_p\d+\.csv", raw_name).group(1)
+    snapshot = Diff.find_snapshot(raw_path, output_base, snapshot_dir)
+    if snapshot is not None:
+        return Diff.snapshot_time(snapshot).isoformat(timespec="seconds")
+    return datetime.fromtimestamp(os.path.getmtime(raw_path), timezone.utc).isoformat(timespec="seconds")
+
+
+def _table(family: str) -> str:
+    # family names become table names, so only plain identifiers are accepted
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", family):
+        raise ValueError(f"Invalid family name '{family}' (letters, digits and '_' only)")
+    return f"observations_{family}"
+
+
+def _rows(df: pd.DataFrame):
+    # row tuples for sqlite: NaN / NA become NULL, numpy values Python ones
+    df = df.astype(object)
+    return df.where(df.notna(), None).itertuples(index=False, name=None)
+
+
+class PriceHistory:
+    # The history file: append() adds one snapshot of a family, the query
+    # methods return DataFrames (or a dict for a single product's low).
+    # Usable as a context manager.
+
+    def __init__(self, db_path: str = HISTORY_DB):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # 64 MB of page cache keeps the indexes' hot pages in memory while appending
+        self.conn.execute("PRAGMA cache_size=-65536")
+        self.conn.executescript(SCHEMA)
+
+    def _observation_columns(self, family: str) -> List[str]:
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info({_table(family)})")]
+
+    def _ensure_observations(self, family: str, labels: List[str]):
+        table = _table(family)
+        columns = self._observation_columns(family)
+        if not columns:
+            metrics = ", ".join(f"{metric} REAL" for metric in OBSERVATION_METRICS)
+            self.conn.execute(f"CREATE TABLE {table} (snapshot_id INTEGER NOT NULL, product_id INTEGER NOT NULL, "
+                              f"taken_at TEXT NOT NULL, {metrics}, brand TEXT)")
+            # covers the per-product price queries without reading the table
+            self.conn.execute(f"CREATE INDEX {table}_product ON {table} (product_id, taken_at, price)")
+            self.conn.execute(f"CREATE INDEX {table}_taken_at ON {table} (taken_at)")
+            columns = self._observation_columns(family)
+        # a label column added to the rules later is added here, empty for older rows
+        for label in labels:
+            if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", label):
+                raise ValueError(f"Invalid label column '{label}'")
+            if label not in columns:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {label} TEXT")
+
+    def labels(self, family: str) -> List[str]:
+        # the family's label columns, after the fixed ones
+        fixed = ["snapshot_id", "product_id", "taken_at", "brand"] + OBSERVATION_METRICS
+        return [column for column in self._observation_columns(family) if column not in fixed]
+
+    def append(self, family: str, df: pd.DataFrame, taken_at: str, source: Optional[str] = None,
+               digest: Optional[str] = None, labels: Optional[List[str]] = None) -> int:
+        # adds the snapshot scraped at taken_at, an ISO time, and refreshes its
+        # day's statistics. A scrape is in the file once: appending it again
+        # (re-classified, say) replaces its observations, unless the table's
+        # digest is unchanged. Returns the rows added, 0 when unchanged
+        if not taken_at:
+            raise ValueError("taken_at is required: the time the snapshot was scraped, not the time of the append")
+        taken_at = utc_timestamp(taken_at)
+        day = taken_at[:10]
+        table = _table(family)
+        labels = [label for label in (labels or []) if label in df.columns]
+        previous = self.conn.execute("SELECT id, digest FROM snapshots WHERE family = ? AND taken_at = ?",
+                                     (family, taken_at)).fetchone()
+        if previous is not None and digest is not None and previous[1] == digest:
+            return 0
+
+        # one observation per product, the last listing of a product listed twice
+        df = df.assign(key=Diff.product_keys(df["product_url"]).to_numpy())
+        df = df[df["key"].notna()].drop_duplicates("key", keep="last")
+        products = pd.DataFrame({"family": family, "key": df["key"].to_numpy()})
+        for column in ["product_url", "title", "brand"]:
+            products[column] = df[column].to_numpy() if column in df.columns else None
+        with self.conn:
+            self._ensure_observations(family, labels)
+            if previous is not None:
+                self.conn.execute(f"DELETE FROM {table} WHERE taken_at = ? AND snapshot_id = ?",
+                                  (taken_at, previous[0]))
+                self.conn.execute("DELETE FROM snapshots WHERE id = ?", (previous[0],))
+            snapshot_id = self.conn.execute(
+                "INSERT INTO snapshots (family, taken_at, source, digest, rows) VALUES (?, ?, ?, ?, ?)",
+                (family, taken_at, source, digest, len(df))).lastrowid
+            self.conn.executemany(
+                "INSERT INTO products (family, key, product_url, title, brand) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (family, key) DO UPDATE SET product_url = excluded.product_url, "
+                "title = excluded.title, brand = excluded.brand WHERE product_url IS NOT excluded.product_url "
+                "OR title IS NOT excluded.title OR brand IS NOT excluded.brand",
+                _rows(products))
+            ids = dict(self.conn.execute("SELECT key, id FROM products WHERE family = ?", (family,)))
+
+            observations = pd.DataFrame({"snapshot_id": snapshot_id, "product_id": df["key"].map(ids).to_numpy(),
+                                         "taken_at": taken_at})
+            for column in OBSERVATION_METRICS:
+                observations[column] = (pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+                                        if column in df.columns else np.nan)
+            for column in ["brand"] + labels:
+                observations[column] = df[column].to_numpy() if column in df.columns else None
+            self.conn.executemany(f"INSERT INTO {table} ({', '.join(observations.columns)}) "
+                                  f"VALUES ({', '.join('?' * len(observations.columns))})", _rows(observations))
+            self._refresh_day(family, day)
+        return len(df)
+
+    def _refresh_day(self, family: str, day: str):
+        # the day's statistics from every observation of that day (all of the
+        # day's snapshots), overall and per brand / label
+        keys = ["brand"] + self.labels(family)
+        next_day = (datetime.fromisoformat(day) + timedelta(days=1)).date().isoformat()
+        day_rows = pd.read_sql_query(f"SELECT price, {', '.join(keys)} FROM {_table(family)} "
+                                     "WHERE taken_at >= ? AND taken_at < ?", self.conn, params=(day, next_day))
+        stats = GroupStats.GroupStats(day_rows, keys, value="price")
+        rows = [(family, ALL, ALL, day, int(stats.overall["count"]), stats.overall["min"], stats.overall["median"],
+                 stats.overall["mean"], stats.overall["max"])]
+        for key in keys:
+            for value, group in stats.by[key].iterrows():
+                if pd.notna(value):
+                    rows.append((family, key, str(value), day, int(group["count"]), group["min"], group["median"],
+                                 group["mean"], group["max"]))
+        rows = [tuple(None if isinstance(v, float) and np.isnan(v) else v for v in row) for row in rows]
+        self.conn.execute("DELETE FROM daily_stats WHERE family = ? AND day = ?", (family, day))
+        self.conn.executemany("INSERT INTO daily_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def snapshots(self, family: Optional[str] = None) -> pd.DataFrame:
+        query = "SELECT * FROM snapshots" + (" WHERE family = ?" if family else "") + " ORDER BY taken_at"
+        return pd.read_sql_query(query, self.conn, params=(family,) if family else ())
+
+    def _product_id(self, family: str, product_url: str) -> Optional[int]:
+        key = Diff.product_keys([product_url]).iloc[0]
+        row = self.conn.execute("SELECT id FROM products WHERE family = ? AND key = ?", (family, key)).fetchone()
+        return row[0] if row else None
+
+    def price_history(self, family: str, product_url: str) -> pd.DataFrame:
+        # every observation of one product, oldest first
+        product_id = self._product_id(family, product_url)
+        return pd.read_sql_query(
+            f"SELECT taken_at, {', '.join(OBSERVATION_METRICS)} FROM {_table(family)} "
+            "WHERE product_id = ? ORDER BY taken_at", self.conn, params=(product_id,))
+
+    def daily_stats(self, family: str, key: str = ALL, value: Optional[str] = None,
+                    since: Optional[str] = None, until: Optional[str] = None) -> pd.DataFrame:
+        # daily price statistics of the family (key="all"), or of each group of
+        # a key ("category", "brand", ...), or of one group; days as YYYY-MM-DD
+        query = "SELECT value, day, count, min, median, mean, max FROM daily_stats WHERE family = ? AND key = ?"
+        params = [family, key]
+        if value is not None:
+            query += " AND value = ?"
+            params.append(value)
+        if since is not None:
+            query += " AND day >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND day <= ?"
+            params.append(until)
+        return pd.read_sql_query(query + " ORDER BY value, day", self.conn, params=params)
+
+    def _window(self, family: str, days: int, as_of: Optional[str]) -> tuple:
+        # (start, end) taken_at bounds of the `days` days up to as_of, by default
+        # the family's latest snapshot
+        if as_of is None:
+            as_of = self.conn.execute("SELECT MAX(taken_at) FROM snapshots WHERE family = ?", (family,)).fetchone()[0]
+            as_of = as_of or utc_now()
+        else:
+            as_of = utc_timestamp(as_of)
+        start = (datetime.fromisoformat(as_of) - timedelta(days=days)).isoformat(timespec="seconds")
+        return start, as_of
+
+    def lowest_price(self, family: str, product_url: str, days: int = 30,
+                     as_of: Optional[str] = None) -> Optional[Dict[str, object]]:
+        # {price, taken_at} of one product's lowest price in the window, None
+        # when it has no price there
+        product_id = self._product_id(family, product_url)
+        start, end = self._window(family, days, as_of)
+        row = self.conn.execute(
+            f"SELECT price, taken_at FROM {_table(family)} WHERE product_id = ? AND taken_at > ? AND taken_at <= ? "
+            "AND price IS NOT NULL ORDER BY price, taken_at LIMIT 1", (product_id, start, end)).fetchone()
+        return {"price": row[0], "taken_at": row[1]} if row else None
+
+    def lowest_prices(self, family: str, days: int = 30, as_of: Optional[str] = None) -> pd.DataFrame:
+        # every product's lowest price in the window, cheapest first; one
+        # covering-index range per product instead of a scan of the window
+        start, end = self._window(family, days, as_of)
+        return pd.read_sql_query(
+            "SELECT * FROM (SELECT p.key, p.title, p.brand, p.product_url, "
+            f"(SELECT MIN(o.price) FROM {_table(family)} o WHERE o.product_id = p.id AND o.taken_at > ? "
+            "AND o.taken_at <= ?) AS lowest_price FROM products p WHERE p.family = ?) "
+            "WHERE lowest_price IS NOT NULL ORDER BY lowest_price", self.conn, params=(start, end, family))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def update_history(path: str, rules_file: str = Classify.RULES_FILE, db_path: str = HISTORY_DB,
+                   taken_at: Optional[str] = None, snapshot_dir: str = Diff.SNAPSHOT_DIR) -> Dict[str, int]:
+    # appends the classified table of every family in the rules file, dated by
+    # its scrape (scrape_time) unless taken_at is given; a scrape already in
+    # the history is skipped when its table is unchanged (same SHA-1) and
+    # replaced otherwise, and a family whose scrape time is unknown is skipped
+    added = {}
+    with PriceHistory(db_path) as history:
+        for family, rules in Classify.load_rules(rules_file).items():
+            csv_path = os.path.join(path, "processed", rules.output)
+            table = Storage.find_table(csv_path)
+            if table is None:
+                print(f"Warning: {rules.output} not found, {family} history not updated.")
+                continue
+            family_taken_at = taken_at or scrape_time(path, rules, snapshot_dir)
+            if family_taken_at is None:
+                print(f"Warning: the scrape time of {rules.output} is unknown, {family} history not updated "
+                      "(pass taken_at).")
+                continue
+            df = Storage.load_products(csv_path, float_dtype="float64", report=False)
+            added[family] = history.append(family, df, taken_at=family_taken_at, source=os.path.basename(table),
+                                           digest=Sketches.file_digest(table), labels=rules.columns)
+            if added[family]:
+                print(f" -- {family}: {added[family]} rows added to {db_path} -- ")
+            else:
+                print(f" -- {family}: {os.path.basename(table)} already in the history -- ")
+    return added
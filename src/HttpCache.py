@@ -0,0 +1,129 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Optional
+
+CACHE_DIR = "../data/raw/http_cache"
+
+
+class HttpCache:
+    # On-disk response cache keyed by URL. Entries younger than `ttl` seconds are
+    # served without a request; older ones are revalidated with If-None-Match /
+    # If-Modified-Since. The least recently used bodies are evicted once the
+    # cache grows past `max_bytes`.
+
+    def __init__(self, cache_dir: str = CACHE_DIR, ttl: float = 3600, max_bytes: int = 200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stored": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        for name in os.listdir(cache_dir):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(cache_dir, name), "r", encoding="utf-8") as f:
+                        meta = json.load(f)
+                    self._entries[meta["key"]] = meta
+                except (OSError, ValueError, KeyError):
+                    continue
+        with self._lock:
+            self._evict()
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.html.gz")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _write_meta(self, meta: Dict):
+        with open(self._meta_path(meta["key"]), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            meta = self._entries.get(self._key(url))
+            return dict(meta) if meta else None
+
+    def is_fresh(self, meta: Dict) -> bool:
+        return time.time() - meta["stored_at"] < self.ttl
+
+    def conditional_headers(self, meta: Dict) -> Dict[str, str]:
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def read(self, url: str, revalidated: bool = False) -> Optional[str]:
+        key = self._key(url)
+        try:
+            with gzip.open(self._body_path(key), "rt", encoding="utf-8", newline="") as f:
+                body = f.read()
+        except OSError:
+            # body evicted or removed behind our back
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+
+        with self._lock:
+            meta = self._entries.get(key)
+            if meta is not None:
+                meta["last_access"] = time.time()
+                if revalidated:
+                    # a 304 makes the stored copy fresh again
+                    meta["stored_at"] = meta["last_access"]
+                    self.stats["revalidated"] += 1
+                else:
+                    self.stats["hits"] += 1
+                self._write_meta(meta)
+        return body
+
+    def store(self, url: str, body: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        key = self._key(url)
+        data = gzip.compress(body.encode("utf-8"))
+        tmp_path = f"{self._body_path(key)}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._body_path(key))
+
+        now = time.time()
+        meta = {"key": key, "url": url, "etag": etag, "last_modified": last_modified,
+                "stored_at": now, "last_access": now, "size": len(data)}
+        with self._lock:
+            self._entries[key] = meta
+            self._write_meta(meta)
+            self.stats["stored"] += 1
+            self._evict()
+
+    def _evict(self):
+        total = sum(meta["size"] for meta in self._entries.values())
+        if total <= self.max_bytes:
+            return
+        for meta in sorted(self._entries.values(), key=lambda m: m["last_access"]):
+            if total <= self.max_bytes:
+                break
+            for path in (self._body_path(meta["key"]), self._meta_path(meta["key"])):
+                if os.path.exists(path):
+                    os.remove(path)
+            del self._entries[meta["key"]]
+            total -= meta["size"]
+            self.stats["evicted"] += 1
+
+    def record_download(self):
+        with self._lock:
+            self.stats["misses"] += 1
+
+    def report(self):
+        print(f" -- HTTP cache: {self.stats['hits']} fresh hits, {self.stats['revalidated']} revalidated (304), "
+              f"{self.stats['misses']} downloaded, {self.stats['evicted']} evicted -- ")
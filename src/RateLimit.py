@@ -0,0 +1,100 @@
+import time
+import random
+import threading
+from typing import Dict, Optional
+
+# responses worth retrying; anything else (404, 403, ...) fails straight away
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    # exponential backoff with "equal jitter": half fixed, half random
+    delay = min(cap, base * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        # HTTP-date form is rare on search pages, fall back to our own backoff
+        return None
+
+
+class AdaptiveRateLimiter:
+    # Per-host token bucket whose rate follows the site's health (AIMD): every
+    # healthy response adds `increase` requests/sec up to `max_rate`; a 429, a 5xx,
+    # a network error or a response slower than `slow_after` seconds multiplies
+    # the rate by `decrease`, down to `min_rate`. Shared by all scraper threads.
+
+    def __init__(self, initial_rate: float = 0.5, min_rate: float = 0.1, max_rate: float = 5.0,
+                 increase: float = 0.1, decrease: float = 0.5, burst: float = 1.0, slow_after: float = 5.0):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.burst = burst
+        self.slow_after = slow_after
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "throttle_wait": 0.0, "pages": 0}
+        self._buckets: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._started: Optional[float] = None
+
+    def _bucket(self, host: str) -> Dict:
+        if host not in self._buckets:
+            self._buckets[host] = {"rate": self.initial_rate, "tokens": self.burst, "updated": time.monotonic()}
+        return self._buckets[host]
+
+    def acquire(self, host: str):
+        # reserve a token now and sleep outside the lock until it is due, so
+        # concurrent callers queue up in order instead of spinning
+        with self._lock:
+            now = time.monotonic()
+            if self._started is None:
+                self._started = now
+            bucket = self._bucket(host)
+            bucket["tokens"] = min(self.burst, bucket["tokens"] + (now - bucket["updated"]) * bucket["rate"])
+            bucket["updated"] = now
+            bucket["tokens"] -= 1
+            wait = -bucket["tokens"] / bucket["rate"] if bucket["tokens"] < 0 else 0.0
+            self.stats["requests"] += 1
+            self.stats["throttle_wait"] += wait
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, host: str, status: Optional[int], elapsed: float, retry_after: Optional[float] = None):
+        with self._lock:
+            bucket = self._bucket(host)
+            unhealthy = status is None or status in RETRY_STATUSES or elapsed > self.slow_after
+            if unhealthy:
+                bucket["rate"] = max(self.min_rate, bucket["rate"] * self.decrease)
+                self.stats["throttled"] += 1
+                if retry_after:
+                    # hold the whole host back for as long as the server asked
+                    bucket["tokens"] = min(bucket["tokens"], -retry_after * bucket["rate"])
+            elif status < 400:
+                bucket["rate"] = min(self.max_rate, bucket["rate"] + self.increase)
+                self.stats["pages"] += 1
+
+    def record_retry(self):
+        with self._lock:
+            self.stats["retries"] += 1
+
+    def current_rate(self, host: str) -> float:
+        with self._lock:
+            return self._bucket(host)["rate"]
+
+    def pages_per_sec(self) -> float:
+        if self._started is None:
+            return 0.0
+        elapsed = time.monotonic() - self._started
+        return self.stats["pages"] / elapsed if elapsed > 0 else 0.0
+
+    def report(self):
+        rates = ", ".join(f"{host} {bucket['rate']:.2f}/s" for host, bucket in self._buckets.items())
+        print(f" -- Rate limiter: {self.stats['requests']} requests, {self.stats['retries']} retries, "
+              f"{self.stats['throttled']} throttled responses, {self.stats['throttle_wait']:.1f}s waiting, "
+              f"{self.pages_per_sec():.2f} pages/sec (now {rates or 'idle'}) -- ")
@@ -0,0 +1,100 @@
+import os
+import re
+import gzip
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple
+import Fetch
+import Archive
+
+RAW_HTML_DIR = "../data/raw/raw_html_data"
+
+
+def find_archived_pages(keyword: str, raw_dir: str = RAW_HTML_DIR,
+                        archive_dir: str = Archive.ARCHIVE_DIR) -> Dict[int, str]:
+    # page number -> archived file: the latest page_archive object if there is one,
+    # otherwise the legacy raw_html_data file (.html preferred over the .json copy)
+    prefix = f"Raw_{keyword.replace(' ', '_')}_p_"
+    pattern = re.compile(re.escape(prefix) + r"(\d+)\.(html|json)$")
+    pages: Dict[int, str] = {}
+    if os.path.exists(raw_dir):
+        for name in os.listdir(raw_dir):
+            m = pattern.match(name)
+            if not m:
+                continue
+            page = int(m.group(1))
+            if page not in pages or m.group(2) == "html":
+                pages[page] = os.path.join(raw_dir, name)
+
+    for page, entry in Archive.latest_pages(keyword, archive_dir).items():
+        pages[page] = Archive.object_path(entry["sha256"], archive_dir)
+    return pages
+
+
+def load_archived_page(path: str) -> str:
+    if path.endswith(".gz"):
+        with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+            return f.read()
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.endswith(".json"):
+            return json.load(f)["html"]
+        return f.read()
+
+
+def parse_archived_page(path: str, keyword: str, backend: str = "soup") -> Tuple[List[Dict], Optional[int]]:
+    # runs inside the worker process, so only the path crosses the process boundary
+    return Fetch.parse_search_page(load_archived_page(path), keyword, backend=backend)
+
+
+def replay_archive(keyword: str, max_pages_limit: int = 0, raw_dir: str = RAW_HTML_DIR,
+                   workers: Optional[int] = None, backend: str = "soup",
+                   archive_dir: str = Archive.ARCHIVE_DIR) -> List[Dict]:
+    pages = find_archived_pages(keyword, raw_dir, archive_dir)
+
+    # same stopping rules as the live scraper: contiguous pages from 1, limit, first empty page
+    page_numbers: List[int] = []
+    page = 1
+    while page in pages and (max_pages_limit <= 0 or page <= max_pages_limit):
+        page_numbers.append(page)
+        page += 1
+
+    print(f" --- Replaying {len(page_numbers)} archived pages for keyword: '{keyword}' --- ")
+    if not page_numbers:
+        print(f" ! No archived pages found in {archive_dir} or {raw_dir}.")
+        return []
+
+    all_results: List[Dict] = []
+    paths = [pages[p] for p in page_numbers]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parsed = pool.map(parse_archived_page, paths, [keyword] * len(paths), [backend] * len(paths))
+        for page, (page_results, _) in zip(page_numbers, parsed):
+            if not page_results:
+                print(f"Error: No items found on archived page {page}. Stopping.")
+                break
+            all_results.extend(page_results)
+            print(f" - Parsed archived page {page}: {len(page_results)} items")
+
+    return all_results
+
+
+def run_replay(keyword: str, output_path: str, output_base: str, page_limit: int,
+               raw_dir: str = RAW_HTML_DIR, workers: Optional[int] = None, backend: str = "soup",
+               archive_dir: str = Archive.ARCHIVE_DIR):
+    data = replay_archive(keyword, max_pages_limit=page_limit, raw_dir=raw_dir, workers=workers,
+                          backend=backend, archive_dir=archive_dir)
+
+    if data:
+        if not os.path.exists(output_path):
+            os.makedirs(output_path)
+
+        csv_filename = os.path.join(output_path, f"Raw_{output_base}_p{page_limit}.csv")
+        print(f"\n --- Saving Data --- ")
+        Fetch.save_to_csv(data, csv_filename)
+        print("="*80, "\n")
+    else:
+        print(f" ! No data replayed for {keyword}.")
+
+
+if __name__ == "__main__":
+    run_replay("5090", "../data/raw", "newegg_5090_results", 8)
+    run_replay("2tb ssd", "../data/raw", "newegg_2tb_ssd_results", 2)
@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+# Resampling inference for price differences between groups (categories,
+# brands). Every test draws its resamples as one index / permutation matrix
+# per batch and reduces it with NumPy along the rows, so the number of
+# resamples only costs array work, not Python iterations. A batch holds at
+# most MAX_BATCH_CELLS values.
+MAX_BATCH_CELLS = 4_000_000
+
+
+def _grouped(values, labels, groups: Optional[Sequence] = None) -> Tuple[np.ndarray, np.ndarray, pd.Index]:
+    # drops missing values / labels; codes follow `groups` (default: first appearance)
+    values = np.asarray(values, dtype=float)
+    labels = pd.Series(np.asarray(labels, dtype=object))
+    if groups is None:
+        groups = labels[labels.notna() & ~np.isnan(values)].unique()
+    groups = pd.Index(groups)
+    codes = groups.get_indexer(labels)
+    keep = (codes >= 0) & ~np.isnan(values)
+    return values[keep], codes[keep], groups
+
+
+def _batches(resamples: int, width: int):
+    size = max(1, MAX_BATCH_CELLS // max(width, 1))
+    for start in range(0, resamples, size):
+        yield min(size, resamples - start)
+
+
+def _permutations(rng: np.random.Generator, values: np.ndarray, rows: int) -> np.ndarray:
+    # `rows` independent shuffles of `values`, one per row
+    return rng.permuted(np.broadcast_to(values, (rows, len(values))), axis=1)
+
+
+def _p_value(observed: float, resampled: np.ndarray) -> float:
+    # share of resamples at least as extreme, counting the observed one
+    # (a small tolerance keeps ties from float noise)
+    extreme = np.count_nonzero(resampled >= observed - 1e-12 * max(abs(observed), 1.0))
+    return (extreme + 1) / (len(resampled) + 1)
+
+
+def bootstrap_ci(values, labels, stat: str = "mean", resamples: int = 10_000, confidence: float = 0.95,
+                 seed: Optional[int] = None, groups: Optional[Sequence] = None) -> pd.DataFrame:
+    # percentile bootstrap confidence interval of each group's mean or median:
+    # n, estimate, low, high per group
+    if stat not in ("mean", "median"):
+        raise ValueError(f"Unknown statistic '{stat}', expected 'mean' or 'median'")
+    reduce = np.mean if stat == "mean" else np.median
+    values, codes, groups = _grouped(values, labels, groups)
+    rng = np.random.default_rng(seed)
+    tail = (1 - confidence) / 2 * 100
+    rows = []
+    for code in range(len(groups)):
+        sample = values[codes == code]
+        if len(sample) == 0:
+            rows.append((0, np.nan, np.nan, np.nan))
+            continue
+        estimates = np.concatenate([
+            reduce(sample[rng.integers(0, len(sample), size=(batch, len(sample)))], axis=1)
+            for batch in _batches(resamples, len(sample))
+        ])
+        low, high = np.percentile(estimates, [tail, 100 - tail])
+        rows.append((len(sample), reduce(sample), low, high))
+    return pd.DataFrame(rows, columns=["n", stat, "low", "high"], index=groups.rename("group"))
+
+
+def _f_statistic(matrix: np.ndarray, onehot: np.ndarray, sizes: np.ndarray, total_ss: float) -> np.ndarray:
+    # one-way ANOVA F of every row of `matrix` (rows are shuffles of the same values)
+    n, k = matrix.shape[1], len(sizes)
+    means = (matrix @ onehot) / sizes
+    between = ((means - matrix.mean(axis=1, keepdims=True)) ** 2 * sizes).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (between / (k - 1)) / ((total_ss - between) / (n - k))
+
+
+def _h_statistic(matrix: np.ndarray, onehot: np.ndarray, sizes: np.ndarray, tie_correction: float) -> np.ndarray:
+    # Kruskal-Wallis H of every row of a rank `matrix`
+    n = matrix.shape[1]
+    rank_sums = matrix @ onehot
+    h = 12 / (n * (n + 1)) * (rank_sums ** 2 / sizes).sum(axis=1) - 3 * (n + 1)
+    return h / tie_correction
+
+
+def permutation_anova(values, labels, resamples: int = 10_000, seed: Optional[int] = None,
+                      groups: Optional[Sequence] = None) -> Dict[str, Any]:
+    # permutation versions of the one-way ANOVA F test and of Kruskal-Wallis:
+    # the group labels are shuffled `resamples` times and the p-value is the
+    # share of shuffles with a statistic at least as large as the observed one
+    values, codes, groups = _grouped(values, labels, groups)
+    present = np.bincount(codes, minlength=len(groups)) > 0
+    groups, codes = groups[present], np.cumsum(present)[codes] - 1
+    sizes = np.bincount(codes, minlength=len(groups)).astype(float)
+    if len(groups) < 2 or len(values) <= len(groups):
+        raise ValueError("permutation_anova needs at least two groups and more values than groups")
+    onehot = np.eye(len(groups))[codes]
+    ranks = stats.rankdata(values)
+    _, ties = np.unique(values, return_counts=True)
+    tie_correction = 1 - (ties ** 3 - ties).sum() / (len(values) ** 3 - len(values))
+    total_ss = ((values - values.mean()) ** 2).sum()
+
+    f_observed = _f_statistic(values[None, :], onehot, sizes, total_ss)[0]
+    h_observed = _h_statistic(ranks[None, :], onehot, sizes, tie_correction)[0]
+    rng = np.random.default_rng(seed)
+    f_resampled, h_resampled = [], []
+    for batch in _batches(resamples, len(values)):
+        # shuffled positions, applied to both the prices and their ranks
+        order = _permutations(rng, np.arange(len(values)), batch)
+        f_resampled.append(_f_statistic(values[order], onehot, sizes, total_ss))
+        h_resampled.append(_h_statistic(ranks[order], onehot, sizes, tie_correction))
+    f_resampled, h_resampled = np.concatenate(f_resampled), np.concatenate(h_resampled)
+    return {
+        "groups": list(groups),
+        "resamples": resamples,
+        "f_stat": f_observed,
+        "f_p_value": _p_value(f_observed, f_resampled),
+        "f_p_value_asymptotic": stats.f.sf(f_observed, len(groups) - 1, len(values) - len(groups)),
+        "h_stat": h_observed,
+        "h_p_value": _p_value(h_observed, h_resampled),
+        "h_p_value_asymptotic": stats.chi2.sf(h_observed, len(groups) - 1),
+    }
+
+
+def holm(p_values) -> np.ndarray:
+    # Holm-Bonferroni adjusted p-values, in the input order
+    p_values = np.asarray(p_values, dtype=float)
+    order = np.argsort(p_values)
+    adjusted = np.maximum.accumulate(p_values[order] * (len(p_values) - np.arange(len(p_values))))
+    result = np.empty_like(p_values)
+    result[order] = np.minimum(adjusted, 1.0)
+    return result
+
+
+def pairwise_permutation(values, labels, resamples: int = 10_000, seed: Optional[int] = None,
+                         groups: Optional[Sequence] = None) -> pd.DataFrame:
+    # two-sided permutation test of the mean difference for every pair of
+    # groups, with Holm-adjusted p-values across the pairs
+    values, codes, groups = _grouped(values, labels, groups)
+    rng = np.random.default_rng(seed)
+    rows = []
+    for a in range(len(groups)):
+        for b in range(a + 1, len(groups)):
+            first, second = values[codes == a], values[codes == b]
+            if len(first) == 0 or len(second) == 0:
+                continue
+            pooled = np.concatenate([first, second])
+            observed = first.mean() - second.mean()
+            resampled = np.concatenate([
+                np.abs(shuffled[:, :len(first)].mean(axis=1) - shuffled[:, len(first):].mean(axis=1))
+                for shuffled in (_permutations(rng, pooled, batch) for batch in _batches(resamples, len(pooled)))
+            ])
+            rows.append((groups[a], groups[b], len(first), len(second), observed, _p_value(abs(observed), resampled)))
+    table = pd.DataFrame(rows, columns=["group_a", "group_b", "n_a", "n_b", "mean_diff", "p_value"])
+    table["p_holm"] = holm(table["p_value"]) if len(table) else []
+    return table
@@ -0,0 +1,126 @@
+import io
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Sequence
+
+# Analysis results are written as structured records, one JSON object per line:
+#   {"analysis": "gpu", "section": "categories", "data": {...}}
+# next to the human-readable text report. Files are written through large
+# buffers and flushed once at close, not after every line.
+RESULT_FORMATS = ("ndjson", "json", "text")
+RESULT_FILES = {"ndjson": "analysis_results.ndjson", "json": "analysis_results.json", "text": "analysis_results.txt"}
+BUFFER_SIZE = 1 << 20
+
+
+def to_plain(value: Any) -> Any:
+    # JSON-ready copy of a result: frames become lists of row dicts, numpy
+    # scalars become Python numbers, NaN becomes null
+    if isinstance(value, pd.DataFrame):
+        return to_plain(value.reset_index(drop=isinstance(value.index, pd.RangeIndex)).to_dict(orient="records"))
+    if isinstance(value, pd.Series):
+        return to_plain(value.to_dict())
+    if isinstance(value, dict):
+        return {str(k): to_plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray, pd.Index)):
+        return [to_plain(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    if value is pd.NA or value is pd.NaT:
+        return None
+    return value
+
+
+class ResultsSink:
+    # Collects what the analyses emit: report lines through print() and
+    # structured records through record(). Lines go to the text report and,
+    # with console=True, to stdout; records go to the ndjson / json files.
+    # Without output_dir nothing is written to disk (console-only runs);
+    # capture=True also keeps the lines, for replay() into another sink.
+
+    def __init__(self, output_dir: Optional[str] = None, formats: Sequence[str] = ("ndjson", "text"),
+                 console: bool = True, capture: bool = False):
+        unknown = [fmt for fmt in formats if fmt not in RESULT_FORMATS]
+        if unknown:
+            raise ValueError(f"Unknown result format(s) {unknown}, expected some of {RESULT_FORMATS}")
+        self.paths: Dict[str, str] = {}
+        self.records: List[Dict[str, Any]] = []
+        self.lines: Optional[List[str]] = [] if capture else None
+        self._text: List[io.TextIOBase] = [sys.stdout] if console else []
+        self._ndjson = None
+        self._json = None
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            self.paths = {fmt: os.path.join(output_dir, RESULT_FILES[fmt]) for fmt in formats}
+            if "text" in self.paths:
+                self._text.append(open(self.paths["text"], "w", encoding="utf-8", buffering=BUFFER_SIZE))
+            if "ndjson" in self.paths:
+                self._ndjson = open(self.paths["ndjson"], "w", encoding="utf-8", buffering=BUFFER_SIZE)
+            if "json" in self.paths:
+                self._json = self.paths["json"]
+
+    def print(self, *values, sep: str = " ", end: str = "\n"):
+        text = sep.join(str(value) for value in values) + end
+        if self.lines is not None:
+            self.lines.append(text)
+        for f in self._text:
+            f.write(text)
+
+    def record(self, analysis: str, section: str, data: Any):
+        entry = {"analysis": analysis, "section": section, "data": to_plain(data)}
+        self.records.append(entry)
+        if self._ndjson is not None:
+            self._ndjson.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def replay(self, lines: List[str], records: List[Dict[str, Any]]):
+        # output captured by another sink (e.g. in a worker process), in its order
+        for f in self._text:
+            f.write("".join(lines))
+        if self.lines is not None:
+            self.lines.extend(lines)
+        for entry in records:
+            self.records.append(entry)
+            if self._ndjson is not None:
+                self._ndjson.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def close(self):
+        for f in self._text:
+            if f is sys.stdout:
+                f.flush()
+            else:
+                f.close()
+        self._text = []
+        if self._ndjson is not None:
+            self._ndjson.close()
+            self._ndjson = None
+        if self._json is not None:
+            with open(self._json, "w", encoding="utf-8", buffering=BUFFER_SIZE) as f:
+                json.dump(group_records(self.records), f, ensure_ascii=False, indent=2)
+            self._json = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def group_records(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    # {analysis: {section: data}}; a section recorded twice keeps the last data
+    results: Dict[str, Dict[str, Any]] = {}
+    for entry in records:
+        results.setdefault(entry["analysis"], {})[entry["section"]] = entry["data"]
+    return results
+
+
+def load_results(path: str = "../data/processed/analysis_results.ndjson") -> Dict[str, Dict[str, Any]]:
+    # results of the last analysis run, without re-running it
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    with open(path, encoding="utf-8") as f:
+        return group_records([json.loads(line) for line in f if line.strip()])
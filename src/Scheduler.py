@@ -0,0 +1,220 @@
+import os
+import csv
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Optional
+import Fetch
+import Archive
+import Diff
+from Checkpoint import CheckpointedCsvSink
+from HttpCache import HttpCache
+from RateLimit import AdaptiveRateLimiter
+
+JOBS_FILE = "../data/crawl_jobs.csv"
+
+
+class CrawlJob:
+    # One keyword of a batch crawl. Pages can finish out of order; they are
+    # buffered and written to the sink in page order, and the job stops at the
+    # first failed or empty page, the same rules as Fetch.run_paginated_scraper.
+
+    def __init__(self, keyword: str, output_path: str, output_base: str, page_limit: int,
+                 search_url: str = Fetch.SEARCH_URL, resume: bool = False):
+        self.keyword = keyword
+        self.output_base = output_base
+        self.page_limit = page_limit
+        self.start_url = f"{search_url}{keyword.replace(' ', '+')}"
+        self.csv_filename = os.path.join(output_path, f"Raw_{output_base}_p{page_limit}.csv")
+        self.sink = CheckpointedCsvSink(self.csv_filename, keyword, resume=resume)
+        self.next_page = self.sink.next_page
+        self.last_page: Optional[int] = page_limit if page_limit > 0 else None
+        self.in_flight = 0
+        self.status = "queued"
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._done: Dict[int, tuple] = {}
+        if self.last_page is not None and self.next_page > self.last_page:
+            self._stop("done")
+
+    @property
+    def stopped(self) -> bool:
+        return self.finished is not None
+
+    def can_dispatch(self, per_job_limit: int) -> bool:
+        if self.stopped:
+            return False
+        if self.last_page is None:
+            # until the page count is known, probe one page at a time
+            return self.in_flight == 0
+        return self.next_page <= self.last_page and self.in_flight < per_job_limit
+
+    def dispatch(self) -> int:
+        if self.started is None:
+            self.started = time.monotonic()
+            self.status = "running"
+        page = self.next_page
+        self.next_page += 1
+        self.in_flight += 1
+        return page
+
+    def complete(self, page: int, page_results: Optional[List[Dict]], total_pages: Optional[int]):
+        self.in_flight -= 1
+        if self.stopped:
+            return
+        if total_pages:
+            self.last_page = min(total_pages, self.page_limit) if self.page_limit > 0 else total_pages
+        self._done[page] = page_results
+
+        while self.sink.next_page in self._done:
+            page = self.sink.next_page
+            page_results = self._done.pop(page)
+            if page_results is None:
+                print(f" ! [{self.keyword}] Failed to retrieve HTML for page {page}. Stopping.")
+                self._stop("failed")
+                return
+            if not page_results:
+                print(f"Error: [{self.keyword}] No items found on page {page}. Stopping.")
+                self._stop("empty page")
+                return
+            self.sink.write_page(page, page_results)
+            total = self.last_page or "?"
+            print(f" - [{self.keyword}] page {page}/{total}: {len(page_results)} items")
+
+        if self.last_page is not None and self.sink.next_page > self.last_page:
+            self._stop("done")
+
+    def _stop(self, status: str):
+        self.status = status
+        self.finished = time.monotonic()
+        self._done.clear()
+        # a failed page leaves the checkpoint open for resume=True
+        if status == "failed":
+            self.sink.close()
+        else:
+            self.sink.finish()
+        if self.started is not None:
+            print(f" -- [{self.keyword}] {status}: {self.sink.rows_written} rows through page "
+                  f"{self.sink.last_page} in {self.elapsed():.1f}s -- ")
+
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+
+def load_jobs(jobs_file: str = JOBS_FILE) -> List[Dict]:
+    # CSV with keyword[,output_base][,page_limit]; a missing output_base becomes
+    # newegg_{keyword}_results and a missing page_limit means a full scan
+    jobs = []
+    with open(jobs_file, "r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            keyword = (row.get("keyword") or "").strip()
+            if not keyword or keyword.startswith("#"):
+                continue
+            output_base = (row.get("output_base") or "").strip() or f"newegg_{keyword.replace(' ', '_')}_results"
+            page_limit = int((row.get("page_limit") or "0").strip() or 0)
+            jobs.append({"keyword": keyword, "output_base": output_base, "page_limit": page_limit})
+    return jobs
+
+
+def run_jobs(jobs: List[Dict], output_path: str, max_in_flight: int = 8, per_job_limit: int = 4,
+             backend: str = "soup", cache: Optional[HttpCache] = None,
+             limiter: Optional[AdaptiveRateLimiter] = None, resume: bool = False,
+             archive_dir: str = Archive.ARCHIVE_DIR, search_url: str = Fetch.SEARCH_URL,
+             snapshot_dir: Optional[str] = Diff.SNAPSHOT_DIR) -> List[CrawlJob]:
+    # All jobs share one pool of `max_in_flight` requests and one per-host rate
+    # limiter. Free slots are handed out round-robin, one page per job per turn
+    # (at most `per_job_limit` pages of a job in flight), so a keyword with
+    # hundreds of pages cannot hold back the small ones.
+    if limiter is None:
+        limiter = AdaptiveRateLimiter()
+    if not os.path.exists(output_path):
+        os.makedirs(output_path)
+    if not os.path.exists(archive_dir):
+        os.makedirs(archive_dir)
+
+    crawl_jobs = [CrawlJob(job["keyword"], output_path, job["output_base"], job["page_limit"],
+                           search_url=search_url, resume=resume) for job in jobs]
+    print(f" --- Crawling {len(crawl_jobs)} keywords, {max_in_flight} requests in flight, "
+          f"at most {per_job_limit} per keyword --- ")
+
+    t0 = time.monotonic()
+    try:
+        _crawl(deque(crawl_jobs), max_in_flight, per_job_limit, archive_dir, backend, cache, limiter)
+    finally:
+        for job in crawl_jobs:
+            job.sink.close()
+
+    wall = time.monotonic() - t0
+    report_jobs(crawl_jobs, wall)
+    # a dated copy of every raw CSV this crawl wrote to, for Diff
+    if snapshot_dir is not None:
+        for job in crawl_jobs:
+            if job.sink.rows_written:
+                Diff.save_snapshot(job.csv_filename, job.output_base, snapshot_dir)
+    limiter.report()
+    if cache is not None:
+        cache.report()
+    return crawl_jobs
+
+
+def _crawl(queue: deque, max_in_flight: int, per_job_limit: int, archive_dir: str,
+           backend: str, cache: Optional[HttpCache], limiter: AdaptiveRateLimiter):
+    running = {}
+    with Fetch.make_session(max_in_flight) as session, ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        while True:
+            while len(running) < max_in_flight:
+                job = _next_dispatchable(queue, per_job_limit)
+                if job is None:
+                    break
+                page = job.dispatch()
+                future = pool.submit(Fetch.fetch_search_page, job.start_url, job.keyword, page, session,
+                                     archive_dir, backend, cache, limiter)
+                running[future] = (job, page)
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job, page = running.pop(future)
+                try:
+                    page_results, total_pages = future.result()
+                except Exception as e:
+                    # an error in one page (a parse error, say) fails that page like a failed
+                    # fetch: its job stops there with its checkpoint open, the others go on
+                    print(f" ! [{job.keyword}] Error on page {page}: {e!r}")
+                    page_results, total_pages = None, None
+                job.complete(page, page_results, total_pages)
+
+
+def _next_dispatchable(queue: deque, per_job_limit: int) -> Optional[CrawlJob]:
+    # rotate through the jobs, the one that gets a slot goes to the back
+    for _ in range(len(queue)):
+        job = queue[0]
+        queue.rotate(-1)
+        if job.can_dispatch(per_job_limit):
+            return job
+    return None
+
+
+def report_jobs(crawl_jobs: List[CrawlJob], wall: float):
+    print("\n --- Crawl summary --- ")
+    print(f"{'keyword':30s} {'status':12s} {'pages':>6s} {'rows':>7s} {'time (s)':>9s}")
+    for job in crawl_jobs:
+        print(f"{job.keyword[:30]:30s} {job.status:12s} {job.sink.last_page:6d} {job.sink.rows_written:7d} "
+              f"{job.elapsed():9.1f}")
+    pages = sum(job.sink.last_page for job in crawl_jobs)
+    rows = sum(job.sink.rows_written for job in crawl_jobs)
+    serial = sum(job.elapsed() for job in crawl_jobs)
+    print(f" === {len(crawl_jobs)} keywords, {pages} pages, {rows} rows in {wall:.1f}s wall time "
+          f"(sum of per-keyword times {serial:.1f}s) === ")
+    print("="*80, "\n")
+
+
+def run_jobs_file(jobs_file: str = JOBS_FILE, output_path: str = "../data/raw", **kwargs) -> List[CrawlJob]:
+    return run_jobs(load_jobs(jobs_file), output_path, **kwargs)
+
+
+if __name__ == "__main__":
+    run_jobs_file(cache=HttpCache())
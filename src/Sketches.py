@@ -0,0 +1,421 @@
+import base64
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional
+import Storage
+
+# Mergeable streaming accumulators for the market statistics. Each one is
+# updated with a batch of values at a time, merged with another accumulator
+# of the same kind (other chunks, other workers, earlier snapshots), and
+# round-trips through to_dict() / from_dict() so its state can be saved
+# between runs:
+#
+#   Welford      count, mean, variance, min, max - exact
+#   KLLSketch    quantiles / median - approximate, see KLLSketch.rank_error
+#   HyperLogLog  distinct count - approximate, see HyperLogLog.relative_error
+#
+# Quantile accuracy: a KLL sketch (Karnin, Lang & Liberty, "Optimal Quantile
+# Approximation in Streams") answers quantile(q) with an item whose true rank
+# is within eps * n of q * n. With the error model of the Apache DataSketches
+# KLL sketch, eps at 99% confidence is 2.296 / k**0.9723 for one quantile
+# (1.33% for k=200) and 2.446 / k**0.9433 for all quantiles at once (1.65%).
+# The sketch holds about 3k items however many values went in, and until
+# about k values were added nothing is compacted and the quantiles are exact,
+# interpolated between neighbouring values the way pandas' quantile() is.
+# bench_sketches measures the actual error against exact quantiles.
+KLL_K = 200
+
+
+class Welford:
+    # count / mean / sum of squared deviations, updated batch-wise and merged
+    # with Chan et al.'s pairwise formula
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def _combine(self, n: int, mean: float, m2: float, low: float, high: float):
+        if n == 0:
+            return
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta ** 2 * self.n * n / total
+        self.n = total
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values):
+            mean = values.mean()
+            self._combine(len(values), mean, ((values - mean) ** 2).sum(), values.min(), values.max())
+
+    def merge(self, other: "Welford"):
+        self._combine(other.n, other.mean, other.m2, other.min, other.max)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else np.nan
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.variance))
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.n == 0:
+            return {"n": 0}
+        return {"n": self.n, "mean": self.mean, "m2": self.m2, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "Welford":
+        acc = cls()
+        acc._combine(state["n"], state.get("mean", 0.0), state.get("m2", 0.0),
+                     state.get("min", np.inf), state.get("max", -np.inf))
+        return acc
+
+
+class KLLSketch:
+    # KLL quantile sketch: level h holds items standing for 2**h values each.
+    # A level over its capacity is sorted and every other item (random offset)
+    # moves up a level. Capacities shrink by 2/3 per level below the top one.
+
+    def __init__(self, k: int = KLL_K, seed: int = 0):
+        self.k = k
+        self.seed = seed
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels: List[np.ndarray] = [np.empty(0)]
+
+    def _capacity(self, level: int) -> int:
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (len(self.levels) - 1 - level))))
+
+    def _compress(self):
+        # the random offsets are drawn from (seed, n), so the same updates give the same sketch
+        rng = np.random.default_rng([self.seed, self.n])
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(self.levels[level])
+                odd = len(items) % 2
+                promoted = items[odd:][rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = items[:odd]
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "KLLSketch"):
+        if other.n == 0:
+            return
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    @property
+    def exact(self) -> bool:
+        # every value added is still held, nothing was compacted
+        return len(self.levels) == 1
+
+    def quantiles(self, qs) -> np.ndarray:
+        qs = np.atleast_1d(np.asarray(qs, dtype=float))
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+        if self.exact:
+            return np.quantile(self.levels[0], np.clip(qs, 0, 1))
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, qs * cumulative[-1], side="left")
+        result = items[np.minimum(positions, len(items) - 1)]
+        # the extremes are tracked exactly
+        return np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, result))
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+    def rank_error(self, all_quantiles: bool = False) -> float:
+        # normalized rank error at 99% confidence; 0 while nothing was compacted
+        if len(self.levels) == 1:
+            return 0.0
+        return 2.446 / self.k ** 0.9433 if all_quantiles else 2.296 / self.k ** 0.9723
+
+    def to_dict(self) -> Dict[str, Any]:
+        state = {"k": self.k, "seed": self.seed, "n": self.n, "levels": [items.tolist() for items in self.levels]}
+        if self.n:
+            state.update(min=self.min, max=self.max)
+        return state
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "KLLSketch":
+        sketch = cls(state["k"], state.get("seed", 0))
+        sketch.n = state["n"]
+        sketch.min = state.get("min", np.inf)
+        sketch.max = state.get("max", -np.inf)
+        sketch.levels = [np.asarray(items, dtype=float) for items in state["levels"]] or [np.empty(0)]
+        return sketch
+
+
+class HyperLogLog:
+    # distinct count from 2**p one-byte registers; values are hashed with
+    # pandas' stable 64-bit hash of their string form
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def update(self, values):
+        values = pd.Series(values).dropna()
+        if len(values) == 0:
+            return
+        hashes = pd.util.hash_pandas_object(values.astype(str), index=False).to_numpy(dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        # the guard bit caps the run of leading zeros at 64 - p
+        rest = (hashes << np.uint64(self.p)) | np.uint64(1 << (self.p - 1))
+        high = np.frexp((rest >> np.uint64(32)).astype(np.float64))[1]
+        low = np.frexp((rest & np.uint64(0xFFFFFFFF)).astype(np.float64))[1]
+        bit_length = np.where(high > 0, high + 32, low)
+        np.maximum.at(self.registers, index, (65 - bit_length).astype(np.uint8))
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.power(2.0, -self.registers.astype(float)).sum()
+        zeros = np.count_nonzero(self.registers == 0)
+        # linear counting is more accurate while many registers are still empty
+        if raw <= 2.5 * m and zeros:
+            return m * np.log(m / zeros)
+        return raw
+
+    @property
+    def relative_error(self) -> float:
+        # standard error of the estimate, 1.6% for p=12
+        return 1.04 / np.sqrt(len(self.registers))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"p": self.p, "registers": base64.b64encode(self.registers.tobytes()).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "HyperLogLog":
+        hll = cls(state["p"])
+        hll.registers = np.frombuffer(base64.b64decode(state["registers"]), dtype=np.uint8).copy()
+        return hll
+
+
+class Metric:
+    # Welford moments plus a KLL sketch of one numeric column
+
+    def __init__(self, k: int = KLL_K):
+        self.moments = Welford()
+        self.sketch = KLLSketch(k)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        self.moments.update(values)
+        self.sketch.update(values)
+
+    def merge(self, other: "Metric"):
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+
+    def summary(self) -> Dict[str, float]:
+        # q1 / median / q3 are exact while the sketch is (rank_error 0),
+        # otherwise items whose rank is within rank_error * count of the target
+        q1, median, q3 = self.sketch.quantiles([0.25, 0.5, 0.75])
+        return {"count": self.moments.n, "mean": self.moments.mean if self.moments.n else np.nan,
+                "std": self.moments.std, "min": self.moments.min, "q1": q1, "median": median,
+                "q3": q3, "max": self.moments.max, "rank_error": self.sketch.rank_error()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"moments": self.moments.to_dict(), "sketch": self.sketch.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "Metric":
+        metric = cls()
+        metric.moments = Welford.from_dict(state["moments"])
+        metric.sketch = KLLSketch.from_dict(state["sketch"])
+        return metric
+
+
+# columns summarized for every family, when its table has them
+SUMMARY_METRICS = ["price", "rating", "review_count"]
+# distinct counts kept for every family besides its grouping keys
+SUMMARY_DISTINCT = ["product_url"]
+SUMMARY_DIR = "../data/processed/market_summaries"
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class MarketSummary:
+    # Running market statistics of one product family over every snapshot
+    # added so far: each metric overall and the price per group of each key,
+    # plus distinct counts of the keys and listings. A snapshot is added once
+    # (by its id), so a daily update costs O(rows of the new snapshot).
+
+    def __init__(self, family: str, keys: List[str]):
+        self.family = family
+        self.keys = list(keys)
+        self.snapshots: List[str] = []
+        self.metrics: Dict[str, Metric] = {}
+        self.groups: Dict[str, Dict[str, Metric]] = {key: {} for key in self.keys}
+        self.distinct: Dict[str, HyperLogLog] = {}
+
+    def update(self, df: pd.DataFrame, snapshot: Optional[str] = None) -> bool:
+        # False when the snapshot was already added
+        if snapshot is not None:
+            if snapshot in self.snapshots:
+                return False
+            self.snapshots.append(snapshot)
+        for column in SUMMARY_METRICS:
+            if column in df.columns:
+                self.metrics.setdefault(column, Metric()).update(pd.to_numeric(df[column], errors="coerce"))
+        prices = pd.to_numeric(df["price"], errors="coerce").to_numpy(dtype=float) if "price" in df.columns else None
+        for key in self.keys:
+            if key not in df.columns:
+                continue
+            self.distinct.setdefault(key, HyperLogLog()).update(df[key])
+            if prices is None:
+                continue
+            # one sort by group code, then one slice per group
+            codes, names = pd.factorize(df[key])
+            order = np.argsort(codes, kind="stable")
+            counts = np.bincount(codes[codes >= 0], minlength=len(names))
+            starts = np.cumsum(counts) - counts + np.count_nonzero(codes < 0)
+            for name, start, count in zip(names, starts, counts):
+                self.groups[key].setdefault(str(name), Metric()).update(prices[order[start:start + count]])
+        for column in SUMMARY_DISTINCT:
+            if column in df.columns:
+                self.distinct.setdefault(column, HyperLogLog()).update(df[column])
+        return True
+
+    def merge(self, other: "MarketSummary"):
+        self.snapshots += [s for s in other.snapshots if s not in self.snapshots]
+        for column, metric in other.metrics.items():
+            self.metrics.setdefault(column, Metric()).merge(metric)
+        for key, groups in other.groups.items():
+            for name, metric in groups.items():
+                self.groups.setdefault(key, {}).setdefault(name, Metric()).merge(metric)
+        for column, hll in other.distinct.items():
+            self.distinct.setdefault(column, HyperLogLog(hll.p)).merge(hll)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "snapshots": len(self.snapshots),
+            "metrics": pd.DataFrame({c: m.summary() for c, m in self.metrics.items()}).T,
+            "groups": {key: pd.DataFrame({name: m.summary() for name, m in groups.items()}).T
+                       for key, groups in self.groups.items() if groups},
+            "distinct": {column: hll.estimate() for column, hll in self.distinct.items()},
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "family": self.family,
+            "keys": self.keys,
+            "snapshots": self.snapshots,
+            "metrics": {c: m.to_dict() for c, m in self.metrics.items()},
+            "groups": {key: {name: m.to_dict() for name, m in groups.items()} for key, groups in self.groups.items()},
+            "distinct": {c: hll.to_dict() for c, hll in self.distinct.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "MarketSummary":
+        summary = cls(state["family"], state["keys"])
+        summary.snapshots = state["snapshots"]
+        summary.metrics = {c: Metric.from_dict(m) for c, m in state["metrics"].items()}
+        summary.groups.update({key: {name: Metric.from_dict(m) for name, m in groups.items()}
+                               for key, groups in state["groups"].items()})
+        summary.distinct = {c: HyperLogLog.from_dict(h) for c, h in state["distinct"].items()}
+        return summary
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, family: str, keys: List[str]) -> "MarketSummary":
+        # a fresh summary when there is no readable state, or it was kept for other keys
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                if state.get("keys") == list(keys):
+                    return cls.from_dict(state)
+                print(f" -- Keys changed since {os.path.basename(path)} was written, starting empty -- ")
+            except (OSError, ValueError, KeyError):
+                print(f"[WARN] Unreadable market summary {path}, starting empty.")
+        return cls(family, keys)
+
+
+def update_market_summaries(path: str, families_file: str = "../data/analysis_families.json",
+                            summary_dir: str = SUMMARY_DIR) -> Dict[str, MarketSummary]:
+    # adds today's processed table of every analysis family to its saved
+    # summary (skipped when this exact table was added before) and prints it
+    with open(families_file, encoding="utf-8") as f:
+        families = json.load(f)
+    summaries = {}
+    for family, spec in families.items():
+        csv_path = os.path.join(path, "processed", spec["input"])
+        table = Storage.find_table(csv_path)
+        if table is None:
+            print(f"Warning: {spec['input']} not found, {family} summary not updated.")
+            continue
+        keys = list(spec.get("keys", {}))
+        state_path = os.path.join(summary_dir, f"{family}.json")
+        summary = MarketSummary.load(state_path, family, keys)
+        columns = keys + SUMMARY_METRICS + SUMMARY_DISTINCT
+        df = Storage.load_products(csv_path, columns=columns, float_dtype="float64", report=False)
+        if summary.update(df, snapshot=file_digest(table)):
+            summary.save(state_path)
+            print(f" -- {family}: added {len(df)} rows, {len(summary.snapshots)} snapshot(s) summarized -- ")
+        else:
+            print(f" -- {family}: {os.path.basename(table)} already summarized -- ")
+        report = summary.summary()
+        price = report["metrics"].loc["price"] if "price" in report["metrics"].index else None
+        if price is not None:
+            approx = "~" if price["rank_error"] > 0 else ""
+            bound = f" (quantiles within ±{price['rank_error']:.2%} of rank)" if approx else ""
+            print(f"  Price: n={int(price['count'])}, mean ${price['mean']:.2f}, median {approx}${price['median']:.2f}, "
+                  f"IQR {approx}${price['q1']:.2f} - {approx}${price['q3']:.2f}{bound}")
+        for column, estimate in report["distinct"].items():
+            print(f"  Distinct {column}: ~{estimate:.0f}")
+        summaries[family] = summary
+    return summaries
@@ -0,0 +1,180 @@
+import os
+import pandas as pd
+from typing import List, Optional
+
+# pyarrow is optional: only needed for the parquet / feather formats
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Processed tables are addressed by their .csv name everywhere in the pipeline;
+# the parquet / feather copies sit next to it with the same base name.
+PROCESSED_FORMATS = ("csv", "parquet", "feather")
+
+
+def table_path(csv_path: str, fmt: str = "csv") -> str:
+    if fmt not in PROCESSED_FORMATS:
+        raise ValueError(f"Unknown table format '{fmt}', expected one of {PROCESSED_FORMATS}")
+    return csv_path if fmt == "csv" else os.path.splitext(csv_path)[0] + f".{fmt}"
+
+
+def find_table(csv_path: str) -> Optional[str]:
+    # newest of the csv / parquet / feather copies, so a stale copy in another
+    # format is never read after the table was rewritten
+    candidates = [table_path(csv_path, fmt) for fmt in PROCESSED_FORMATS]
+    existing = [path for path in candidates if os.path.exists(path)]
+    if pyarrow is None:
+        existing = [path for path in existing if path.endswith(".csv")]
+    if not existing:
+        return None
+    return max(existing, key=os.path.getmtime)
+
+
+def table_exists(csv_path: str) -> bool:
+    return find_table(csv_path) is not None
+
+
+def save_table(df: pd.DataFrame, csv_path: str, fmt: str = "csv") -> str:
+    if fmt != "csv" and pyarrow is None:
+        print(f"[WARN] pyarrow is not installed, saving {os.path.basename(csv_path)} as csv instead of {fmt}.")
+        fmt = "csv"
+    path = table_path(csv_path, fmt)
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "feather":
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def load_table(csv_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    # `columns` projects the read; columns the table does not have are skipped,
+    # like the `'x' in df.columns` checks the analyses already make
+    path = find_table(csv_path)
+    if path is None:
+        raise FileNotFoundError(csv_path)
+
+    if path.endswith(".csv"):
+        usecols = None if columns is None else (lambda c: c in columns)
+        return pd.read_csv(path, usecols=usecols)
+
+    if columns is not None:
+        # only the footer / schema is read here, not the data
+        if path.endswith(".parquet"):
+            names = pyarrow.parquet.read_schema(path).names
+        else:
+            names = pyarrow.ipc.open_file(path).schema.names
+        columns = [c for c in names if c in columns]
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_feather(path, columns=columns)
+
+
+# In-memory schema for the product tables: low-cardinality text as categoricals,
+# float32 prices and ratings, nullable compact integer counts. title and
+# product_url can also be switched to Arrow-backed strings. float32 keeps about
+# 7 significant digits, so steps that print or save cent-exact prices ask for
+# float_dtype="float64".
+PRODUCT_CATEGORICALS = ["brand", "category", "shipping", "interface", "dram"]
+PRODUCT_FLOATS = ["price", "rating", "shipping_cost", "total_price"]
+PRODUCT_COUNTS = ["review_count"]
+PRODUCT_TEXT = ["title", "product_url"]
+
+
+def apply_product_schema(df: pd.DataFrame, arrow_strings: bool = False, float_dtype: str = "float32") -> pd.DataFrame:
+    columns = {}
+    for column in df.columns:
+        # Enrich's spec_* columns hold a few distinct values each, like brand
+        if column in PRODUCT_CATEGORICALS or column.startswith("spec_"):
+            columns[column] = df[column].astype("category")
+        elif column in PRODUCT_FLOATS:
+            columns[column] = pd.to_numeric(df[column], errors="coerce").astype(float_dtype)
+        elif column in PRODUCT_COUNTS:
+            columns[column] = pd.to_numeric(df[column], errors="coerce").astype("UInt32")
+        elif column in PRODUCT_TEXT and arrow_strings and pyarrow is not None:
+            columns[column] = df[column].astype("string[pyarrow]")
+    return df.assign(**columns)
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def load_products(csv_path: str, columns: Optional[List[str]] = None, arrow_strings: bool = False,
+                  float_dtype: str = "float32", report: bool = True) -> pd.DataFrame:
+    # load_table + apply_product_schema, printing the frame's memory before and after
+    df = load_table(csv_path, columns)
+    if not report:
+        return apply_product_schema(df, arrow_strings, float_dtype)
+    before = memory_mb(df)
+    df = apply_product_schema(df, arrow_strings, float_dtype)
+    print(f" -- {os.path.basename(csv_path)}: {len(df)} rows, {before:.2f} MB -> {memory_mb(df):.2f} MB in memory -- ")
+    return df
+
+
+# Enrich keeps the detail page specs of a processed table in a table of their
+# own, one row per product_url (cleaned_5090.csv -> specs_5090.csv), so
+# re-cleaning the table does not lose them
+def specs_path(csv_path: str) -> str:
+    directory, name = os.path.split(csv_path)
+    return os.path.join(directory, "specs_" + name.removeprefix("cleaned_"))
+
+
+def merge_specs(df: pd.DataFrame, csv_path: str) -> pd.DataFrame:
+    # left-joins the spec_* columns saved for the table at csv_path, if any
+    path = specs_path(csv_path)
+    if not table_exists(path):
+        return df
+    specs = load_table(path)
+    spec_columns = [c for c in specs.columns if c != "product_url"]
+    df = df.drop(columns=[c for c in spec_columns if c in df.columns])
+    merged = df.merge(specs, on="product_url", how="left")
+    merged.index = df.index
+    return merged
+
+
+class TableWriter:
+    # Appends frames to one processed table chunk by chunk: csv rows, parquet
+    # row groups or feather record batches. The schema of the first chunk is
+    # kept, later chunks are cast to it.
+
+    def __init__(self, csv_path: str, fmt: str = "csv"):
+        if fmt != "csv" and pyarrow is None:
+            print(f"[WARN] pyarrow is not installed, saving {os.path.basename(csv_path)} as csv instead of {fmt}.")
+            fmt = "csv"
+        self.fmt = fmt
+        self.path = table_path(csv_path, fmt)
+        self.rows = 0
+        self._file = None
+        self._writer = None
+        self._schema = None
+
+    def write(self, df: pd.DataFrame):
+        if self.fmt == "csv":
+            first = self._file is None
+            if first:
+                self._file = open(self.path, "w", newline="", encoding="utf-8")
+            df.to_csv(self._file, header=first, index=False)
+        else:
+            table = pyarrow.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                if self.fmt == "parquet":
+                    self._writer = pyarrow.parquet.ParquetWriter(self.path, self._schema)
+                else:
+                    options = pyarrow.ipc.IpcWriteOptions(compression="lz4")
+                    self._writer = pyarrow.ipc.new_file(self.path, self._schema, options=options)
+            self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
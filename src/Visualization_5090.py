@@ -1,31 +1,28 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
-import re
 import seaborn as sns
 import os
+import Clean
+import Storage
+import Charts
 
 
 # Helper functions
-def parse_shipping(text):
-    if pd.isna(text) or "Free" in str(text):
-        return 0
-    match = re.search(r"\$(\d+\.?\d*)", str(text))
-    return float(match.group(1)) if match else 0
-
-
 def load_and_prepare_data(csv_path):
-    if not os.path.exists(csv_path):
+    if not Storage.table_exists(csv_path):
         print(f"Error: {csv_path} not found in visualization_5090.")
         return pd.DataFrame()
 
-    df = pd.read_csv(csv_path)
+    df = Storage.load_products(csv_path, columns=["brand", "category", "price", "shipping", "shipping_cost",
+                                                  "total_price", "review_count"])
+    # tables cleaned before shipping_cost / total_price were added to Clean
+    if "total_price" not in df.columns:
+        df = Clean.add_price_columns(df)
 
-    df["shipping_cost"] = df["shipping"].apply(parse_shipping)
-    df["total_price"] = df["price"] + df["shipping_cost"]
-
-    df["brand"] = df["brand"].fillna("Unknown").astype(str).str.strip().str.title()
-    df["category"] = df["category"].fillna("Uncategorized").astype(str).str.strip()
+    # plain strings again: the per-category seaborn plots would otherwise list every brand category
+    df["brand"] = df["brand"].astype(object).fillna("Unknown").astype(str).str.strip().str.title()
+    df["category"] = df["category"].astype(object).fillna("Uncategorized").astype(str).str.strip()
 
     df = df.dropna(subset=["brand", "category", "total_price", "review_count"])
     df["review_count"] = df["review_count"].astype(int)
@@ -33,9 +30,9 @@ def load_and_prepare_data(csv_path):
     return df
 
 
-# Plot functions
-def plot_category_average_price(df):
-    if df.empty: return
+# Chart functions: the aggregate each chart shows, drawn by its plot function
+def chart_category_average_price(df):
+    if df.empty: return None
     
     category_avg = (
         df.groupby("category")["total_price"]
@@ -43,7 +40,51 @@ def plot_category_average_price(df):
           .sort_values(ascending=False)
           .reset_index()
     )
+    return Charts.Chart("gpu_category_avg_price.png", plot_category_average_price, category_avg)
+
+
+def chart_brand_by_category(df):
+    if df.empty: return None
+
+    agg = (
+        df.groupby(["category", "brand"])["total_price"]
+          .mean()
+          .reset_index()
+    )
+
+    if agg.empty: return None
+    return Charts.Chart("gpu_category_bar_brand_consistent_color.png", plot_brand_by_category, agg, dpi=300)
+
+
+def chart_sales_market_share(df):
+    if df.empty: return None
+
+    sales = (
+        df.groupby("brand")["review_count"]
+          .sum()
+          .sort_values(ascending=False)
+    )
+
+    if sales.sum() == 0:
+        print(" ! No sales data (review counts) available for pie chart.")
+        return None
+    return Charts.Chart("gpu_sales_market_share.png", plot_sales_market_share, sales)
+
+
+def chart_price_vs_sales_by_brand(df):
+    if df.empty: return None
+    return Charts.Chart("gpu_price_vs_sales_by_brand.png", plot_price_vs_sales_by_brand,
+                        df[["brand", "total_price", "review_count"]])
+
+
+def chart_price_vs_sales_by_category(df):
+    if df.empty: return None
+    return Charts.Chart("gpu_price_vs_sales_by_category.png", plot_price_vs_sales_by_category,
+                        df[["category", "total_price", "review_count"]])
 
+
+# Plot functions (run by Charts.render_charts, possibly in a worker process)
+def plot_category_average_price(category_avg, output_path):
     try:
         colors = plt.colormaps.get_cmap("Set2").colors
     except AttributeError:
@@ -65,23 +106,11 @@ def plot_category_average_price(df):
     plt.gca().invert_yaxis()
     plt.tight_layout()
     
-    output_path = "../data/images/gpu_category_avg_price.png"
     plt.savefig(output_path)
-    print(f"Saved {output_path}")
     plt.close()
 
 
-def plot_brand_by_category(df):
-    if df.empty: return
-
-    agg = (
-        df.groupby(["category", "brand"])["total_price"]
-          .mean()
-          .reset_index()
-    )
-
-    if agg.empty: return
-
+def plot_brand_by_category(agg, output_path, dpi=300):
     categories = (
         agg.groupby("category")["total_price"]
            .mean()
@@ -128,25 +157,11 @@ def plot_brand_by_category(df):
     )
 
     plt.tight_layout()
-    output_path = "../data/images/gpu_category_bar_brand_consistent_color.png"
-    plt.savefig(output_path, dpi=300)
-    print(f"Saved {output_path}")
+    plt.savefig(output_path, dpi=dpi)
     plt.close()
 
 
-def plot_sales_market_share(df):
-    if df.empty: return
-
-    sales = (
-        df.groupby("brand")["review_count"]
-          .sum()
-          .sort_values(ascending=False)
-    )
-
-    if sales.sum() == 0:
-        print(" ! No sales data (review counts) available for pie chart.")
-        return
-
+def plot_sales_market_share(sales, output_path):
     try:
         colors = plt.colormaps.get_cmap("Blues")(np.linspace(0.4, 0.85, len(sales)))
     except AttributeError:
@@ -167,15 +182,11 @@ def plot_sales_market_share(df):
     ax.set_title("Overall GPU Sales Distribution by Brand", pad=20)
 
     plt.tight_layout()
-    output_path = "../data/images/gpu_sales_market_share.png"
     plt.savefig(output_path)
-    print(f"Saved {output_path}")
     plt.close()
 
 
-def plot_price_vs_sales_by_brand(df):
-    if df.empty: return
-
+def plot_price_vs_sales_by_brand(df, output_path):
     try:
         colors = plt.colormaps.get_cmap("Set2").colors
     except AttributeError:
@@ -203,15 +214,11 @@ def plot_price_vs_sales_by_brand(df):
     ax.legend(title="Brand", bbox_to_anchor=(1.05, 1), loc="upper left")
 
     plt.tight_layout()
-    output_path = "../data/images/gpu_price_vs_sales_by_brand.png"
     plt.savefig(output_path)
-    print(f"Saved {output_path}")
     plt.close()
 
 
-def plot_price_vs_sales_by_category(df):
-    if df.empty: return
-
+def plot_price_vs_sales_by_category(df, output_path):
     try:
         colors = plt.colormaps.get_cmap("Set2").colors
     except AttributeError:
@@ -245,29 +252,29 @@ def plot_price_vs_sales_by_category(df):
     ax.legend(title="Category", bbox_to_anchor=(1.05, 1), loc="upper left")
 
     plt.tight_layout()
-    output_path = "../data/images/gpu_price_vs_sales_by_category.png"
     plt.savefig(output_path)
-    print(f"Saved {output_path}")
     plt.close()
 
 
 # Main Run Function
-def run_visualization_5090():
-    print(" --- Starting Advanced 5090 Visualization --- ")
-    
-    csv_path = "../data/processed/classified_5090.csv"
-    
+def build_charts(csv_path="../data/processed/classified_5090.csv"):
     df = load_and_prepare_data(csv_path)
-    
-    if not df.empty:
-        plot_category_average_price(df)
-        plot_brand_by_category(df)
-        plot_sales_market_share(df)
-        plot_price_vs_sales_by_brand(df)
-        plot_price_vs_sales_by_category(df)
-    else:
+    if df.empty:
         print(" ! Dataframe is empty, skipping advanced visualization.")
-        
+        return []
+    return [
+        chart_category_average_price(df),
+        chart_brand_by_category(df),
+        chart_sales_market_share(df),
+        chart_price_vs_sales_by_brand(df),
+        chart_price_vs_sales_by_category(df),
+    ]
+
+
+def run_visualization_5090(workers=os.cpu_count() or 1):
+    # charts whose data did not change since the last run are not drawn again
+    print(" --- Starting Advanced 5090 Visualization --- ")
+    Charts.render_charts(build_charts(), workers=workers)
     print(" === Advanced 5090 Visualization Completed === \n")
 
 if __name__ == "__main__":
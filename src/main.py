@@ -1,11 +1,25 @@
 import os
 import sys
+import argparse
 import Fetch
+import HttpCache
+import Replay
+import Scheduler
 import Clean
+import Enrich
+import Classify
 import Classify_gpu
 import Visualization_5090
 import Visualization_ssd
 import Analysis
+import Sketches
+import Charts
+import Diff
+import History
+
+# keyword, raw CSV base name, page limit of the default searches
+SEARCHES = [("5090", "newegg_5090_results", 8),
+            ("2tb ssd", "newegg_2tb_ssd_results", 2)]
 
 def ensure_working_directory(expected_dir):
     current_dir = os.getcwd()
@@ -26,29 +40,78 @@ def ensure_working_directory(expected_dir):
     
     return True
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Newegg RTX 5090 / 2TB SSD scraping and analysis pipeline")
+    parser.add_argument("--fetch", choices=["none", "live", "crawl", "replay"], default="none",
+                        help="where step 1 gets the raw CSVs: none keeps the ones in data/raw (default), "
+                             "live scrapes newegg one search at a time, crawl runs every keyword in "
+                             "data/crawl_jobs.csv concurrently, replay rebuilds them from data/raw/page_archive")
+    parser.add_argument("--resume", action="store_true",
+                        help="with --fetch live / crawl, continue interrupted crawls from their checkpoints")
+    parser.add_argument("--enrich", action="store_true",
+                        help="after cleaning, fetch the product detail pages for the spec_* columns")
+    return parser.parse_args(argv)
+
+def main(args=None):
+    if args is None:
+        args = parse_args([])
 
     print("=== Step 1: Fetching Data ===")
-    # 5090 (8 pages)
-    #Fetch.run_fetch("5090", "../data/raw","newegg_5090_results", 8)
-    # 2tb ssd (2 pages)
-    #Fetch.run_fetch("2tb ssd", "../data/raw", "newegg_2tb_ssd_results", 2)
+    # re-runs within an hour are served from data/raw/http_cache, older pages are revalidated
+    if args.fetch == "live":
+        http_cache = HttpCache.HttpCache(ttl=3600)
+        for keyword, output_base, page_limit in SEARCHES:
+            Fetch.run_fetch(keyword, "../data/raw", output_base, page_limit, cache=http_cache, resume=args.resume)
+    elif args.fetch == "crawl":
+        # every keyword in data/crawl_jobs.csv concurrently under one request budget
+        Scheduler.run_jobs_file("../data/crawl_jobs.csv", "../data/raw", cache=HttpCache.HttpCache(ttl=3600),
+                                resume=args.resume)
+    elif args.fetch == "replay":
+        # offline, from the pages in data/raw/page_archive
+        for keyword, output_base, page_limit in SEARCHES:
+            Replay.run_replay(keyword, "../data/raw", output_base, page_limit)
+    else:
+        print("Using the raw CSVs in data/raw (--fetch live / crawl / replay to refresh them)")
+    # every fetch keeps a dated copy in data/raw/snapshots; compare the latest two of each search
+    # (new / removed listings, price, rating, review and shipping changes) for the alert report and Analysis
+    Diff.run_diff("../data", "newegg_5090_results")
+    Diff.run_diff("../data", "newegg_2tb_ssd_results")
 
     print("\n=== Step 2: Cleaning Data ===")
+    # fmt="parquet" (with pyarrow) keeps the processed tables typed and lets later steps load only their columns;
+    # chunksize=100_000 cleans raw dumps larger than memory in bounded chunks
     Clean.run_cleaning("../data")
+    # optional: follow product_url and save the detail page spec_* columns in processed/specs_*.csv;
+    # they survive re-cleaning and are joined back in by the classification step
+    if args.enrich:
+        Enrich.run_enrichment("../data")
 
-    print("\n=== Step 3: Classifying GPU Data ===")
-    Classify_gpu.run_classification()
+    print("\n=== Step 3: Classifying Data ===")
+    # every product family in data/classify_rules.json (GPU tiers, SSD interface / DRAM);
+    # workers=4 matches snapshots with millions of listings in a process pool
+    Classify.run_classification("../data")
+    # max_rows=None lists every GPU instead of the 10 most expensive per category
+    Classify_gpu.report_classification()
+    # append the classified tables to the price history (data/processed/history.sqlite);
+    # History.PriceHistory() then answers price history / daily median / 30-day low queries
+    History.update_history("../data")
 
     print("\n=== Step 4: Analyzing GPU Data ===")
+    # every product family in data/analysis_families.json, merged into one report;
+    # workers=4 analyzes the families in a process pool
     Analysis.run_analysis()
+    # add this snapshot to the running price / rating / review statistics over all snapshots
+    # (data/processed/market_summaries); a snapshot that was already added is skipped
+    Sketches.update_market_summaries("../data")
 
     print("\n=== Step 4: Visualization ===")
-    Visualization_5090.run_visualization_5090()
-    Visualization_ssd.run_visualization()
+    # the GPU and SSD charts are drawn together in a process pool (Agg backend);
+    # a chart whose data did not change since the last run is not drawn again
+    Charts.render_charts(Visualization_5090.build_charts() + Visualization_ssd.build_charts())
     
     print("\n=== All tasks completed. Check 'processed' and 'images' folder. ===")
 
 if __name__ == "__main__":
+    args = parse_args()
     ensure_working_directory(os.path.join(os.path.dirname(__file__), "..", "src"))
-    main()
\ No newline at end of file
+    main(args)
\ No newline at end of file
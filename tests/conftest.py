@@ -0,0 +1,38 @@
+import os
+import sys
+import pytest
+
+# the pipeline modules are flat files in src/ and use paths relative to it
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+ARCHIVE_DIR = os.path.join(DATA_DIR, "raw", "page_archive")
+sys.path.insert(0, SRC_DIR)
+
+import Benchmark
+from RateLimit import AdaptiveRateLimiter
+
+
+@pytest.fixture(autouse=True)
+def in_src_dir(monkeypatch):
+    monkeypatch.chdir(SRC_DIR)
+
+
+@pytest.fixture(scope="session")
+def search_url():
+    # the Benchmark stand-in for newegg, serving the committed page archive
+    # ("5090": 8 pages, "2tb ssd": 2 pages); crawls append the keyword
+    server = Benchmark.start_local_server(ARCHIVE_DIR, latency=0.0)
+    yield f"http://127.0.0.1:{server.server_address[1]}/p/pl?d="
+    server.shutdown()
+
+
+@pytest.fixture
+def limiter():
+    # the local server can take far more than newegg
+    return AdaptiveRateLimiter(initial_rate=200.0, max_rate=1000.0)
+
+
+def raw_csv(name: str) -> bytes:
+    with open(os.path.join(DATA_DIR, "raw", name), "rb") as f:
+        return f.read()
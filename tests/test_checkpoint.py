@@ -0,0 +1,108 @@
+import os
+import json
+import pytest
+import Archive
+import Fetch
+from Checkpoint import CheckpointedCsvSink
+from conftest import raw_csv
+
+
+def write_pages(sink, rows, pages):
+    for page in pages:
+        sink.write_page(page, rows[page])
+
+
+def test_checkpoint_resume_truncates_unfinished_page(tmp_path):
+    rows = {page: [{"title": f"item {page}-{i}", "price": page * 10 + i} for i in range(3)] for page in (1, 2, 3)}
+    expected_path = str(tmp_path / "expected.csv")
+    sink = CheckpointedCsvSink(expected_path, "kw")
+    write_pages(sink, rows, [1, 2, 3])
+    sink.close()
+
+    csv_path = str(tmp_path / "out.csv")
+    sink = CheckpointedCsvSink(csv_path, "kw")
+    write_pages(sink, rows, [1, 2])
+    sink.close()
+    # page 3 reached the CSV but the run died before its checkpoint
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write("item 3-0,30\nitem 3-1,3")
+
+    sink = CheckpointedCsvSink(csv_path, "kw", resume=True)
+    assert (sink.next_page, sink.rows_written) == (3, 6)
+    write_pages(sink, rows, [3])
+    sink.close()
+    assert open(csv_path, "rb").read() == open(expected_path, "rb").read()
+    with open(f"{csv_path}.checkpoint.json", encoding="utf-8") as f:
+        assert json.load(f)["last_page"] == 3
+
+
+def test_checkpoint_of_another_keyword_starts_over(tmp_path):
+    csv_path = str(tmp_path / "out.csv")
+    sink = CheckpointedCsvSink(csv_path, "kw")
+    sink.write_page(1, [{"title": "a"}])
+    sink.close()
+    sink = CheckpointedCsvSink(csv_path, "other", resume=True)
+    assert sink.next_page == 1
+    assert not os.path.exists(f"{csv_path}.checkpoint.json")
+
+
+def test_resumed_crawl_continues_after_last_checkpoint(search_url, limiter, tmp_path, monkeypatch):
+    save_checkpoint = CheckpointedCsvSink._save_checkpoint
+
+    def crash_on_page_3(sink):
+        if sink.last_page == 3:
+            raise RuntimeError("killed")
+        save_checkpoint(sink)
+
+    archive_dir = str(tmp_path / "archive")
+    crawl = dict(backend="strainer", search_url=search_url, archive_dir=archive_dir, snapshot_dir=None)
+    monkeypatch.setattr(CheckpointedCsvSink, "_save_checkpoint", crash_on_page_3)
+    with pytest.raises(RuntimeError):
+        Fetch.run_fetch("5090", str(tmp_path), "newegg_5090_results", 8, limiter=limiter, **crawl)
+    monkeypatch.setattr(CheckpointedCsvSink, "_save_checkpoint", save_checkpoint)
+
+    Fetch.run_fetch("5090", str(tmp_path), "newegg_5090_results", 8, limiter=limiter, resume=True, **crawl)
+    assert (tmp_path / "Raw_newegg_5090_results_p8.csv").read_bytes() == raw_csv("Raw_newegg_5090_results_p8.csv")
+    # pages 1-2 were not fetched again, page 3 was
+    fetched = [int(entry["page"]) for entry in Archive.load_index(archive_dir)]
+    assert fetched == [1, 2, 3] + list(range(3, 9))
+
+
+def read_checkpoint(csv_path):
+    with open(f"{csv_path}.checkpoint.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_finished_checkpoint_starts_over(tmp_path):
+    csv_path = str(tmp_path / "out.csv")
+    sink = CheckpointedCsvSink(csv_path, "kw")
+    sink.write_page(1, [{"title": "a"}])
+    sink.finish()
+    assert read_checkpoint(csv_path)["finished"]
+    sink = CheckpointedCsvSink(csv_path, "kw", resume=True)
+    assert (sink.next_page, sink.rows_written) == (1, 0)
+    assert not os.path.exists(f"{csv_path}.checkpoint.json")
+
+
+def test_failed_page_leaves_the_crawl_resumable(search_url, limiter, tmp_path, monkeypatch):
+    fetch_html = Fetch.fetch_html
+
+    def fail_page_3(url, **kwargs):
+        return None if url.endswith("&page=3") else fetch_html(url, **kwargs)
+
+    archive_dir = str(tmp_path / "archive")
+    crawl = dict(backend="strainer", search_url=search_url, archive_dir=archive_dir, snapshot_dir=None)
+    csv_path = tmp_path / "Raw_newegg_5090_results_p8.csv"
+    monkeypatch.setattr(Fetch, "fetch_html", fail_page_3)
+    Fetch.run_fetch("5090", str(tmp_path), "newegg_5090_results", 8, limiter=limiter, **crawl)
+    monkeypatch.setattr(Fetch, "fetch_html", fetch_html)
+    checkpoint = read_checkpoint(str(csv_path))
+    assert (checkpoint["last_page"], checkpoint["finished"]) == (2, False)
+
+    Fetch.run_fetch("5090", str(tmp_path), "newegg_5090_results", 8, limiter=limiter, resume=True, **crawl)
+    assert csv_path.read_bytes() == raw_csv("Raw_newegg_5090_results_p8.csv")
+    assert read_checkpoint(str(csv_path))["finished"]
+    # resuming the finished crawl fetches every page again
+    Fetch.run_fetch("5090", str(tmp_path), "newegg_5090_results", 8, limiter=limiter, resume=True, **crawl)
+    assert csv_path.read_bytes() == raw_csv("Raw_newegg_5090_results_p8.csv")
+    assert [int(entry["page"]) for entry in Archive.load_index(archive_dir)] == list(range(1, 9)) * 2
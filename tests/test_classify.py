@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+import Classify
+import Classify_gpu
+from conftest import DATA_DIR
+
+EDGE_TITLES = [
+    "  msi geforce rtx 5090   32g  suprim liquid soc  ",
+    "ASUS ROG Astral\tRTX 5090\nOC",
+    "GIGABYTE AORUS GeForce RTX 5090 MASTER ICE",
+    "",
+    "Samsung 990 PRO 2TB PCIe 4.0 NVMe M.2",
+    "Crucial 2TB SATA 2.5-Inch",
+    None,
+    np.nan,
+    42,
+]
+
+
+@pytest.fixture(scope="module")
+def titles():
+    raw = [pd.read_csv(f"{DATA_DIR}/raw/{name}")["title"] for name in
+           ["Raw_newegg_5090_results_p8.csv", "Raw_newegg_2tb_ssd_results_p2.csv"]]
+    return pd.concat(raw + [pd.Series(EDGE_TITLES, dtype=object)], ignore_index=True)
+
+
+def test_classify_gpu_titles_matches_classify_gpu_logic(titles):
+    expected = [Classify_gpu.classify_gpu_logic(title) for title in titles]
+    # twice: the second run is answered from the label cache
+    for _ in range(2):
+        assert Classify_gpu.classify_gpu_titles(titles).astype(str).tolist() == expected
+
+
+def test_classify_gpu_logic_works_outside_src(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert Classify_gpu.classify_gpu_logic("MSI GeForce RTX 5090 SUPRIM LIQUID SOC") == "Water Cooled Flagship"
+    spec = dict(Classify.load_rules()["gpu"].spec, columns={"category": {"default": "Other", "rules": []}})
+    rules = Classify.RuleSet("gpu", spec)
+    assert Classify_gpu.classify_gpu_logic("MSI GeForce RTX 5090 SUPRIM LIQUID SOC", rules=rules) == "Other"
+
+
+@pytest.mark.parametrize("family", ["gpu", "ssd"])
+def test_rule_set_matches_match_one(family, titles):
+    rules = Classify.RuleSet(family, Classify.load_rules()[family].spec)
+    labels = rules.classify(titles)
+    assert labels.index.equals(titles.index)
+    for column in rules.columns:
+        expected = [rules.match_one(Classify.normalize_title(title))[column] if isinstance(title, str)
+                    else rules.defaults[column] for title in titles]
+        assert labels[column].astype(str).tolist() == expected
+        assert list(labels[column].cat.categories) == rules.labels(column)
+
+
+def test_chunked_process_pool_matches_serial(titles):
+    rules = Classify.RuleSet("gpu", Classify.load_rules()["gpu"].spec, cache_size=0)
+    serial = rules.classify(titles)
+    pooled = rules.classify(titles, workers=2, chunksize=25)
+    pd.testing.assert_frame_equal(pooled, serial)
+
+
+def test_label_cache_is_bounded_and_ignores_other_rules(tmp_path):
+    rules = Classify.RuleSet("gpu", Classify.load_rules()["gpu"].spec, cache_size=3)
+    rules.classify(pd.Series([f"RTX 5090 card {i}" for i in range(10)]))
+    assert len(rules.cache) == 3
+    path = str(tmp_path / "gpu.json")
+    rules.cache.save(path, rules.fingerprint)
+    other = Classify.RuleSet("gpu", Classify.load_rules()["gpu"].spec)
+    other.cache.load(path, "another fingerprint")
+    assert len(other.cache) == 0
+    other.cache.load(path, rules.fingerprint)
+    assert len(other.cache) == 3
@@ -0,0 +1,107 @@
+import gzip
+import os
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import pytest
+import Diff
+
+COLUMNS = ["title", "product_url", "brand", "price", "rating", "review_count", "shipping"]
+OLD = [
+    ("Steady", "https://www.newegg.com/steady/p/N82E1", "ASUS", 1999.99, 4.5, 100, "Free Shipping"),
+    ("Cheaper", "https://www.newegg.com/cheaper/p/N82E2", "MSI", 2499.99, 4.0, 10, "Free Shipping"),
+    ("Sold out", "https://www.newegg.com/sold-out/p/N82E3", "PNY", 2199.00, 4.2, 5, "Free Shipping"),
+    ("Rated", "https://www.newegg.com/rated/p/N82E4", "ZOTAC", 2299.00, 3.0, 2, "Free Shipping"),
+    ("Shipping", "https://www.newegg.com/shipping/p/N82E5", "ASUS", 2399.00, np.nan, np.nan, "Free Shipping"),
+    ("Delisted", "https://www.newegg.com/delisted/p/N82E6", "MSI", 2599.00, 4.9, 50, "Free Shipping"),
+    ("Penny", "https://www.newegg.com/penny/p/N82E7", "PNY", 1500.00, 4.1, 7, "Free Shipping"),
+]
+NEW = [
+    ("Steady", "https://www.newegg.com/steady/p/N82E1", "ASUS", 1999.99, 4.5, 100, "Free Shipping"),
+    ("Cheaper", "https://www.newegg.com/cheaper/p/N82E2", "MSI", 2249.99, 4.0, 10, "Free Shipping"),
+    ("Sold out", "https://www.newegg.com/sold-out/p/N82E3", "PNY", np.nan, 4.2, 5, "Free Shipping"),
+    ("Rated", "https://www.newegg.com/rated/p/N82E4", "ZOTAC", 2299.00, 3.5, 14, "Free Shipping"),
+    # same item under another URL slug
+    ("Shipping", "https://www.newegg.com/shipping-v2/p/n82e5", "ASUS", 2399.00, np.nan, np.nan,
+     "$9.99 Shipping"),
+    ("Penny", "https://www.newegg.com/penny/p/N82E7", "PNY", 1500.001, 4.1, 7, "Free Shipping"),
+    ("Launch", "https://www.newegg.com/launch/p/N82E8", "ZOTAC", 2799.00, np.nan, np.nan, "Free Shipping"),
+]
+
+
+def frame(rows):
+    return Diff.prepare_snapshot(pd.DataFrame(rows, columns=COLUMNS))
+
+
+def keys(changes, kind):
+    return changes.frames[kind]["key"].tolist()
+
+
+def test_change_sets():
+    changes = Diff.diff_snapshots(frame(OLD), frame(NEW))
+    assert changes.counts() == {"new": 1, "removed": 1, "price": 1, "availability": 1, "rating": 1,
+                                "reviews": 1, "shipping": 1}
+    assert keys(changes, "new") == ["N82E8"]
+    assert keys(changes, "removed") == ["N82E6"]
+    assert keys(changes, "price") == ["N82E2"]
+    assert keys(changes, "availability") == ["N82E3"]
+    assert keys(changes, "rating") == keys(changes, "reviews") == ["N82E4"]
+    assert keys(changes, "shipping") == ["N82E5"]
+
+    price = changes.frames["price"].iloc[0]
+    assert (price["old_price"], price["new_price"]) == (2499.99, 2249.99)
+    assert price["price_delta"] == pytest.approx(-250.0)
+    assert price["price_pct"] == pytest.approx(-250 / 2499.99 * 100)
+    shipping = changes.frames["shipping"].iloc[0]
+    assert (shipping["old_shipping_cost"], shipping["new_shipping_cost"]) == (0.0, 9.99)
+    # identity columns come from the new snapshot
+    assert shipping["product_url"] == "https://www.newegg.com/shipping-v2/p/n82e5"
+    assert changes.frames["reviews"].iloc[0]["review_count_delta"] == 12
+
+
+def test_identical_snapshots_have_no_changes():
+    changes = Diff.diff_snapshots(frame(OLD), frame(OLD))
+    assert sum(changes.counts().values()) == 0
+    assert changes.to_frame().empty
+
+
+def test_to_frame_lists_every_change():
+    table = Diff.diff_snapshots(frame(OLD), frame(NEW)).to_frame()
+    assert table.columns[0] == "change"
+    assert sorted(table["change"]) == sorted(Diff.CHANGE_KINDS)
+
+
+def test_product_keys():
+    keys = Diff.product_keys(["https://www.newegg.com/a/p/n82e1?item=1", "https://example.com/Item/#reviews",
+                              None])
+    assert keys.iloc[0] == "N82E1"
+    assert keys.iloc[1] == "https://example.com/item"
+    assert pd.isna(keys.iloc[2])
+
+
+def write_raw(path, rows):
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, index=False)
+
+
+def test_snapshots_are_named_by_time_and_digest_and_not_repeated(tmp_path):
+    raw = str(tmp_path / "raw.csv")
+    snapshot_dir = str(tmp_path / "snapshots")
+    write_raw(raw, OLD)
+    taken_at = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    first = Diff.save_snapshot(raw, "gpu", snapshot_dir, taken_at=taken_at)
+    assert first == os.path.join(snapshot_dir, "gpu", "20260102T030405Z_" + Diff.content_digest(raw)[:16] + ".csv.gz")
+    assert Diff.snapshot_time(first) == taken_at
+    assert Diff.snapshot_digest(first) == Diff.content_digest(raw)[:Diff.SNAPSHOT_DIGEST_LENGTH]
+    with gzip.open(first, "rb") as f, open(raw, "rb") as original:
+        assert f.read() == original.read()
+
+    # unchanged content adds no snapshot, new content in the same second does
+    assert Diff.save_snapshot(raw, "gpu", snapshot_dir, taken_at=taken_at) == first
+    write_raw(raw, NEW)
+    second = Diff.save_snapshot(raw, "gpu", snapshot_dir, taken_at=taken_at)
+    assert second != first
+    assert Diff.list_snapshots("gpu", snapshot_dir) == [first, second]
+    assert Diff.find_snapshot(raw, "gpu", snapshot_dir) == second
+
+    changes = Diff.diff_snapshots(first, second)
+    assert changes.counts()["new"] == 1
@@ -0,0 +1,34 @@
+import pandas as pd
+import Classify
+import Enrich
+from conftest import DATA_DIR
+
+
+def test_classify_family_joins_enriched_specs(tmp_path):
+    processed = tmp_path / "processed"
+    processed.mkdir()
+    cleaned = pd.read_csv(f"{DATA_DIR}/processed/cleaned_5090.csv")
+    cleaned.to_csv(processed / "cleaned_5090.csv", index=False)
+    urls = cleaned["product_url"].tolist()[:2]
+    pd.DataFrame({"product_url": urls, "spec_cooler": ["Liquid", "Fan"]}).to_csv(processed / "specs_5090.csv",
+                                                                                 index=False)
+    rules = Classify.RuleSet("gpu", Classify.load_rules()["gpu"].spec)
+    df = Classify.classify_family(rules, str(tmp_path), cache_dir=None)
+    assert len(df) == len(cleaned)
+    assert df["spec_cooler"].tolist()[:2] == ["Liquid", "Fan"]
+    assert df["spec_cooler"].iloc[2:].isna().all()
+    assert "spec_cooler" in pd.read_csv(processed / rules.output).columns
+
+
+def test_failed_detail_page_keeps_earlier_specs(tmp_path, monkeypatch):
+    csv_path = str(tmp_path / "cleaned_5090.csv")
+    urls = ["https://www.newegg.com/a/p/N82E1", "https://www.newegg.com/b/p/N82E2", "https://www.newegg.com/c/p/N82E3"]
+    pd.DataFrame({"product_url": urls}).to_csv(csv_path, index=False)
+    pd.DataFrame({"product_url": urls[:2], "spec_cooler": ["Liquid", "Fan"]}).to_csv(tmp_path / "specs_5090.csv",
+                                                                                   index=False)
+    # a's page fails, b and c are fetched
+    fetched = {urls[0]: {}, urls[1]: {"spec_cooler": "Blower"}, urls[2]: {"spec_cooler": "Fan"}}
+    monkeypatch.setattr(Enrich, "fetch_detail_specs", lambda urls, **kwargs: fetched)
+    Enrich.enrich_csv(csv_path)
+    specs = pd.read_csv(tmp_path / "specs_5090.csv").set_index("product_url")["spec_cooler"]
+    assert specs.to_dict() == {urls[0]: "Liquid", urls[1]: "Blower", urls[2]: "Fan"}
@@ -0,0 +1,50 @@
+import pytest
+import Archive
+import Benchmark
+import Fetch
+from conftest import ARCHIVE_DIR, raw_csv
+
+
+@pytest.fixture(scope="module")
+def pages():
+    # the latest archived copy of every page, in keyword / page order
+    return [Archive.read_page(digest, ARCHIVE_DIR) for digest in Benchmark.archived_pages(ARCHIVE_DIR).values()]
+
+
+@pytest.fixture(scope="module")
+def soup_rows(pages):
+    return [Fetch.parse_search_page(html, "") for html in pages]
+
+
+@pytest.mark.parametrize("backend", ["strainer", "lxml"])
+def test_dom_backends_match_soup(backend, pages, soup_rows):
+    if backend == "lxml":
+        pytest.importorskip("lxml")
+    assert len(pages) == 10
+    for html, expected in zip(pages, soup_rows):
+        assert Fetch.parse_search_page(html, "", backend=backend) == expected
+
+
+def test_unknown_backend_is_rejected(pages):
+    with pytest.raises(ValueError):
+        Fetch.parse_search_page(pages[0], "", backend="regex")
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_crawl_csv_is_byte_identical(concurrency, search_url, limiter, tmp_path):
+    # sequential and concurrent crawls both rebuild the committed raw CSV
+    Fetch.run_fetch("5090", str(tmp_path), "newegg_5090_results", 8, concurrency=concurrency,
+                    backend="strainer", limiter=limiter, search_url=search_url,
+                    archive_dir=str(tmp_path / "archive"), snapshot_dir=None)
+    assert (tmp_path / "Raw_newegg_5090_results_p8.csv").read_bytes() == raw_csv("Raw_newegg_5090_results_p8.csv")
+    assert len(Archive.load_index(str(tmp_path / "archive"))) == 8
+
+
+def test_crawl_archives_pages_outside_the_default_archive(search_url, limiter, tmp_path):
+    before = Archive.load_index(ARCHIVE_DIR)
+    Fetch.run_fetch("2tb ssd", str(tmp_path), "newegg_2tb_ssd_results", 2, backend="strainer", limiter=limiter,
+                    search_url=search_url, archive_dir=str(tmp_path / "archive"), snapshot_dir=None)
+    assert Archive.load_index(ARCHIVE_DIR) == before
+    entries = Archive.latest_pages("2tb ssd", str(tmp_path / "archive"))
+    assert sorted(entries) == [1, 2]
+    assert entries[2]["url"] == f"{search_url}2tb+ssd&page=2"
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+import GroupStats
+
+
+@pytest.fixture(scope="module")
+def df():
+    rng = np.random.default_rng(7)
+    n = 2_000
+    df = pd.DataFrame({
+        "brand": rng.choice(["ASUS", "MSI", "ZOTAC", "PNY", None], size=n, p=[0.3, 0.3, 0.2, 0.15, 0.05]),
+        "category": pd.Categorical(rng.choice(["Basic", "Game-enhanced", "Air Cooled Flagship"], size=n),
+                                   categories=["Water Cooled Flagship", "Air Cooled Flagship", "Game-enhanced",
+                                               "Basic"]),
+        "price": rng.lognormal(7.5, 0.3, size=n).round(2),
+        "rating": rng.choice([np.nan, 3.0, 4.0, 4.5, 5.0], size=n),
+        "title": rng.choice(["card", None], size=n, p=[0.9, 0.1]),
+    })
+    df.loc[rng.choice(n, 100, replace=False), "price"] = np.nan
+    # a brand whose only listing has no price
+    df.loc[n - 1, ["brand", "price"]] = ["LONELY", np.nan]
+    return df
+
+
+@pytest.fixture(scope="module")
+def group_stats(df):
+    return GroupStats.GroupStats(df, ["category", "brand"], value="price", means=["rating"], counts=["title"])
+
+
+@pytest.mark.parametrize("key", ["category", "brand"])
+def test_by_key_matches_groupby(df, group_stats, key):
+    grouped = df.groupby(key, observed=True)
+    expected = grouped["price"].agg(["size", "count", "mean", "median", "min", "max", "std"])
+    table = group_stats.by[key]
+    assert list(table.index) == list(expected.index)
+    assert table["rows"].tolist() == expected["size"].tolist()
+    assert table["count"].tolist() == expected["count"].tolist()
+    for column in ["mean", "median", "min", "max", "std"]:
+        np.testing.assert_allclose(table[column], expected[column], rtol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(table["rating_mean"], grouped["rating"].mean(), rtol=1e-9)
+    assert table["rating_count"].tolist() == grouped["rating"].count().tolist()
+    assert table["title_count"].tolist() == grouped["title"].count().tolist()
+
+
+def test_overall_matches_whole_column(df, group_stats):
+    overall = group_stats.overall
+    assert overall["rows"] == len(df)
+    assert overall["count"] == df["price"].count()
+    for column in ["mean", "median", "min", "max", "std"]:
+        assert overall[column] == pytest.approx(getattr(df["price"], column)(), rel=1e-9)
+
+
+def test_nunique_matches_groupby(df, group_stats):
+    expected = df.groupby("category", observed=True)["brand"].nunique()
+    assert group_stats.nunique("category", "brand").tolist() == expected.tolist()
+
+
+@pytest.mark.parametrize("key, groups", [("category", ["Basic", "Game-enhanced", "Air Cooled Flagship"]),
+                                         ("brand", ["ASUS", "MSI", "PNY"])])
+def test_anova_matches_f_oneway(df, group_stats, key, groups):
+    samples = [df.loc[df[key] == group, "price"].dropna() for group in groups]
+    expected = stats.f_oneway(*samples)
+    f_stat, p_value = group_stats.anova(key, groups)
+    assert f_stat == pytest.approx(expected.statistic, rel=1e-9)
+    assert p_value == pytest.approx(expected.pvalue, rel=1e-6)
+
+
+def test_pooled_mean(df, group_stats):
+    groups = ["ASUS", "MSI"]
+    assert group_stats.pooled_mean("brand", groups) == pytest.approx(df.loc[df["brand"].isin(groups), "price"].mean())
+
+
+def test_price_tiers():
+    tiers = GroupStats.price_tiers([999.99, 1000, 1499.99, 1500, 2500, np.nan])
+    assert list(tiers.codes) == [0, 1, 1, 2, 3, -1]
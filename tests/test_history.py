@@ -0,0 +1,124 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import Classify
+import Diff
+import History
+
+URL_A = "https://www.newegg.com/card-a/p/N82E1"
+URL_B = "https://www.newegg.com/card-b/p/N82E2"
+URL_C = "https://www.newegg.com/card-c/p/N82E3"
+
+
+def snapshot(prices):
+    # one classified gpu table, prices for cards A / B / C (None: not listed)
+    rows = [("Card A", URL_A, "ASUS", "Basic"), ("Card B", URL_B, "MSI", "Basic"),
+            ("Card C", URL_C, "MSI", "Air Cooled Flagship")]
+    return pd.DataFrame([{"title": title, "product_url": url, "brand": brand, "category": category,
+                          "price": price, "rating": 4.5, "review_count": 10}
+                         for (title, url, brand, category), price in zip(rows, prices) if price is not None])
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = History.PriceHistory(str(tmp_path / "history.sqlite"))
+    for taken_at, prices, digest in [("2026-01-01T10:00:00+00:00", [2000.0, 2100.0, 2500.0], "d1"),
+                                     ("2026-01-01T22:00:00+00:00", [1900.0, 2100.0, 2500.0], "d2"),
+                                     # a local time, stored in UTC (2026-01-20T10:00:00Z)
+                                     ("2026-01-20T12:00:00+02:00", [1950.0, np.nan, 2400.0], "d3"),
+                                     ("2026-02-15T10:00:00", [2050.0, 2000.0, None], "d4")]:
+        history.append("gpu", snapshot(prices), taken_at=taken_at, digest=digest, labels=["category"])
+    yield history
+    history.close()
+
+
+def test_snapshots_are_dated_by_taken_at(history):
+    snapshots = history.snapshots("gpu")
+    assert snapshots["taken_at"].tolist() == ["2026-01-01T10:00:00+00:00", "2026-01-01T22:00:00+00:00",
+                                              "2026-01-20T10:00:00+00:00", "2026-02-15T10:00:00+00:00"]
+    assert snapshots["rows"].tolist() == [3, 3, 3, 2]
+
+
+def test_append_requires_taken_at(history):
+    with pytest.raises(ValueError):
+        history.append("gpu", snapshot([1.0, 2.0, 3.0]), taken_at=None)
+
+
+def test_a_scrape_appended_again_is_skipped_or_replaced(history):
+    # the same scrape with the same table adds nothing
+    assert history.append("gpu", snapshot([2000.0, 2100.0, 2500.0]), taken_at="2026-01-01T10:00:00+00:00",
+                          digest="d1") == 0
+    # re-classified, it replaces the snapshot's observations instead of adding to them
+    assert history.append("gpu", snapshot([1800.0, None, 2500.0]), taken_at="2026-01-01T12:00:00+02:00",
+                          digest="d1b") == 2
+    assert history.snapshots("gpu")["digest"].tolist() == ["d1b", "d2", "d3", "d4"]
+    assert history.price_history("gpu", URL_A)["price"].tolist() == [1800.0, 1900.0, 1950.0, 2050.0]
+    first_day = history.daily_stats("gpu").iloc[0]
+    assert (first_day["count"], first_day["min"]) == (5, 1800.0)
+    # another scrape with a known table is still a new snapshot
+    assert history.append("gpu", snapshot([1.0, 2.0, 3.0]), taken_at="2026-03-01T00:00:00", digest="d1") == 3
+    assert len(history.snapshots("gpu")) == 5
+
+
+def test_price_history(history):
+    table = history.price_history("gpu", URL_A)
+    assert table["price"].tolist() == [2000.0, 1900.0, 1950.0, 2050.0]
+    # another URL of the same item number is the same product
+    assert history.price_history("gpu", "https://www.newegg.com/renamed/p/n82e1")["price"].tolist() == \
+        table["price"].tolist()
+
+
+def test_daily_stats(history):
+    overall = history.daily_stats("gpu")
+    assert overall["day"].tolist() == ["2026-01-01", "2026-01-20", "2026-02-15"]
+    first_day = overall.iloc[0]
+    prices = [2000.0, 2100.0, 2500.0, 1900.0, 2100.0, 2500.0]
+    assert (first_day["count"], first_day["min"], first_day["max"]) == (6, 1900.0, 2500.0)
+    assert first_day["median"] == np.median(prices)
+    assert first_day["mean"] == pytest.approx(np.mean(prices))
+
+    msi = history.daily_stats("gpu", key="brand", value="MSI", since="2026-01-02")
+    assert msi["day"].tolist() == ["2026-01-20", "2026-02-15"]
+    # B had no price on the 20th
+    assert msi["count"].tolist() == [1, 1] and msi["mean"].tolist() == [2400.0, 2000.0]
+    category = history.daily_stats("gpu", key="category", until="2026-01-01")
+    assert dict(zip(category["value"], category["count"])) == {"Air Cooled Flagship": 2, "Basic": 4}
+
+
+def test_lowest_price_window(history):
+    assert history.lowest_price("gpu", URL_A, days=30) == {"price": 1950.0, "taken_at": "2026-01-20T10:00:00+00:00"}
+    assert history.lowest_price("gpu", URL_A, days=60)["price"] == 1900.0
+    assert history.lowest_price("gpu", URL_A, days=1, as_of="2026-01-01T23:00:00+00:00")["price"] == 1900.0
+    # C was not listed in the last 10 days
+    assert history.lowest_price("gpu", URL_C, days=10) is None
+
+
+def test_lowest_prices(history):
+    table = history.lowest_prices("gpu", days=30)
+    assert table["product_url"].tolist() == [URL_A, URL_B, URL_C]
+    assert table["lowest_price"].tolist() == [1950.0, 2000.0, 2400.0]
+    # as_of in another time zone is the same instant
+    table = history.lowest_prices("gpu", days=1, as_of="2026-01-20T12:00:00+02:00")
+    assert dict(zip(table["product_url"], table["lowest_price"])) == {URL_A: 1950.0, URL_C: 2400.0}
+
+
+def test_update_history_dates_families_by_their_scrape(tmp_path):
+    rules_file = Classify.RULES_FILE
+    os.makedirs(tmp_path / "raw")
+    os.makedirs(tmp_path / "processed")
+    raw_path = tmp_path / "raw" / "Raw_newegg_5090_results_p8.csv"
+    snapshot([2000.0, 2100.0, 2500.0]).to_csv(raw_path, index=False)
+    classified = Classify.load_rules(rules_file)["gpu"].output
+    snapshot([2000.0, 2100.0, 2500.0]).to_csv(tmp_path / "processed" / classified, index=False)
+    snapshot_dir = str(tmp_path / "snapshots")
+    taken_at = pd.Timestamp("2026-01-05T06:07:08Z").to_pydatetime()
+    Diff.save_snapshot(str(raw_path), "newegg_5090_results", snapshot_dir, taken_at=taken_at)
+
+    db_path = str(tmp_path / "history.sqlite")
+    added = History.update_history(str(tmp_path), rules_file, db_path, snapshot_dir=snapshot_dir)
+    # the ssd table is missing and is skipped
+    assert added == {"gpu": 3}
+    with History.PriceHistory(db_path) as history:
+        assert history.snapshots("gpu")["taken_at"].tolist() == ["2026-01-05T06:07:08+00:00"]
+    assert History.update_history(str(tmp_path), rules_file, db_path, snapshot_dir=snapshot_dir) == {"gpu": 0}
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+import Resample
+
+
+@pytest.fixture(scope="module")
+def sample():
+    rng = np.random.default_rng(3)
+    labels = np.repeat(["Basic", "Game-enhanced", "Flagship"], [40, 25, 12])
+    # prices rounded to whole dollars, so the ranks have ties
+    values = np.round(np.concatenate([rng.normal(2100, 150, 40), rng.normal(2300, 200, 25),
+                                      rng.normal(2600, 250, 12)]))
+    values[[3, 50]] = np.nan
+    return values, labels
+
+
+def test_f_and_h_match_scipy(sample):
+    values, labels = sample
+    result = Resample.permutation_anova(values, labels, resamples=2_000, seed=1)
+    groups = [values[(labels == group) & ~np.isnan(values)] for group in result["groups"]]
+    f_oneway = stats.f_oneway(*groups)
+    kruskal = stats.kruskal(*groups)
+    assert result["groups"] == ["Basic", "Game-enhanced", "Flagship"]
+    assert result["f_stat"] == pytest.approx(f_oneway.statistic, rel=1e-9)
+    assert result["f_p_value_asymptotic"] == pytest.approx(f_oneway.pvalue, rel=1e-6)
+    assert result["h_stat"] == pytest.approx(kruskal.statistic, rel=1e-9)
+    assert result["h_p_value_asymptotic"] == pytest.approx(kruskal.pvalue, rel=1e-6)
+    # a difference this large is hardly ever matched by a shuffle
+    assert result["f_p_value"] == result["h_p_value"] == pytest.approx(1 / 2_001)
+
+
+def test_permutation_p_values_of_identical_groups_are_large():
+    rng = np.random.default_rng(5)
+    values = rng.normal(100, 10, 90)
+    result = Resample.permutation_anova(values, np.tile(["a", "b", "c"], 30), resamples=2_000, seed=2)
+    assert result["f_p_value"] > 0.01 and result["h_p_value"] > 0.01
+    assert result["f_p_value"] == pytest.approx(result["f_p_value_asymptotic"], abs=0.05)
+
+
+def test_seed_makes_results_reproducible(sample):
+    values, labels = sample
+    first = Resample.permutation_anova(values, labels, resamples=500, seed=9)
+    assert Resample.permutation_anova(values, labels, resamples=500, seed=9) == first
+
+
+def test_batches_cover_every_resample(sample, monkeypatch):
+    values, labels = sample
+    expected = Resample.permutation_anova(values, labels, resamples=300, seed=4)
+    monkeypatch.setattr(Resample, "MAX_BATCH_CELLS", 1_000)
+    batched = Resample.permutation_anova(values, labels, resamples=300, seed=4)
+    assert batched["f_stat"] == expected["f_stat"] and batched["resamples"] == 300
+
+
+def test_single_group_is_rejected():
+    with pytest.raises(ValueError):
+        Resample.permutation_anova([1.0, 2.0, 3.0], ["a", "a", "a"], resamples=10)
+
+
+def test_bootstrap_interval_contains_estimate(sample):
+    values, labels = sample
+    table = Resample.bootstrap_ci(values, labels, stat="median", resamples=2_000, seed=0)
+    assert list(table.index) == ["Basic", "Game-enhanced", "Flagship"]
+    for group, row in table.iterrows():
+        group_values = values[(labels == group) & ~np.isnan(values)]
+        assert row["n"] == len(group_values)
+        assert row["median"] == np.median(group_values)
+        assert row["low"] <= row["median"] <= row["high"]
+
+
+def test_holm_adjustment():
+    adjusted = Resample.holm([0.01, 0.04, 0.03, 0.2])
+    np.testing.assert_allclose(adjusted, [0.04, 0.09, 0.09, 0.2])
+
+
+def test_pairwise_permutation_pairs_and_holm(sample):
+    values, labels = sample
+    table = Resample.pairwise_permutation(values, labels, resamples=1_000, seed=0)
+    assert list(zip(table["group_a"], table["group_b"])) == [("Basic", "Game-enhanced"), ("Basic", "Flagship"),
+                                                              ("Game-enhanced", "Flagship")]
+    means = pd.Series(values).groupby(labels).mean()
+    assert table["mean_diff"].iloc[0] == pytest.approx(means["Basic"] - means["Game-enhanced"])
+    assert (table["p_holm"] >= table["p_value"]).all()
@@ -0,0 +1,97 @@
+from collections import deque
+import Fetch
+import Scheduler
+from conftest import raw_csv
+
+
+def make_jobs(tmp_path, page_limits):
+    return [Scheduler.CrawlJob(f"kw{i}", str(tmp_path), f"kw{i}", page_limit)
+            for i, page_limit in enumerate(page_limits)]
+
+
+def dispatch(queue, slots, per_job_limit):
+    # the (keyword, page) order _crawl hands out `slots` free requests in
+    order = []
+    for _ in range(slots):
+        job = Scheduler._next_dispatchable(queue, per_job_limit)
+        if job is None:
+            break
+        order.append((job.keyword, job.dispatch()))
+    return order
+
+
+def test_slots_are_handed_out_round_robin(tmp_path):
+    # a 100-page keyword does not hold back the small ones
+    jobs = make_jobs(tmp_path, [100, 2, 3])
+    order = dispatch(deque(jobs), 7, per_job_limit=4)
+    assert order == [("kw0", 1), ("kw1", 1), ("kw2", 1), ("kw0", 2), ("kw1", 2), ("kw2", 2), ("kw0", 3)]
+
+
+def test_per_job_limit_caps_pages_in_flight(tmp_path):
+    jobs = make_jobs(tmp_path, [100, 1])
+    order = dispatch(deque(jobs), 8, per_job_limit=3)
+    assert order == [("kw0", 1), ("kw1", 1), ("kw0", 2), ("kw0", 3)]
+    # a finished page frees its job's slot
+    jobs[0].complete(1, [{"title": "a"}], None)
+    assert dispatch(deque(jobs), 8, per_job_limit=3) == [("kw0", 4)]
+
+
+def test_full_scan_probes_one_page_until_the_page_count_is_known(tmp_path):
+    job = make_jobs(tmp_path, [0])[0]
+    assert dispatch(deque([job]), 4, per_job_limit=4) == [("kw0", 1)]
+    job.complete(1, [{"title": "a"}], 3)
+    assert dispatch(deque([job]), 4, per_job_limit=4) == [("kw0", 2), ("kw0", 3)]
+
+
+def test_pages_are_written_in_page_order(tmp_path):
+    job = make_jobs(tmp_path, [3])[0]
+    dispatch(deque([job]), 3, per_job_limit=3)
+    job.complete(3, [{"title": "c"}], None)
+    job.complete(2, [{"title": "b"}], None)
+    assert job.sink.last_page == 0
+    job.complete(1, [{"title": "a"}], None)
+    assert job.status == "done"
+    assert (tmp_path / "Raw_kw0_p3.csv").read_text(encoding="utf-8").split() == ["title", "a", "b", "c"]
+
+
+def test_empty_page_stops_the_job(tmp_path):
+    job = make_jobs(tmp_path, [3])[0]
+    dispatch(deque([job]), 3, per_job_limit=3)
+    for page, rows in [(1, [{"title": "a"}]), (2, []), (3, [{"title": "c"}])]:
+        job.complete(page, rows, None)
+    assert (job.status, job.sink.last_page, job.sink.rows_written) == ("empty page", 1, 1)
+
+
+def test_batch_crawl_matches_single_keyword_crawls(search_url, limiter, tmp_path):
+    jobs = [{"keyword": "5090", "output_base": "newegg_5090_results", "page_limit": 8},
+            {"keyword": "2tb ssd", "output_base": "newegg_2tb_ssd_results", "page_limit": 2}]
+    crawled = Scheduler.run_jobs(jobs, str(tmp_path), max_in_flight=4, per_job_limit=2, backend="strainer",
+                                 limiter=limiter, archive_dir=str(tmp_path / "archive"), search_url=search_url,
+                                 snapshot_dir=None)
+    assert [job.status for job in crawled] == ["done", "done"]
+    for name in ["Raw_newegg_5090_results_p8.csv", "Raw_newegg_2tb_ssd_results_p2.csv"]:
+        assert (tmp_path / name).read_bytes() == raw_csv(name)
+
+
+def test_page_error_fails_only_its_job(search_url, limiter, tmp_path, monkeypatch):
+    fetch_search_page = Fetch.fetch_search_page
+
+    def broken_ssd_page_2(start_url, keyword, page, *args):
+        if keyword == "2tb ssd" and page == 2:
+            raise ValueError("unparseable page")
+        return fetch_search_page(start_url, keyword, page, *args)
+
+    monkeypatch.setattr(Fetch, "fetch_search_page", broken_ssd_page_2)
+    jobs = [{"keyword": "5090", "output_base": "newegg_5090_results", "page_limit": 8},
+            {"keyword": "2tb ssd", "output_base": "newegg_2tb_ssd_results", "page_limit": 2}]
+    crawled = Scheduler.run_jobs(jobs, str(tmp_path), max_in_flight=4, per_job_limit=2, backend="strainer",
+                                 limiter=limiter, archive_dir=str(tmp_path / "archive"), search_url=search_url,
+                                 snapshot_dir=None)
+    assert [(job.status, job.sink.last_page) for job in crawled] == [("done", 8), ("failed", 1)]
+    assert (tmp_path / "Raw_newegg_5090_results_p8.csv").read_bytes() == raw_csv("Raw_newegg_5090_results_p8.csv")
+    # the failed job resumes from its checkpoint
+    monkeypatch.setattr(Fetch, "fetch_search_page", fetch_search_page)
+    crawled = Scheduler.run_jobs(jobs[1:], str(tmp_path), backend="strainer", limiter=limiter, resume=True,
+                                 archive_dir=str(tmp_path / "archive"), search_url=search_url, snapshot_dir=None)
+    assert (crawled[0].status, crawled[0].next_page) == ("done", 3)
+    assert (tmp_path / "Raw_newegg_2tb_ssd_results_p2.csv").read_bytes() == raw_csv("Raw_newegg_2tb_ssd_results_p2.csv")
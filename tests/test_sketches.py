@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+import Sketches
+
+
+def rank_of(values_sorted, item):
+    # normalized rank range of `item` among the sorted values
+    return (np.searchsorted(values_sorted, item, side="left") / len(values_sorted),
+            np.searchsorted(values_sorted, item, side="right") / len(values_sorted))
+
+
+def test_small_sketch_is_exact():
+    values = np.array([5.0, 1.0, 4.0, 2.0, 3.0, 10.0])
+    sketch = Sketches.KLLSketch()
+    sketch.update(values)
+    assert sketch.exact and sketch.rank_error() == 0.0
+    qs = [0.0, 0.25, 0.5, 0.75, 1.0]
+    np.testing.assert_allclose(sketch.quantiles(qs), np.quantile(values, qs))
+    assert sketch.quantile(0.5) == 3.5
+
+
+def test_merge_of_exact_sketches_is_exact():
+    rng = np.random.default_rng(0)
+    a, b = rng.normal(size=60), rng.normal(size=70)
+    left, right = Sketches.KLLSketch(), Sketches.KLLSketch()
+    left.update(a)
+    right.update(np.append(b, np.nan))
+    left.merge(right)
+    assert left.exact and left.n == 130
+    qs = np.linspace(0, 1, 11)
+    np.testing.assert_allclose(left.quantiles(qs), np.quantile(np.concatenate([a, b]), qs))
+
+
+def test_merged_sketch_stays_within_rank_error():
+    rng = np.random.default_rng(1)
+    chunks = [rng.lognormal(7, 0.5, size) for size in (40_000, 25_000, 35_000)]
+    sketches = []
+    for i, chunk in enumerate(chunks):
+        sketch = Sketches.KLLSketch(seed=i)
+        for batch in np.array_split(chunk, 10):
+            sketch.update(batch)
+        sketches.append(sketch)
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged.merge(sketch)
+
+    values = np.sort(np.concatenate(chunks))
+    assert merged.n == len(values) and not merged.exact
+    assert (merged.min, merged.max) == (values[0], values[-1])
+    assert sum(len(level) for level in merged.levels) < 4 * merged.k
+    eps = merged.rank_error(all_quantiles=True)
+    for q in np.linspace(0.01, 0.99, 99):
+        low, high = rank_of(values, merged.quantile(q))
+        assert low - eps <= q <= high + eps
+
+
+def test_sketch_round_trips_through_dict():
+    sketch = Sketches.KLLSketch(k=50)
+    sketch.update(np.arange(10_000, dtype=float))
+    restored = Sketches.KLLSketch.from_dict(sketch.to_dict())
+    qs = [0.1, 0.5, 0.9]
+    np.testing.assert_array_equal(restored.quantiles(qs), sketch.quantiles(qs))
+    assert (restored.n, restored.min, restored.max) == (sketch.n, sketch.min, sketch.max)
+
+
+def test_welford_merge_matches_numpy():
+    rng = np.random.default_rng(2)
+    a, b = rng.normal(1000, 50, 500), rng.normal(1200, 80, 300)
+    left, right = Sketches.Welford(), Sketches.Welford()
+    left.update(a)
+    right.update(b)
+    left.merge(right)
+    both = np.concatenate([a, b])
+    assert left.n == len(both)
+    assert left.mean == pytest.approx(both.mean(), rel=1e-12)
+    assert left.std == pytest.approx(both.std(ddof=1), rel=1e-9)
+    assert (left.min, left.max) == (both.min(), both.max())
+
+
+def test_hyperloglog_merge_estimates_the_union():
+    left, right = Sketches.HyperLogLog(), Sketches.HyperLogLog()
+    left.update([f"item {i}" for i in range(30_000)])
+    right.update([f"item {i}" for i in range(20_000, 50_000)])
+    left.merge(right)
+    assert left.estimate() == pytest.approx(50_000, rel=3 * left.relative_error)
+    # merging is idempotent
+    registers = left.registers.copy()
+    left.merge(right)
+    np.testing.assert_array_equal(left.registers, registers)
+
+
+def test_metric_summary_reports_rank_error():
+    metric = Sketches.Metric()
+    metric.update([1.0, 2.0, 3.0, 4.0, np.nan])
+    summary = metric.summary()
+    assert (summary["count"], summary["median"], summary["rank_error"]) == (4, 2.5, 0.0)
+    metric.update(np.arange(5_000, dtype=float))
+    assert metric.summary()["rank_error"] > 0